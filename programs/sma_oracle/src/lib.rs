@@ -4,6 +4,13 @@ use pyth_sdk_solana::state::SolanaPriceAccount;
 
 declare_id!("FtDpp1TsamUskkz2AS7NTuRGqyB3j4dpP7mj9ATHbDoa");
 
+/// Number of datapoints kept in the history ring buffer. The account is created with
+/// `init` (system program CPI), so it must stay under the 10 KiB allocation limit.
+pub const HISTORY_CAPACITY: usize = 256;
+
+/// Maximum datapoints returned by `get_datapoint_batch` (return data is capped at 1024 bytes)
+pub const MAX_BATCH_RETURN: usize = 32;
+
 #[program]
 pub mod sma_oracle {
     use super::*;
@@ -67,15 +74,30 @@ pub mod sma_oracle {
         Ok(ctx.accounts.oracle_state.trend_value)
     }
 
+    pub fn initialize_history(ctx: Context<InitializeHistory>) -> Result<()> {
+        let mut history = ctx.accounts.history.load_init()?;
+        history.authority = ctx.accounts.authority.key();
+        history.head = 0;
+        history.count = 0;
+        Ok(())
+    }
+
     pub fn store_datapoint(ctx: Context<StoreDatapoint>, sbtc_value: u64, btc_price: u64, data_points_used: u32) -> Result<()> {
         let clock = Clock::get()?;
         let current_time = clock.unix_timestamp;
 
-        let datapoint = &mut ctx.accounts.datapoint;
-        datapoint.timestamp = current_time;
-        datapoint.sbtc_value = sbtc_value;
-        datapoint.btc_price = btc_price;
-        datapoint.data_points_used = data_points_used;
+        let mut history = ctx.accounts.history.load_mut()?;
+        // Binary search in get_datapoint_batch relies on non-decreasing timestamps
+        if let Some(last) = history.last() {
+            require!(current_time >= last.timestamp, ErrorCode::InvalidTimestamp);
+        }
+        history.push(DatapointSlot {
+            timestamp: current_time,
+            sbtc_value,
+            btc_price,
+            data_points_used,
+            _padding: 0,
+        });
 
         msg!("Stored datapoint: timestamp={}, sbtc_value={}, btc_price={}, data_points={}", 
              current_time, sbtc_value, btc_price, data_points_used);
@@ -84,28 +106,100 @@ pub mod sma_oracle {
     }
 
     pub fn get_last_datapoint(ctx: Context<GetLastDatapoint>) -> Result<Datapoint> {
-        let datapoint = &ctx.accounts.datapoint;
-        Ok(Datapoint {
-            timestamp: datapoint.timestamp,
-            sbtc_value: datapoint.sbtc_value,
-            btc_price: datapoint.btc_price,
-            data_points_used: datapoint.data_points_used,
-        })
+        let history = ctx.accounts.history.load()?;
+        let last = history.last().ok_or(ErrorCode::DatapointNotFound)?;
+        Ok(Datapoint::from(last))
     }
 
     pub fn get_datapoint_batch(ctx: Context<GetDatapointBatch>, start_timestamp: i64, end_timestamp: i64) -> Result<Vec<Datapoint>> {
-        // For now, return a single datapoint. In a full implementation, you'd query multiple accounts
-        // or use a more sophisticated storage mechanism
-        let datapoint = &ctx.accounts.datapoint;
-        if datapoint.timestamp >= start_timestamp && datapoint.timestamp <= end_timestamp {
-            Ok(vec![Datapoint {
-                timestamp: datapoint.timestamp,
-                sbtc_value: datapoint.sbtc_value,
-                btc_price: datapoint.btc_price,
-                data_points_used: datapoint.data_points_used,
-            }])
+        require!(start_timestamp <= end_timestamp, ErrorCode::InvalidTimestamp);
+        let history = ctx.accounts.history.load()?;
+
+        // Timestamps are sorted oldest -> newest, so both bounds are O(log n)
+        let lo = history.partition_point(|ts| ts < start_timestamp);
+        let hi = history.partition_point(|ts| ts <= end_timestamp);
+        let hi = hi.min(lo + MAX_BATCH_RETURN);
+
+        Ok((lo..hi).map(|i| Datapoint::from(history.get(i))).collect())
+    }
+}
+
+/// One packed history entry (explicit padding keeps the layout Pod and 8-byte aligned)
+#[zero_copy]
+#[derive(Default)]
+pub struct DatapointSlot {
+    pub timestamp: i64,
+    pub sbtc_value: u64,       // SBTC value in cents
+    pub btc_price: u64,        // BTC price at time of computation in cents
+    pub data_points_used: u32, // Number of historical data points used
+    pub _padding: u32,
+}
+
+/// Fixed-size ring buffer of datapoints; `head` is the next slot to write
+#[account(zero_copy)]
+pub struct DatapointHistory {
+    pub authority: Pubkey,
+    pub head: u32,
+    pub count: u32,
+    pub slots: [DatapointSlot; HISTORY_CAPACITY],
+}
+
+impl DatapointHistory {
+    pub const LEN: usize = 32 + 4 + 4 + HISTORY_CAPACITY * std::mem::size_of::<DatapointSlot>();
+
+    /// Physical slot index of the `logical`-th oldest datapoint
+    fn physical(&self, logical: usize) -> usize {
+        let oldest = (self.head as usize + HISTORY_CAPACITY - self.count as usize) % HISTORY_CAPACITY;
+        (oldest + logical) % HISTORY_CAPACITY
+    }
+
+    pub fn len(&self) -> usize {
+        self.count as usize
+    }
+
+    pub fn get(&self, logical: usize) -> &DatapointSlot {
+        &self.slots[self.physical(logical)]
+    }
+
+    pub fn last(&self) -> Option<&DatapointSlot> {
+        if self.count == 0 {
+            None
         } else {
-            Ok(vec![])
+            Some(self.get(self.len() - 1))
+        }
+    }
+
+    pub fn push(&mut self, slot: DatapointSlot) {
+        let head = self.head as usize;
+        self.slots[head] = slot;
+        self.head = ((head + 1) % HISTORY_CAPACITY) as u32;
+        if self.len() < HISTORY_CAPACITY {
+            self.count += 1;
+        }
+    }
+
+    /// Number of leading (oldest) datapoints whose timestamp satisfies `pred`
+    pub fn partition_point<F: Fn(i64) -> bool>(&self, pred: F) -> usize {
+        let (mut lo, mut hi) = (0usize, self.len());
+        while lo < hi {
+            let mid = lo + (hi - lo) / 2;
+            if pred(self.get(mid).timestamp) {
+                lo = mid + 1;
+            } else {
+                hi = mid;
+            }
+        }
+        lo
+    }
+}
+
+impl From<&DatapointSlot> for sma_oracle::Datapoint {
+    fn from(slot: &DatapointSlot) -> Self {
+        sma_oracle::Datapoint {
+            timestamp: slot.timestamp,
+            sbtc_value: slot.sbtc_value,
+            btc_price: slot.btc_price,
+            data_points_used: slot.data_points_used,
         }
     }
 }
@@ -127,22 +221,31 @@ pub struct GetTrend<'info> {
 }
 
 #[derive(Accounts)]
-pub struct StoreDatapoint<'info> {
-    #[account(init, payer = authority, space = 8 + 8 + 8 + 8 + 4)]
-    pub datapoint: Account<'info, sma_oracle::Datapoint>,
+pub struct InitializeHistory<'info> {
+    #[account(init, payer = authority, space = 8 + DatapointHistory::LEN, seeds = [b"history"], bump)]
+    pub history: AccountLoader<'info, DatapointHistory>,
     #[account(mut)]
     pub authority: Signer<'info>,
     pub system_program: Program<'info, System>,
 }
 
+#[derive(Accounts)]
+pub struct StoreDatapoint<'info> {
+    #[account(mut, seeds = [b"history"], bump, has_one = authority)]
+    pub history: AccountLoader<'info, DatapointHistory>,
+    pub authority: Signer<'info>,
+}
+
 #[derive(Accounts)]
 pub struct GetLastDatapoint<'info> {
-    pub datapoint: Account<'info, sma_oracle::Datapoint>,
+    #[account(seeds = [b"history"], bump)]
+    pub history: AccountLoader<'info, DatapointHistory>,
 }
 
 #[derive(Accounts)]
 pub struct GetDatapointBatch<'info> {
-    pub datapoint: Account<'info, sma_oracle::Datapoint>,
+    #[account(seeds = [b"history"], bump)]
+    pub history: AccountLoader<'info, DatapointHistory>,
 }
 
 #[error_code]
@@ -0,0 +1,260 @@
+//! Compute-unit profiling harness for the sma_oracle program.
+//!
+//! Runs every instruction against the compiled SBF program inside a BanksClient
+//! (solana-program-test), with mocked Pyth price accounts, and reports the compute
+//! units each one consumes. A test fails when an instruction exceeds its budget.
+//!
+//! Run with `cargo test-sbf -p sma_oracle -- --nocapture` so the program is built
+//! and metered as SBF. Budgets can be overridden per instruction with
+//! `SMA_ORACLE_CU_BUDGET_<INSTRUCTION>` (e.g. `SMA_ORACLE_CU_BUDGET_UPDATE_TREND=20000`).
+
+use anchor_lang::error::ERROR_CODE_OFFSET;
+use anchor_lang::{AccountSerialize, InstructionData, ToAccountMetas};
+use pyth_sdk_solana::state::{
+    AccountType, CorpAction, PriceInfo, PriceStatus, SolanaPriceAccount, MAGIC, VERSION_2,
+};
+use sma_oracle::sma_oracle::OracleState;
+use sma_oracle::{ErrorCode, HISTORY_CAPACITY};
+use solana_program_test::{BanksClientError, ProgramTest, ProgramTestContext};
+use solana_sdk::account::{Account, AccountSharedData};
+use solana_sdk::clock::Clock;
+use solana_sdk::instruction::{Instruction, InstructionError};
+use solana_sdk::pubkey::Pubkey;
+use solana_sdk::signature::Signer;
+use solana_sdk::system_program;
+use solana_sdk::transaction::{Transaction, TransactionError};
+
+/// Default compute-unit budgets per instruction
+const DEFAULT_BUDGETS: &[(&str, u64)] = &[
+    ("initialize_history", 15_000),
+    ("update_trend", 25_000),
+    ("store_datapoint", 15_000),
+    ("get_last_datapoint", 10_000),
+    ("get_datapoint_batch", 30_000),
+];
+
+/// BTC at $60,000.00 with Pyth's usual -8 exponent
+const PYTH_PRICE: i64 = 6_000_000_000_000;
+const PYTH_EXPO: i32 = -8;
+const CURRENT_PRICE_CENTS: u64 = 6_000_000;
+
+fn budget(instruction: &str) -> u64 {
+    let var = format!("SMA_ORACLE_CU_BUDGET_{}", instruction.to_uppercase());
+    if let Ok(value) = std::env::var(&var) {
+        return value.parse().unwrap_or_else(|_| panic!("{} must be an integer", var));
+    }
+    DEFAULT_BUDGETS
+        .iter()
+        .find(|(name, _)| *name == instruction)
+        .map(|(_, units)| *units)
+        .unwrap_or_else(|| panic!("no compute budget for {}", instruction))
+}
+
+struct Harness {
+    context: ProgramTestContext,
+    oracle_state: Pubkey,
+    history: Pubkey,
+    pyth: Pubkey,
+}
+
+impl Harness {
+    async fn new() -> Self {
+        let mut program_test = ProgramTest::new("sma_oracle", sma_oracle::ID, None);
+        program_test.prefer_bpf(true);
+
+        // `initialize` is not exposed as an instruction, so seed the oracle state directly
+        let (oracle_state, _) = Pubkey::find_program_address(&[b"oracle"], &sma_oracle::ID);
+        let mut data = Vec::new();
+        OracleState { trend_value: 0, last_update: 0 }
+            .try_serialize(&mut data)
+            .unwrap();
+        program_test.add_account(
+            oracle_state,
+            Account {
+                lamports: 1_000_000_000,
+                data,
+                owner: sma_oracle::ID,
+                executable: false,
+                rent_epoch: 0,
+            },
+        );
+
+        let context = program_test.start_with_context().await;
+        let (history, _) = Pubkey::find_program_address(&[b"history"], &sma_oracle::ID);
+        let mut harness = Harness { context, oracle_state, history, pyth: Pubkey::new_unique() };
+        let now = harness.clock().await.unix_timestamp;
+        harness.set_pyth_price(PYTH_PRICE, 1_000, now);
+        harness
+    }
+
+    async fn clock(&mut self) -> Clock {
+        self.context.banks_client.get_sysvar::<Clock>().await.unwrap()
+    }
+
+    /// Write a legacy Pyth v2 price account with an aggregate price in Trading status
+    fn set_pyth_price(&mut self, price: i64, conf: u64, publish_time: i64) {
+        let mut account: SolanaPriceAccount = bytemuck::Zeroable::zeroed();
+        account.magic = MAGIC;
+        account.ver = VERSION_2;
+        account.atype = AccountType::Price as u32;
+        account.expo = PYTH_EXPO;
+        account.timestamp = publish_time;
+        account.agg = PriceInfo {
+            price,
+            conf,
+            status: PriceStatus::Trading,
+            corp_act: CorpAction::NoCorpAct,
+            pub_slot: 1,
+        };
+        let data = bytemuck::bytes_of(&account).to_vec();
+        let mut shared = AccountSharedData::new(1_000_000_000, data.len(), &Pubkey::new_unique());
+        shared.set_data_from_slice(&data);
+        self.context.set_account(&self.pyth, &shared);
+    }
+
+    /// Process one instruction and return the compute units it consumed
+    async fn run(&mut self, ix: Instruction) -> Result<u64, BanksClientError> {
+        let payer = self.context.payer.insecure_clone();
+        let blockhash = self.context.banks_client.get_latest_blockhash().await?;
+        let tx = Transaction::new_signed_with_payer(&[ix], Some(&payer.pubkey()), &[&payer], blockhash);
+        let result = self.context.banks_client.process_transaction_with_metadata(tx).await?;
+        let units = result.metadata.map(|m| m.compute_units_consumed).unwrap_or(0);
+        result.result.map(|_| units).map_err(BanksClientError::TransactionError)
+    }
+
+    fn update_trend_ix(&self, new_trend: u64) -> Instruction {
+        Instruction {
+            program_id: sma_oracle::ID,
+            accounts: sma_oracle::accounts::UpdateTrend {
+                oracle_state: self.oracle_state,
+                pyth_price_account: self.pyth,
+                authority: self.context.payer.pubkey(),
+            }
+            .to_account_metas(None),
+            data: sma_oracle::instruction::UpdateTrend { new_trend }.data(),
+        }
+    }
+
+    fn initialize_history_ix(&self) -> Instruction {
+        Instruction {
+            program_id: sma_oracle::ID,
+            accounts: sma_oracle::accounts::InitializeHistory {
+                history: self.history,
+                authority: self.context.payer.pubkey(),
+                system_program: system_program::ID,
+            }
+            .to_account_metas(None),
+            data: sma_oracle::instruction::InitializeHistory {}.data(),
+        }
+    }
+
+    fn store_datapoint_ix(&self, sbtc_value: u64) -> Instruction {
+        Instruction {
+            program_id: sma_oracle::ID,
+            accounts: sma_oracle::accounts::StoreDatapoint {
+                history: self.history,
+                authority: self.context.payer.pubkey(),
+            }
+            .to_account_metas(None),
+            data: sma_oracle::instruction::StoreDatapoint {
+                sbtc_value,
+                btc_price: CURRENT_PRICE_CENTS,
+                data_points_used: 1000,
+            }
+            .data(),
+        }
+    }
+
+    fn get_last_datapoint_ix(&self) -> Instruction {
+        Instruction {
+            program_id: sma_oracle::ID,
+            accounts: sma_oracle::accounts::GetLastDatapoint { history: self.history }.to_account_metas(None),
+            data: sma_oracle::instruction::GetLastDatapoint {}.data(),
+        }
+    }
+
+    fn get_datapoint_batch_ix(&self, start_timestamp: i64, end_timestamp: i64) -> Instruction {
+        Instruction {
+            program_id: sma_oracle::ID,
+            accounts: sma_oracle::accounts::GetDatapointBatch { history: self.history }.to_account_metas(None),
+            data: sma_oracle::instruction::GetDatapointBatch { start_timestamp, end_timestamp }.data(),
+        }
+    }
+}
+
+fn assert_program_error(err: BanksClientError, expected: ErrorCode) {
+    let code = ERROR_CODE_OFFSET + expected as u32;
+    match err.unwrap() {
+        TransactionError::InstructionError(_, InstructionError::Custom(actual)) => assert_eq!(actual, code),
+        other => panic!("expected custom error {}, got {:?}", code, other),
+    }
+}
+
+fn report(rows: &[(&str, u64)]) {
+    println!("\n{:<22} {:>10} {:>10}", "instruction", "CU used", "budget");
+    for (name, units) in rows {
+        println!("{:<22} {:>10} {:>10}", name, units, budget(name));
+    }
+    let over: Vec<String> = rows
+        .iter()
+        .filter(|(name, units)| *units > budget(name))
+        .map(|(name, units)| format!("{} used {} CU (budget {})", name, units, budget(name)))
+        .collect();
+    assert!(over.is_empty(), "compute budget regression: {}", over.join("; "));
+}
+
+#[tokio::test]
+async fn compute_units_within_budget() {
+    let mut harness = Harness::new().await;
+    let mut rows = Vec::new();
+
+    let ix = harness.initialize_history_ix();
+    rows.push(("initialize_history", harness.run(ix).await.unwrap()));
+
+    let ix = harness.update_trend_ix(5_900_000);
+    rows.push(("update_trend", harness.run(ix).await.unwrap()));
+
+    // Fill the ring buffer past capacity; report the most expensive store
+    let mut store_max = 0;
+    for i in 0..(HISTORY_CAPACITY as u64 + 4) {
+        let ix = harness.store_datapoint_ix(5_900_000 + i);
+        store_max = store_max.max(harness.run(ix).await.unwrap());
+    }
+    rows.push(("store_datapoint", store_max));
+
+    let ix = harness.get_last_datapoint_ix();
+    rows.push(("get_last_datapoint", harness.run(ix).await.unwrap()));
+
+    let ix = harness.get_datapoint_batch_ix(0, i64::MAX);
+    rows.push(("get_datapoint_batch", harness.run(ix).await.unwrap()));
+
+    report(&rows);
+}
+
+#[tokio::test]
+async fn update_trend_rejects_stale_price() {
+    let mut harness = Harness::new().await;
+    let now = harness.clock().await.unix_timestamp;
+    harness.set_pyth_price(PYTH_PRICE, 1_000, now - 3_600);
+
+    let ix = harness.update_trend_ix(5_900_000);
+    assert_program_error(harness.run(ix).await.unwrap_err(), ErrorCode::StalePrice);
+}
+
+#[tokio::test]
+async fn update_trend_rejects_high_confidence() {
+    let mut harness = Harness::new().await;
+    let now = harness.clock().await.unix_timestamp;
+    harness.set_pyth_price(PYTH_PRICE, PYTH_PRICE as u64 / 100, now);
+
+    let ix = harness.update_trend_ix(5_900_000);
+    assert_program_error(harness.run(ix).await.unwrap_err(), ErrorCode::HighConfidence);
+}
+
+#[tokio::test]
+async fn update_trend_rejects_out_of_band_trend() {
+    let mut harness = Harness::new().await;
+
+    let ix = harness.update_trend_ix(CURRENT_PRICE_CENTS * 20);
+    assert_program_error(harness.run(ix).await.unwrap_err(), ErrorCode::InvalidTrend);
+}
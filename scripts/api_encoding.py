@@ -0,0 +1,130 @@
+"""
+Response encoding with content negotiation for the SBTC Oracle API
+JSON goes through orjson when it is installed; array-shaped responses can also
+be returned as MessagePack or as a columnar Arrow IPC stream
+"""
+
+import json
+
+from flask import Response, request
+
+from lazy_imports import lazy_import
+
+# Optional fast encoders; each format is only offered when its library is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# pyarrow alone takes longer to import than the rest of the API; load it on first use
+pa = lazy_import('pyarrow', optional=True)
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+# ?format= shortcuts for clients that cannot set an Accept header
+FORMAT_ALIASES = {
+    'json': JSON_MIMETYPE,
+    'msgpack': MSGPACK_MIMETYPE,
+    'arrow': ARROW_MIMETYPE,
+}
+
+
+def dumps_json(payload) -> bytes:
+    """Serialize to JSON with sorted keys (matching Flask's jsonify output)"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()
+
+
+def dumps_msgpack(payload) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def rows_to_columns(rows):
+    """Transpose a list of row dicts into a dict of column lists"""
+    if isinstance(rows, dict):
+        return rows
+    columns = {}
+    for row in rows:
+        for key in row:
+            columns.setdefault(key, [])
+    for key in columns:
+        columns[key] = [row.get(key) for row in rows]
+    return columns
+
+
+def dumps_arrow(table, metadata=None) -> bytes:
+    """Encode a table (row dicts or column dict) as an Arrow IPC stream
+
+    The rest of the response envelope travels as JSON in the schema metadata
+    under the key "envelope".
+    """
+    batch = pa.table(rows_to_columns(table))
+    if metadata:
+        batch = batch.replace_schema_metadata({'envelope': dumps_json(metadata)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_table(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def available_mimetypes(tabular=False):
+    mimetypes = [JSON_MIMETYPE]
+    if msgpack is not None:
+        mimetypes.append(MSGPACK_MIMETYPE)
+    if tabular and pa is not None:
+        mimetypes.append(ARROW_MIMETYPE)
+    return mimetypes
+
+
+def negotiate(tabular=False):
+    """Pick a response mimetype from ?format= or the Accept header (None if unsupported)"""
+    supported = available_mimetypes(tabular)
+    requested = request.args.get('format')
+    if requested:
+        mimetype = FORMAT_ALIASES.get(requested.lower())
+        return mimetype if mimetype in supported else None
+    if not request.accept_mimetypes:
+        return JSON_MIMETYPE
+    return request.accept_mimetypes.best_match(supported)
+
+
+def respond(payload, status=200, table_path=None, headers=None):
+    """Encode payload in the negotiated format
+
+    table_path names the nested key holding the array-shaped part of the
+    response (e.g. ('data', 'datapoints')); only such responses can be Arrow.
+    """
+    mimetype = negotiate(tabular=table_path is not None)
+    if mimetype is None:
+        body = dumps_json({
+            'error': f"Not acceptable; supported formats: {', '.join(available_mimetypes(table_path is not None))}",
+            'success': False,
+        })
+        return Response(body, status=406, mimetype=JSON_MIMETYPE)
+
+    if mimetype == ARROW_MIMETYPE:
+        envelope = dict(payload)
+        parent = envelope
+        for key in table_path[:-1]:
+            parent[key] = dict(parent[key])
+            parent = parent[key]
+        table = parent.pop(table_path[-1])
+        body = dumps_arrow(table, envelope)
+    elif mimetype == MSGPACK_MIMETYPE:
+        body = dumps_msgpack(payload)
+    else:
+        body = dumps_json(payload)
+
+    response = Response(body, status=status, mimetype=mimetype)
+    response.vary.add('Accept')
+    if headers:
+        response.headers.update(headers)
+    return response
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Benchmark for API response encodings
+Serializes a /datapoints/batch-shaped payload with stdlib json, orjson,
+MessagePack and Arrow IPC and reports encode time and payload size
+"""
+
+import argparse
+import json
+import time
+
+from api_encoding import dumps_arrow, dumps_msgpack, msgpack, orjson, pa
+
+
+def make_payload(rows):
+    datapoints = [{
+        'timestamp': 1_700_000_000 + i * 3600,
+        'sbtc_value': 46000.0 + i * 0.37,
+        'btc_price': 47000.0 + i * 0.91,
+        'data_points_used': 1000,
+        'stored_at': f"2024-01-01T{i % 24:02d}:00:00",
+    } for i in range(rows)]
+    return {
+        'success': True,
+        'data': {'datapoints': datapoints, 'count': rows, 'total_datapoints': rows},
+    }
+
+
+def time_encoder(encode, payload, repeat):
+    body = encode(payload)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        encode(payload)
+    return (time.perf_counter() - started) / repeat * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API response encodings")
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    payload = make_payload(args.rows)
+    encoders = {'json (stdlib, as jsonify)': lambda p: json.dumps(p, sort_keys=True).encode()}
+    if orjson is not None:
+        encoders['orjson'] = lambda p: orjson.dumps(p, option=orjson.OPT_SORT_KEYS)
+    if msgpack is not None:
+        encoders['msgpack'] = dumps_msgpack
+    if pa is not None:
+        encoders['arrow ipc'] = lambda p: dumps_arrow(p['data']['datapoints'], {'success': True})
+
+    print(f"Encoding {args.rows} datapoints ({args.repeat} repeats)")
+    print(f"{'encoder':<28} {'ms/encode':>10} {'bytes':>12}")
+    baseline = None
+    for name, encode in encoders.items():
+        ms, size = time_encoder(encode, payload, args.repeat)
+        baseline = baseline or ms
+        print(f"{name:<28} {ms:>10.2f} {size:>12,}  ({baseline / ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
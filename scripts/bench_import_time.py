@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for the SBTC Oracle scripts
+Runs `python -X importtime -c "import <module>"` in fresh interpreters, reports
+the median cumulative import time per module and which heavy packages got
+loaded, and compares against the tracked baseline in import_time_baseline.json.
+Times are tracked relative to a stdlib import measured in the same run, so the
+baseline holds across machines.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(SCRIPTS_DIR, 'import_time_baseline.json')
+
+MODULES = ['sbtc_api', 'compute_sma', 'oracle_publisher', 'solana_rpc', 'price_sources', 'api_encoding',
+           'datapoint_history', 'solana_datapoint_client']
+# Packages that must stay lazy: importing any script module should not load them
+HEAVY_PACKAGES = ['numpy', 'pandas', 'requests', 'pyarrow']
+# Stdlib import timed alongside the modules; it scales with the machine and interpreter
+REFERENCE = 'asyncio'
+
+PROBE = "import sys, json, {module}; print(json.dumps([p for p in {heavy!r} if p in sys.modules]))"
+
+
+def measure(module, runs):
+    """Median cumulative import time (ms) of module and the heavy packages it loads"""
+    samples, loaded = [], []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                                 PROBE.format(module=module, heavy=HEAVY_PACKAGES)],
+                                cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True)
+        for line in result.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            parts = [part.strip() for part in line.split('|')]
+            if len(parts) == 3 and parts[2] == module:
+                samples.append(int(parts[1]) / 1000)
+        loaded = json.loads(result.stdout)
+    return statistics.median(samples), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time of the oracle scripts")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--update', action='store_true', help="Write the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=1.0,
+                        help="Allowed slowdown over the baseline before failing (1.0 = twice as slow)")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            saved = json.load(f)
+        if saved.get('reference') == REFERENCE:
+            baseline = saved['modules']
+
+    reference_ms, _ = measure(REFERENCE, args.runs)
+    print(f"Reference: import {REFERENCE} takes {reference_ms:.1f} ms")
+    results, failures = {}, []
+    print(f"{'module':<24} {'ms':>8} {'relative':>9} {'baseline':>9}  heavy packages loaded")
+    for module in MODULES:
+        ms, loaded = measure(module, args.runs)
+        relative = ms / reference_ms
+        results[module] = round(relative, 2)
+        expected = baseline.get(module)
+        print(f"{module:<24} {ms:>8.1f} {relative:>9.2f} {expected if expected is not None else '-':>9}  "
+              f"{', '.join(loaded) or '-'}")
+        if loaded:
+            failures.append(f"{module} imports {', '.join(loaded)} eagerly")
+        if expected is not None and relative > expected * (1 + args.tolerance):
+            failures.append(f"{module} import time is {relative:.2f}x import {REFERENCE}, "
+                            f"baseline {expected}x")
+
+    if args.update:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'runs': args.runs, 'reference': REFERENCE,
+                       'modules': results}, f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {BASELINE_PATH}")
+    elif failures:
+        print("\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Snapshots of the SBTC Oracle's computed state for warm restarts
+A snapshot file holds a JSON metadata block (fingerprints, the cached result,
+source status) followed by named, 64-byte-aligned numpy arrays (the price
+history and the SBTC curves). It is written to a temporary file and renamed
+over the previous one, so readers never see a partial snapshot, and read
+back through a read-only mmap: arrays are zero-copy views of the file.
+
+    write_snapshot(path, {'fingerprint': ...}, {'price': prices})
+    metadata, arrays = read_snapshot(path)
+
+Checkpointer rewrites the snapshot periodically from a capture() callback
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+
+MAGIC = b'SBTCSNAP'
+# Bump when the layout or the meaning of the stored arrays changes
+SNAPSHOT_VERSION = 1
+HEADER = struct.Struct('<8sIIQ')  # magic, version, metadata length, data offset
+ALIGN = 64
+
+Snapshot = namedtuple('Snapshot', 'metadata arrays')
+
+
+class SnapshotError(ValueError):
+    """A snapshot file is truncated, corrupt or from another SNAPSHOT_VERSION"""
+
+
+def fingerprint(**parts) -> str:
+    """Stable hash of JSON-serializable parts (e.g. parameters a snapshot was computed with)"""
+    blob = json.dumps(parts, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+def write_snapshot(path: str, metadata: dict, arrays: dict) -> int:
+    """Atomically replace path with metadata and named 1-D arrays; returns the file size"""
+    arrays = {name: np.ascontiguousarray(values) for name, values in arrays.items()}
+    layout, size = {}, 0
+    for name, values in arrays.items():
+        layout[name] = {'dtype': values.dtype.str, 'count': len(values), 'offset': size}
+        size += values.nbytes + -values.nbytes % ALIGN
+    blob = json.dumps({**metadata, 'arrays': layout}).encode()
+    data_offset = HEADER.size + len(blob)
+    data_offset += -data_offset % ALIGN
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temporary, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, SNAPSHOT_VERSION, len(blob), data_offset))
+            f.write(blob)
+            for name, values in arrays.items():
+                f.seek(data_offset + layout[name]['offset'])
+                f.write(values.tobytes())
+            f.truncate(data_offset + size)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    # Persist the rename itself
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return data_offset + size
+
+
+def read_snapshot(path: str) -> Snapshot:
+    """Metadata and zero-copy array views of the snapshot at path
+
+    Raises FileNotFoundError when there is none and SnapshotError when it is
+    unusable (the caller rebuilds it).
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size:
+            raise SnapshotError(f"{path}: truncated header")
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, metadata_length, data_offset = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise SnapshotError(f"{path}: not a snapshot file")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"{path}: snapshot version {version} != {SNAPSHOT_VERSION}")
+    try:
+        metadata = json.loads(bytes(buffer[HEADER.size:HEADER.size + metadata_length]))
+        arrays = {}
+        for name, spec in metadata.pop('arrays').items():
+            dtype = np.dtype(spec['dtype'])
+            offset = data_offset + spec['offset']
+            if offset + spec['count'] * dtype.itemsize > size:
+                raise SnapshotError(f"{path}: array {name!r} extends past the end of the file")
+            arrays[name] = np.frombuffer(buffer, dtype=dtype, count=spec['count'], offset=offset)
+    except SnapshotError:
+        raise
+    except (ValueError, KeyError, TypeError) as e:
+        raise SnapshotError(f"{path}: corrupt metadata ({e})") from e
+    return Snapshot(metadata, arrays)
+
+
+class Checkpointer:
+    """Writes capture()'s snapshot to path every interval seconds, when it changed
+
+    capture() returns (revision, metadata, arrays), or None while there is
+    nothing to save; a snapshot is written only when its revision differs from
+    the last one written (or restored, by setting .revision).
+    """
+
+    def __init__(self, path: str, capture, interval: float = 300.0):
+        self.path = path
+        self.capture = capture
+        self.interval = interval
+        self.revision = None
+        self.saved_at = None
+        self._lock = threading.Lock()  # one capture/write at a time
+        self._stop = threading.Event()
+        self._thread = None
+
+    def save(self, force: bool = False) -> bool:
+        """Write a snapshot now if the state changed since the last one; True if written"""
+        with self._lock:
+            captured = self.capture()
+            if captured is None:
+                return False
+            revision, metadata, arrays = captured
+            if revision == self.revision and not force:
+                return False
+            write_snapshot(self.path, {**metadata, 'saved_at': time.time()}, arrays)
+            self.revision, self.saved_at = revision, time.time()
+            return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.save()
+            except Exception as e:
+                print(f"Snapshot to {self.path} failed: {e}")
+
+    def start(self):
+        """Save periodically in a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='checkpoint', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -1,40 +1,34 @@
-import numpy as np
-import pandas as pd
-import requests
 from datetime import datetime, timedelta
 import json
 
+from lazy_imports import lazy_import
+from indicators import Pipeline, trend_stages
+from price_sources import CoinGeckoSource
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
 def get_coingecko_historical_data(days=365):
     """Fetch historical BTC/USD data from CoinGecko API as fallback."""
-    url = f"https://api.coingecko.com/api/v3/coins/bitcoin/market_chart?vs_currency=usd&days={days}&interval=daily"
-    response = requests.get(url)
-    if response.status_code != 200:
-        raise ValueError(f"Failed to fetch data: {response.status_code}")
-    data = response.json()
-    prices = data['prices']
-    df = pd.DataFrame(prices, columns=['timestamp', 'price'])
-    df['date'] = pd.to_datetime(df['timestamp'], unit='ms').dt.date
-    df = df.set_index('date')
-    df = df.sort_index(ascending=False)  # Recent first
-    return df
+    return CoinGeckoSource(timeout=30).fetch(days)
 
 def compute_trend_indicator(df, short_window=20, long_window=100):
     """Compute a simplified trend indicator based on moving averages."""
     close = df['price'].values
+    stages = trend_stages(short_window, long_window)
     
-    # Calculate short and long moving averages
-    short_ma = pd.Series(close).rolling(short_window, min_periods=1).mean()
-    long_ma = pd.Series(close).rolling(long_window, min_periods=1).mean()
+    # Only the positions read below (and the windows behind them) are computed
+    pipeline = Pipeline(price=close)
     
-    # Calculate trend strength
-    trend_ratio = short_ma / long_ma
+    # Trend strength: short over long moving average
+    trend_ratio = pipeline.at(stages['trend_ratio'], 0)
     
-    # Calculate volatility-adjusted trend
-    returns = pd.Series(close).pct_change().dropna()
-    volatility = returns.rolling(20, min_periods=1).std()
+    # Volatility of the returns close[1:] / close[:-1] - 1 up to the first one,
+    # which is position 1 of the pct_change series
+    volatility = pipeline.at(stages['volatility'], 1)
     
     # Weight the trend by volatility
-    trend_value = trend_ratio.iloc[0] * (1 + volatility.iloc[0] if not pd.isna(volatility.iloc[0]) else 1)
+    trend_value = trend_ratio * (1 + volatility if not np.isnan(volatility) else 1)
     
     # Scale to current price
     current_price = close[0]
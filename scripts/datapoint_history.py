@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Batched datapoint history reader for the SBTC Oracle
+Reads the DatapointHistory ring buffer with a single account fetch. Legacy
+per-account Datapoints are enumerated once, fetched 100 at a time through
+getMultipleAccounts, decoded vectorized into a columnar table and cached
+locally by slot so repeated reads only fetch new accounts
+"""
+
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from typing import List, Optional
+
+from lazy_imports import lazy_import
+from solana_rpc import (
+    DATAPOINT_ACCOUNT_SIZE, DATAPOINT_DISCRIMINATOR, DATAPOINT_HISTORY_DISCRIMINATOR, HISTORY_ACCOUNT_SIZE,
+    HISTORY_CAPACITY, HISTORY_HEADER_LAYOUT, PROGRAM_ID, SolanaRpcClient, get_history_address,
+)
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+# getMultipleAccounts accepts at most 100 pubkeys per request
+MAX_ACCOUNTS_PER_REQUEST = 100
+
+# Packed on-chain layout of a Datapoint account (no alignment padding)
+DATAPOINT_FIELDS = [
+    ('discriminator', '<u8'),
+    ('timestamp', '<i8'),
+    ('sbtc_value', '<u8'),
+    ('btc_price', '<u8'),
+    ('data_points_used', '<u4'),
+]
+
+# repr(C) DatapointSlot inside the zero-copy DatapointHistory account
+HISTORY_SLOT_FIELDS = [
+    ('timestamp', '<i8'),
+    ('sbtc_value', '<u8'),
+    ('btc_price', '<u8'),
+    ('data_points_used', '<u4'),
+    ('padding', '<u4'),
+]
+
+
+@lru_cache(maxsize=None)
+def datapoint_dtype():
+    """numpy dtype of DATAPOINT_FIELDS, built on first use so importing stays numpy-free"""
+    dtype = np.dtype(DATAPOINT_FIELDS)
+    assert dtype.itemsize == DATAPOINT_ACCOUNT_SIZE
+    return dtype
+
+
+@lru_cache(maxsize=None)
+def history_slot_dtype():
+    """numpy dtype of HISTORY_SLOT_FIELDS"""
+    dtype = np.dtype(HISTORY_SLOT_FIELDS)
+    assert HISTORY_ACCOUNT_SIZE == 8 + HISTORY_HEADER_LAYOUT.size + HISTORY_CAPACITY * dtype.itemsize
+    return dtype
+
+HISTORY_COLUMNS = ['address', 'timestamp', 'sbtc_value', 'btc_price', 'data_points_used', 'slot']
+
+
+def decode_datapoints(addresses: List[str], blobs: List[bytes], slot: int) -> pd.DataFrame:
+    """Decode raw Datapoint account data in one numpy pass into a columnar table"""
+    if not blobs:
+        return empty_history()
+    records = np.frombuffer(b"".join(blob[:DATAPOINT_ACCOUNT_SIZE] for blob in blobs), dtype=datapoint_dtype())
+    valid = records['discriminator'] == int.from_bytes(DATAPOINT_DISCRIMINATOR, 'little')
+    return pd.DataFrame({
+        'address': np.asarray(addresses, dtype=object)[valid],
+        'timestamp': records['timestamp'][valid],
+        'sbtc_value': records['sbtc_value'][valid],
+        'btc_price': records['btc_price'][valid],
+        'data_points_used': records['data_points_used'][valid],
+        'slot': np.full(int(valid.sum()), slot, dtype=np.int64),
+    })
+
+
+def decode_history_account(address: str, data: bytes, slot: int) -> pd.DataFrame:
+    """Unroll the ring buffer (oldest first) into the same columnar layout"""
+    if len(data) < HISTORY_ACCOUNT_SIZE or data[:8] != DATAPOINT_HISTORY_DISCRIMINATOR:
+        raise ValueError("Account data is not a DatapointHistory")
+    _, head, count = HISTORY_HEADER_LAYOUT.unpack_from(data, 8)
+    slots = np.frombuffer(data, dtype=history_slot_dtype(), count=HISTORY_CAPACITY,
+                          offset=8 + HISTORY_HEADER_LAYOUT.size)
+    ordered = slots[(head - count + np.arange(count)) % HISTORY_CAPACITY]
+    return pd.DataFrame({
+        'address': np.full(count, address, dtype=object),
+        'timestamp': ordered['timestamp'],
+        'sbtc_value': ordered['sbtc_value'],
+        'btc_price': ordered['btc_price'],
+        'data_points_used': ordered['data_points_used'],
+        'slot': np.full(count, slot, dtype=np.int64),
+    })
+
+
+def empty_history() -> pd.DataFrame:
+    return pd.DataFrame({
+        'address': pd.Series(dtype=object),
+        'timestamp': pd.Series(dtype=np.int64),
+        'sbtc_value': pd.Series(dtype=np.uint64),
+        'btc_price': pd.Series(dtype=np.uint64),
+        'data_points_used': pd.Series(dtype=np.uint32),
+        'slot': pd.Series(dtype=np.int64),
+    })
+
+
+class DatapointHistoryReader:
+    """Client-side reader for the full Datapoint history of the sma_oracle program"""
+
+    def __init__(self, rpc: SolanaRpcClient, program_id: str = PROGRAM_ID, cache_path: Optional[str] = None):
+        self.rpc = rpc
+        self.program_id = program_id
+        self.cache_path = os.path.expanduser(cache_path) if cache_path else None
+        self.table = self._load_cache()
+
+    def _load_cache(self) -> pd.DataFrame:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return empty_history()
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as cache:
+                columns = {name: cache[name] for name in HISTORY_COLUMNS}
+            columns['address'] = columns['address'].astype(object)
+            return pd.DataFrame(columns)
+        except Exception as e:
+            print(f"Ignoring unreadable datapoint cache {self.cache_path}: {e}")
+            return empty_history()
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **{name: (self.table[name].to_numpy(dtype=str) if name == 'address'
+                                  else self.table[name].to_numpy()) for name in HISTORY_COLUMNS})
+        os.replace(tmp_path, self.cache_path)
+
+    def fetch_accounts(self, addresses: List[str]) -> pd.DataFrame:
+        """Fetch and decode the given Datapoint accounts, 100 per RPC call"""
+        frames = []
+        for i in range(0, len(addresses), MAX_ACCOUNTS_PER_REQUEST):
+            chunk = addresses[i:i + MAX_ACCOUNTS_PER_REQUEST]
+            accounts = self.rpc.get_multiple_accounts(chunk)
+            found = [(address, account['data']) for address, account in zip(chunk, accounts)
+                     if account is not None and account['owner'] == self.program_id]
+            if found:
+                frames.append(decode_datapoints([a for a, _ in found], [d for _, d in found],
+                                                self.rpc.last_context_slot or 0))
+        if not frames:
+            return empty_history()
+        return pd.concat(frames, ignore_index=True)
+
+    def refresh(self, addresses: Optional[List[str]] = None) -> pd.DataFrame:
+        """Sync the local table with the chain and return it sorted by timestamp
+
+        Datapoint accounts are written once by store_datapoint, so cached rows
+        never need refetching: only addresses missing from the cache are read.
+        """
+        if addresses is None:
+            addresses = self.rpc.get_datapoint_addresses(self.program_id)
+            # Drop cached rows whose accounts no longer exist on-chain
+            listed = self.table['address'].isin(addresses)
+            if not listed.all():
+                self.table = self.table[listed].reset_index(drop=True)
+                self._save_cache()
+        known = set(self.table['address'])
+        new_addresses = [address for address in addresses if address not in known]
+        if new_addresses:
+            fetched = self.fetch_accounts(new_addresses)
+            if len(fetched):
+                self.table = pd.concat([self.table, fetched], ignore_index=True) if len(self.table) else fetched
+            self.table = self.table.sort_values('timestamp', kind='stable').reset_index(drop=True)
+            self._save_cache()
+        return self.table
+
+    def read_ring_buffer(self) -> pd.DataFrame:
+        """Whole DatapointHistory ring buffer with one getAccountInfo call"""
+        address = get_history_address(self.program_id)
+        account = self.rpc.get_account_info(address)
+        if account is None:
+            return empty_history()
+        return decode_history_account(address, account['data'], self.rpc.last_context_slot or 0)
+
+    def read_range(self, start_timestamp: int, end_timestamp: int, refresh: bool = True,
+                   include_legacy: bool = False) -> pd.DataFrame:
+        """Datapoints with start_timestamp <= timestamp <= end_timestamp, oldest first
+
+        Reads the ring buffer; include_legacy merges in per-account Datapoints
+        created before the ring buffer existed.
+        """
+        table = self.read_ring_buffer()
+        if include_legacy:
+            legacy = self.refresh() if refresh else self.table
+            if len(legacy):
+                table = pd.concat([legacy, table], ignore_index=True) if len(table) else legacy
+                table = table.sort_values('timestamp', kind='stable').reset_index(drop=True)
+        timestamps = table['timestamp'].to_numpy()
+        lo = np.searchsorted(timestamps, start_timestamp, side='left')
+        hi = np.searchsorted(timestamps, end_timestamp, side='right')
+        return table.iloc[lo:hi].reset_index(drop=True)
+
+    @property
+    def cached_slot(self) -> int:
+        """Highest slot at which any cached row was observed"""
+        return int(self.table['slot'].max()) if len(self.table) else 0
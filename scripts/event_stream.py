@@ -0,0 +1,132 @@
+"""
+Server-Sent Events push channel for the SBTC Oracle API
+Recent events live in one ring buffer (shared_state.EventRing) in shared
+memory, so an event published by any gunicorn worker reaches the subscribers
+of every worker, and a client can resume on another worker. Each reader keeps
+only a cursor; in each process one watcher thread polls the shared sequence
+counter and wakes the local readers, so idle subscribers cost a blocked
+thread (or greenlet) and no per-subscriber queue
+"""
+
+import json
+import os
+import threading
+import time
+
+from shared_state import EventRing
+
+
+class EventBroadcaster:
+    """Fan-out of JSON events to any number of SSE subscribers
+
+    Events carry increasing sequence ids, sent as "<epoch>-<seq>" in the SSE
+    `id:` field so reconnecting clients resume via Last-Event-ID, or from a
+    Unix timestamp with since=. An id from another ring (e.g. before a
+    restart) is answered with a reset and a replay of every retained event.
+    """
+
+    def __init__(self, capacity: int = 1024, heartbeat_interval: float = 15.0, ring: EventRing = None,
+                 poll_interval: float = 0.05):
+        self.ring = ring if ring is not None else EventRing(capacity)
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self._cond = threading.Condition()
+        self._watcher_pid = None
+        self.subscribers = 0
+
+    @property
+    def last_id(self) -> int:
+        return self.ring.last_id
+
+    def event_id(self, seq: int) -> str:
+        """SSE id of sequence id seq"""
+        return f"{self.ring.epoch:x}-{seq}"
+
+    def parse_event_id(self, value: str):
+        """Sequence id of an SSE id from this ring, or None"""
+        epoch, _, seq = str(value).partition('-')
+        try:
+            if int(epoch, 16) == self.ring.epoch and 0 <= int(seq) <= self.ring.last_id:
+                return int(seq)
+        except ValueError:
+            pass
+        return None
+
+    def publish(self, event: str, data: dict, timestamp: int = None) -> int:
+        timestamp = int(time.time()) if timestamp is None else int(timestamp)
+        seq = self.ring.append(event, timestamp, json.dumps(data, separators=(',', ':')).encode())
+        with self._cond:
+            self._cond.notify_all()
+        return seq
+
+    def cursor_for_timestamp(self, since: int) -> int:
+        return self.ring.cursor_for_timestamp(since)
+
+    def _watch(self):
+        """Wake local readers when another process publishes; exits with the last subscriber"""
+        seen = self.ring.last_id
+        while True:
+            with self._cond:
+                if self.subscribers == 0 or self._watcher_pid != os.getpid():
+                    self._watcher_pid = None
+                    return
+                last = self.ring.last_id
+                if last != seen:
+                    seen = last
+                    self._cond.notify_all()
+            time.sleep(self.poll_interval)
+
+    def _subscribe(self):
+        with self._cond:
+            self.subscribers += 1
+            # Threads do not survive a fork: each process runs its own watcher
+            if self._watcher_pid != os.getpid():
+                self._watcher_pid = os.getpid()
+                threading.Thread(target=self._watch, name='event-watcher', daemon=True).start()
+
+    def stream(self, last_event_id: str = None, since: int = None, max_events: int = None):
+        """Generator of SSE-formatted messages, starting after the resume point
+
+        Without a resume point only new events are sent. A `reset` event tells
+        the client its resume point fell out of the buffer (or is unknown) and
+        it should refetch (e.g. via /datapoints/batch) before continuing.
+        """
+        unknown = False
+        if last_event_id is not None:
+            cursor = self.parse_event_id(last_event_id)
+            unknown = cursor is None
+            cursor = cursor or 0
+        elif since is not None:
+            cursor = self.cursor_for_timestamp(since)
+        else:
+            cursor = self.last_id
+        sent = 0
+        self._subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while max_events is None or sent < max_events:
+                events, complete = self.ring.after(cursor)
+                if not events and not unknown:
+                    with self._cond:
+                        self._cond.wait_for(lambda: self.ring.last_id > cursor, timeout=self.heartbeat_interval)
+                    events, complete = self.ring.after(cursor)
+                messages = []
+                if unknown or not complete:
+                    oldest = events[0] if events else None
+                    cursor = oldest.seq - 1 if oldest else cursor
+                    reset = {'oldest_timestamp': oldest.timestamp if oldest else None}
+                    messages.append((cursor, 'reset', json.dumps(reset)))
+                    unknown = False
+                messages += [(e.seq, e.event, e.payload.decode()) for e in events]
+                if not messages:
+                    yield ": keep-alive\n\n"
+                    continue
+                for seq, event, payload in messages:
+                    yield f"id: {self.event_id(seq)}\nevent: {event}\ndata: {payload}\n\n"
+                    cursor = max(cursor, seq)
+                    sent += 1
+                    if max_events is not None and sent >= max_events:
+                        break
+        finally:
+            with self._cond:
+                self.subscribers -= 1
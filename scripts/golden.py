@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Golden-output regression suite for the SBTC computation
+golden_data/sbtc_golden.npz records price histories (generated once from fixed
+seeds, then stored, so the inputs never depend on RNG stability) together with
+the regression curve (plr) and published curve (final_plr) the production
+implementation produced for each parameter profile. Every backend registered
+with @backend is compared against it with a tolerance-aware comparator. The
+`loop` backend reproduces the baseline pandas computation, so a re-recorded
+file is still checked against the original algorithm:
+
+    python golden.py                   # check every backend
+    python golden.py --backend loop    # check the baseline pandas reference only
+    python golden.py --record          # re-record after an intended change
+
+A backend takes (prices recent first, parameters) and returns a dict with the
+stages it computes ('plr' and/or 'final_plr'), aligned with the prices.
+"""
+
+import argparse
+import json
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from lazy_imports import lazy_import
+import powerlaw
+from indicators import Pipeline, StreamingPipeline, sbtc_stages
+from powerlaw import regression_series, regression_source, validate_prices
+from profiles import BUILTIN_PROFILES, resolve_profile
+from sbtc_compute import compute_sbtc_series, weighted_ridge_powerlaw
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden_data', 'sbtc_golden.npz')
+GOLDEN_VERSION = 1
+GOLDEN_DAYS = 1100
+STAGES = ('plr', 'final_plr')
+# Relative tolerance: reassociating the regression sums moves the fit by up to ~3e-6
+# (lambda_=50, length=1000); 1e-5 is about $0.50 on a $50,000 target
+GOLDEN_RTOL = 1e-5
+
+GOLDEN_PROFILES = {
+    'adjusted': BUILTIN_PROFILES['adjusted'],
+    'default': BUILTIN_PROFILES['default'],
+    # Short windows let price gaps reach the regression and the dampening clamp often
+    'short': {'length': 120, 'lambda_': 5, 'time_weight_power': 1.0, 'vol_weight_power': 1.0, 'vol_length': 5,
+              'input_smooth_length': 3, 'output_smooth_length': 20, 'k': 0.05, 'stdev_length': 60},
+}
+
+
+def walk_case(seed, days=GOLDEN_DAYS):
+    """Log-normal random walk, recent first"""
+    rng = np.random.default_rng(seed)
+    return 30000.0 * np.exp(np.cumsum(rng.normal(0.001, 0.03, days)))[::-1]
+
+
+def gaps_case(seed, days=GOLDEN_DAYS):
+    """Random walk with missing, zero, negative and infinite prices"""
+    prices = walk_case(seed, days)
+    rng = np.random.default_rng(seed + 1)
+    prices[rng.choice(days, 25, replace=False)] = np.nan
+    prices[300:312] = np.nan
+    prices[[40, 700]] = 0.0
+    prices[[41, 950]] = -5.0
+    prices[500] = np.inf
+    return prices
+
+
+def crash_case(seed, days=GOLDEN_DAYS):
+    """Heavy-tailed returns, a 70% crash and recovery, and a flat stretch"""
+    rng = np.random.default_rng(seed)
+    returns = 0.02 * rng.standard_t(3, days)
+    returns[400:460] -= 0.02
+    returns[460:600] += 0.008
+    returns[800:900] = 0.0
+    return 30000.0 * np.exp(np.cumsum(returns))[::-1]
+
+
+GOLDEN_CASES = {
+    'walk': (walk_case, 11),
+    'gaps': (gaps_case, 12),
+    'crash': (crash_case, 13),
+}
+
+BACKENDS = {}
+
+
+def backend(name, slow=False):
+    """Register fn(prices, params) -> {stage: array} as a backend checked against the golden file"""
+    def register(fn):
+        fn.slow = slow
+        BACKENDS[name] = fn
+        return fn
+    return register
+
+
+@backend('vectorized')
+def vectorized_backend(prices, params):
+    """The production path: powerlaw kernels and compute_sbtc_series"""
+    close, _ = validate_prices(prices)
+    _, vol, smoothed_close = regression_source(close, params['vol_length'], params['input_smooth_length'])
+    plr = regression_series(smoothed_close, vol, params['length'], params['time_weight_power'],
+                            params['vol_weight_power'], params['lambda_'])
+    return {'plr': plr, 'final_plr': compute_sbtc_series(pd.DataFrame({'price': prices}), **params)}
+
+
+@contextmanager
+def regression_block(size):
+    original = powerlaw.REGRESSION_BLOCK
+    powerlaw.REGRESSION_BLOCK = size
+    try:
+        yield
+    finally:
+        powerlaw.REGRESSION_BLOCK = original
+
+
+@backend('small-blocks')
+def small_blocks_backend(prices, params):
+    """The production path with block boundaries every 97 windows"""
+    with regression_block(97):
+        return vectorized_backend(prices, params)
+
+
+def loop_series(close, length, lambda_, time_weight_power, vol_weight_power, vol_length,
+                input_smooth_length, output_smooth_length, k, stdev_length, with_plr=False):
+    """The baseline computation: pandas rolling statistics, a per-window regression loop and
+    NaN-branching dampening (close already validated)"""
+    log_return = np.diff(np.log(close), prepend=np.nan)
+    vol = pd.Series(log_return).rolling(vol_length, min_periods=1).std(ddof=0).values
+    smoothed_close = pd.Series(close).rolling(input_smooth_length, min_periods=1).mean().values
+    plr = np.full(len(close), np.nan)
+    for i in range(length - 1, len(close)):
+        plr[i] = weighted_ridge_powerlaw(smoothed_close[i - length + 1:i + 1], vol[i - length + 1:i + 1],
+                                         length, 0, time_weight_power, vol_weight_power, lambda_)
+    smoothed_plr = pd.Series(plr).rolling(output_smooth_length, min_periods=1).mean().values
+    final_plr = np.full(len(close), np.nan)
+    threshold = k * pd.Series(log_return).rolling(stdev_length, min_periods=1).std(ddof=0).values
+    for i in range(len(close)):
+        if i == 0 or np.isnan(final_plr[i - 1]):
+            final_plr[i] = smoothed_plr[i]
+        else:
+            deviation_rel = np.log(smoothed_plr[i] / final_plr[i - 1])
+            if np.isnan(deviation_rel) or np.isnan(threshold[i]):
+                final_plr[i] = final_plr[i - 1]
+            else:
+                final_plr[i] = final_plr[i - 1] * np.exp(np.clip(deviation_rel, -threshold[i], threshold[i]))
+    return (plr, final_plr) if with_plr else final_plr
+
+
+@backend('loop', slow=True)
+def loop_backend(prices, params):
+    """Reference: the baseline pandas implementation, after price validation (seconds per case)"""
+    close, _ = validate_prices(prices)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plr, final_plr = loop_series(close, with_plr=True, **params)
+    return {'plr': plr, 'final_plr': final_plr}
+
+
+@backend('pipeline')
+def pipeline_backend(prices, params):
+    """The indicator pipeline (indicators.py) in batch mode"""
+    return Pipeline(price=prices).evaluate(sbtc_stages(**params))
+
+
+@backend('pipeline-stream')
+def pipeline_stream_backend(prices, params):
+    """The indicator pipeline fed one price at a time"""
+    stream = StreamingPipeline(sbtc_stages(**params))
+    rows = [stream.push(price=price) for price in prices]
+    return {stage: np.array([row[stage] for row in rows]) for stage in STAGES}
+
+
+def compare(actual, expected, rtol=GOLDEN_RTOL, atol=0.0):
+    """Compare a curve with its golden values: NaN positions must match exactly, values within rtol"""
+    actual = np.asarray(actual, dtype=float)
+    expected = np.asarray(expected, dtype=float)
+    if actual.shape != expected.shape:
+        return {'ok': False, 'error': f"shape {actual.shape} != {expected.shape}"}
+    nan_mismatches = np.flatnonzero(np.isnan(actual) != np.isnan(expected))
+    both = ~np.isnan(actual) & ~np.isnan(expected)
+    error = np.abs(actual[both] - expected[both])
+    relative = error / np.maximum(np.abs(expected[both]), np.finfo(float).tiny)
+    bad = np.flatnonzero(both)[error > atol + rtol * np.abs(expected[both])]
+    worst = int(np.flatnonzero(both)[np.argmax(relative)]) if len(relative) else None
+    return {
+        'ok': len(nan_mismatches) == 0 and len(bad) == 0,
+        'compared': int(both.sum()),
+        'nan_mismatches': nan_mismatches[:10].tolist(),
+        'mismatches': int(len(bad)),
+        'first_mismatch': int(bad[0]) if len(bad) else None,
+        'max_rel_error': float(relative.max()) if len(relative) else 0.0,
+        'worst_index': worst,
+    }
+
+
+def load_golden(path=GOLDEN_PATH):
+    """(metadata, {key: array}) from a golden file"""
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+    metadata = json.loads(str(arrays.pop('metadata')))
+    if metadata.get('version') != GOLDEN_VERSION:
+        raise ValueError(f"golden file version {metadata.get('version')} != {GOLDEN_VERSION}")
+    return metadata, arrays
+
+
+def record(path=GOLDEN_PATH, backend_name='vectorized'):
+    """Write the golden file from the given backend (the production path by default)"""
+    metadata = {'version': GOLDEN_VERSION, 'recorded_at': datetime.now(timezone.utc).isoformat(),
+                'backend': backend_name, 'numpy': np.__version__, 'cases': {}, 'profiles': {}}
+    arrays = {}
+    for case, (generate, seed) in GOLDEN_CASES.items():
+        prices = generate(seed)
+        arrays[f"{case}/prices"] = prices
+        metadata['cases'][case] = {'generator': generate.__name__, 'seed': seed, 'days': len(prices)}
+        for profile, settings in GOLDEN_PROFILES.items():
+            params = resolve_profile(settings, len(prices))
+            metadata['profiles'].setdefault(profile, params)
+            for stage, curve in BACKENDS[backend_name](prices, params).items():
+                arrays[f"{case}/{profile}/{stage}"] = np.asarray(curve, dtype=float)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez_compressed(path, metadata=np.array(json.dumps(metadata, sort_keys=True)), **arrays)
+    return metadata
+
+
+def check(backends=None, cases=None, profiles=None, path=GOLDEN_PATH, rtol=GOLDEN_RTOL):
+    """Compare backends with the golden file; one result dict per (backend, case, profile, stage)"""
+    metadata, arrays = load_golden(path)
+    results = []
+    for name in backends or BACKENDS:
+        for case in cases or metadata['cases']:
+            prices = arrays[f"{case}/prices"]
+            for profile in profiles or metadata['profiles']:
+                curves = BACKENDS[name](prices.copy(), metadata['profiles'][profile])
+                for stage, curve in curves.items():
+                    expected = arrays.get(f"{case}/{profile}/{stage}")
+                    if expected is None:
+                        continue
+                    results.append({'backend': name, 'case': case, 'profile': profile, 'stage': stage,
+                                    **compare(curve, expected, rtol)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check SBTC backends against the golden outputs")
+    parser.add_argument('--record', action='store_true', help="Re-record the golden file from the production path")
+    parser.add_argument('--backend', action='append', choices=sorted(BACKENDS), help="Backend(s) to check")
+    parser.add_argument('--path', default=GOLDEN_PATH)
+    parser.add_argument('--rtol', type=float, default=GOLDEN_RTOL)
+    args = parser.parse_args()
+
+    if args.record:
+        metadata = record(args.path)
+        print(f"Recorded {len(metadata['cases'])} cases x {len(metadata['profiles'])} profiles -> {args.path}")
+        return
+    results = check(args.backend, path=args.path, rtol=args.rtol)
+    for r in results:
+        status = '✅' if r['ok'] else '❌'
+        print(f"{status} {r['backend']:<13} {r['case']:<6} {r['profile']:<9} {r['stage']:<9} "
+              f"max rel error {r['max_rel_error']:.2e}  mismatches {r['mismatches']}  "
+              f"NaN mismatches {r['nan_mismatches']}")
+    sys.exit(0 if all(r['ok'] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
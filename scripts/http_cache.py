@@ -0,0 +1,69 @@
+"""
+HTTP caching helpers for the SBTC Oracle API
+Strong ETags, Last-Modified and Cache-Control aligned with the daily close,
+with conditional requests answered before any computation happens
+"""
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from flask import Response, request
+
+# Daily bars close at 00:00 UTC
+DAILY_CLOSE_HOUR_UTC = 0
+
+
+def last_daily_close(now=None) -> datetime:
+    """Most recent daily close at or before now (UTC)"""
+    now = now or datetime.now(timezone.utc)
+    close = now.replace(hour=DAILY_CLOSE_HOUR_UTC, minute=0, second=0, microsecond=0)
+    if close > now:
+        close -= timedelta(days=1)
+    return close
+
+
+def next_daily_close(now=None) -> datetime:
+    return last_daily_close(now) + timedelta(days=1)
+
+
+def last_bar_date(now=None):
+    """Date of the latest completed daily bar"""
+    return (last_daily_close(now) - timedelta(days=1)).date()
+
+
+def seconds_until_next_close(now=None) -> int:
+    now = now or datetime.now(timezone.utc)
+    return max(int((next_daily_close(now) - now).total_seconds()), 1)
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag (unquoted) from the values that determine a representation"""
+    return hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()[:32]
+
+
+def cache_headers(etag, last_modified=None, max_age=None) -> dict:
+    """Validator and freshness headers; without max_age caches must revalidate every time"""
+    headers = {'ETag': f'"{etag}"'}
+    if last_modified is not None:
+        headers['Last-Modified'] = last_modified.strftime('%a, %d %b %Y %H:%M:%S GMT')
+    if max_age is None:
+        headers['Cache-Control'] = 'no-cache'
+    else:
+        headers['Cache-Control'] = f'public, max-age={max_age}, must-revalidate'
+    return headers
+
+
+def is_not_modified(etag, last_modified=None) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since for a GET"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def not_modified(headers) -> Response:
+    response = Response(status=304)
+    response.headers.update(headers)
+    response.vary.add('Accept')
+    return response
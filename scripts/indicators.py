@@ -0,0 +1,375 @@
+"""
+Composable indicator pipeline for the SBTC and trend indicators
+An indicator is a graph of stages (SMA, rolling std, returns, ratio,
+power-law regression, dampening) over named source series. Each stage
+declares its lookback: output position i needs input positions
+i - lookback + 1 .. i (all earlier positions for lookback None).
+
+Pipeline evaluates a graph in batch over the sources, lazily: a query for a
+few positions computes every stage only over the positions they depend on,
+and equal stages (same type, parameters and inputs) are computed once and
+shared by every indicator that uses them. StreamingPipeline evaluates the
+same graph one position at a time with O(window) state per stage:
+
+    close = Source('price')
+    ratio = SMA(close, 20) / SMA(close, 100)
+    Pipeline(price=prices).at(ratio, 0)
+
+    stream = StreamingPipeline({'ratio': ratio})
+    for price in prices:
+        stream.push(price=price)['ratio']
+"""
+
+import math
+from collections import deque
+from typing import Dict, Optional
+
+from lazy_imports import lazy_import
+from powerlaw import (
+    dampen, dampen_step, regression_inputs, regression_series, regression_sums, ridge_fit, validate_prices,
+    weight_table,
+)
+from rolling_stats import RollingWindow, rolling_mean, rolling_std
+
+np = lazy_import('numpy')
+
+
+class Stage:
+    """Node of an indicator graph; subclasses implement compute (batch) and streamer (streaming)"""
+
+    # Input positions each output position depends on (None: every earlier position)
+    lookback: Optional[int] = 1
+
+    def __init__(self, *inputs, **params):
+        self.inputs = inputs
+        self.params = params
+        self.key = (type(self).__name__, tuple(stage.key for stage in inputs), tuple(sorted(params.items())))
+
+    def compute(self, *arrays):
+        """Outputs over the positions of the (equally long, aligned) input arrays"""
+        raise NotImplementedError
+
+    def streamer(self):
+        """Callable taking one value per input and returning the output at the new position"""
+        raise NotImplementedError
+
+    def __truediv__(self, other):
+        return Ratio(self, other)
+
+    def __mul__(self, other):
+        return Product(self, other) if isinstance(other, Stage) else Scale(self, factor=float(other))
+
+    __rmul__ = __mul__
+
+    def __repr__(self):
+        params = ', '.join(f"{name}={value}" for name, value in self.params.items())
+        return f"{type(self).__name__}({', '.join(map(repr, self.inputs))}{', ' if params else ''}{params})"
+
+
+class Source(Stage):
+    """A named input series"""
+
+    def __init__(self, name: str):
+        super().__init__(name=name)
+        self.name = name
+
+    def __repr__(self):
+        return f"Source({self.name!r})"
+
+
+class Validated(Stage):
+    """Prices with NaN, infinite and non-positive values flagged as NaN"""
+
+    def compute(self, x):
+        return validate_prices(x)[0]
+
+    def streamer(self):
+        return lambda x: x if math.isfinite(x) and x > 0 else math.nan
+
+
+class PctChange(Stage):
+    """x[i] / x[i-1] - 1"""
+
+    lookback = 2
+
+    def compute(self, x):
+        out = np.full(len(x), np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[1:] = x[1:] / x[:-1] - 1
+        return out
+
+    def streamer(self):
+        previous = [math.nan]
+
+        def push(x):
+            out = x / previous[0] - 1 if previous[0] else math.nan
+            previous[0] = x
+            return out
+
+        return push
+
+
+class LogReturn(Stage):
+    """log x[i] - log x[i-1]"""
+
+    lookback = 2
+
+    def compute(self, x):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.diff(np.log(x), prepend=np.nan)
+
+    def streamer(self):
+        previous = [math.nan]
+
+        def push(x):
+            log_x = math.log(x) if x > 0 else math.nan
+            out = log_x - previous[0]
+            previous[0] = log_x
+            return out
+
+        return push
+
+
+class SMA(Stage):
+    """Mean of the trailing window (NaN values skipped)"""
+
+    def __init__(self, src: Stage, window: int, min_periods: int = 1):
+        super().__init__(src, window=window, min_periods=min_periods)
+        self.lookback = window
+
+    def compute(self, x):
+        return rolling_mean(x, self.params['window'], self.params['min_periods'])
+
+    def streamer(self):
+        window = RollingWindow(self.params['window'], min_periods=self.params['min_periods'])
+
+        def push(x):
+            window.push(x)
+            return window.mean
+
+        return push
+
+
+class RollingStd(Stage):
+    """Standard deviation of the trailing window (NaN values skipped)"""
+
+    def __init__(self, src: Stage, window: int, ddof: int = 0, min_periods: int = 1):
+        super().__init__(src, window=window, ddof=ddof, min_periods=min_periods)
+        self.lookback = window
+
+    def compute(self, x):
+        return rolling_std(x, self.params['window'], self.params['ddof'], self.params['min_periods'])
+
+    def streamer(self):
+        window = RollingWindow(self.params['window'], self.params['ddof'], self.params['min_periods'])
+
+        def push(x):
+            window.push(x)
+            return window.std
+
+        return push
+
+
+class Ratio(Stage):
+    def compute(self, a, b):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return a / b
+
+    def streamer(self):
+        return lambda a, b: a / b if b else math.nan
+
+
+class Product(Stage):
+    def compute(self, a, b):
+        return a * b
+
+    def streamer(self):
+        return lambda a, b: a * b
+
+
+class Scale(Stage):
+    def compute(self, x):
+        return x * self.params['factor']
+
+    def streamer(self):
+        factor = self.params['factor']
+        return lambda x: x * factor
+
+
+class Regression(Stage):
+    """Weighted ridge power-law fit of each trailing window of src, weighted by 1/vol (powerlaw kernels)"""
+
+    def __init__(self, src: Stage, vol: Stage, length: int, time_weight_power: float, vol_weight_power: float,
+                 lambda_: float):
+        super().__init__(src, vol, length=length, time_weight_power=time_weight_power,
+                         vol_weight_power=vol_weight_power, lambda_=lambda_)
+        self.lookback = length
+
+    def compute(self, src, vol):
+        p = self.params
+        return regression_series(src, vol, p['length'], p['time_weight_power'], p['vol_weight_power'], p['lambda_'])
+
+    def streamer(self):
+        p = self.params
+        xw = weight_table(p['length'], p['time_weight_power'])
+        window = deque(maxlen=p['length'])
+
+        def push(src, vol):
+            window.append((src, vol))
+            if len(window) < p['length']:
+                return math.nan
+            src_w, vol_w = np.array(window).T
+            valid, log_y, vol_w = regression_inputs(src_w, vol_w, p['vol_weight_power'])
+            sums = regression_sums(log_y, vol_w, xw, None if valid.all() else valid)
+            return float(ridge_fit(sums[:, None], p['lambda_'], p['length'])[0])
+
+        return push
+
+
+class Dampen(Stage):
+    """Steps of src limited to +/- threshold in log terms, held across NaN inputs (path-dependent)"""
+
+    lookback = None
+
+    def compute(self, src, threshold):
+        return dampen(src, threshold)
+
+    def streamer(self):
+        state = {'current': None}
+
+        def push(value, limit):
+            if state['current'] is None:
+                if not math.isnan(value):
+                    state['current'] = value
+                return value
+            if not (math.isnan(value) or math.isnan(limit)):
+                state['current'] = dampen_step(state['current'], value, limit)
+            return state['current']
+
+        return push
+
+
+def topological(stages):
+    """Unique stages (by key) reachable from stages, inputs before the stages that use them"""
+    order, seen = [], set()
+
+    def visit(stage):
+        if stage.key in seen:
+            return
+        seen.add(stage.key)
+        for source in stage.inputs:
+            visit(source)
+        order.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return order
+
+
+class Pipeline:
+    """Batch evaluation of stages over named source series (all the same length)
+
+    Results are cached per stage for the positions computed, so later queries
+    on this pipeline reuse every intermediate they share with earlier ones.
+    """
+
+    def __init__(self, **sources):
+        self.sources = {name: np.asarray(values, dtype=float) for name, values in sources.items()}
+        lengths = {len(values) for values in self.sources.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Source series differ in length: {sorted(lengths)}")
+        self.length = lengths.pop() if lengths else 0
+        self._cache = {}  # stage key -> (start, stop, values)
+        self.computed = 0  # stage evaluations, for inspecting laziness
+
+    def _input_start(self, stage, start):
+        return 0 if stage.lookback is None else max(start - stage.lookback + 1, 0)
+
+    def evaluate(self, outputs: Dict[str, Stage], start: int = 0, stop: Optional[int] = None) -> dict:
+        """{name: values at positions start..stop-1} for each output stage"""
+        stop = self.length if stop is None else min(stop, self.length)
+        start = max(start, 0)
+        order = topological(outputs.values())
+
+        # Positions each stage must provide, from the outputs back to the sources
+        needs = {stage.key: (start, stop) for stage in outputs.values()}
+        for stage in reversed(order):
+            need = needs.get(stage.key)
+            cached = self._cache.get(stage.key)
+            if need is None or (cached and cached[0] <= need[0] and need[1] <= cached[1]):
+                continue
+            if cached:
+                need = needs[stage.key] = (min(need[0], cached[0]), max(need[1], cached[1]))
+            for source in stage.inputs:
+                lo = self._input_start(stage, need[0])
+                previous = needs.get(source.key, (lo, need[1]))
+                needs[source.key] = (min(previous[0], lo), max(previous[1], need[1]))
+
+        for stage in order:
+            need = needs.get(stage.key)
+            cached = self._cache.get(stage.key)
+            if need is None or (cached and cached[0] <= need[0] and need[1] <= cached[1]):
+                continue
+            lo, hi = need
+            if isinstance(stage, Source):
+                values = self.sources[stage.name][lo:hi]
+            else:
+                input_lo = self._input_start(stage, lo)
+                arrays = [self._slice(source, input_lo, hi) for source in stage.inputs]
+                values = np.asarray(stage.compute(*arrays), dtype=float)[lo - input_lo:]
+                self.computed += 1
+            self._cache[stage.key] = (lo, hi, values)
+        return {name: self._slice(stage, start, stop) for name, stage in outputs.items()}
+
+    def _slice(self, stage, start, stop):
+        lo, _, values = self._cache[stage.key]
+        return values[start - lo:stop - lo]
+
+    def series(self, stage: Stage):
+        """Output of one stage at every position"""
+        return self.evaluate({'value': stage})['value']
+
+    def at(self, stage: Stage, index: int) -> float:
+        """Output of one stage at one position, computing only what it depends on"""
+        if not 0 <= index < self.length:
+            return math.nan
+        return float(self.evaluate({'value': stage}, index, index + 1)['value'][0])
+
+
+class StreamingPipeline:
+    """Evaluates output stages one position at a time; shared stages are updated once per push"""
+
+    def __init__(self, outputs: Dict[str, Stage]):
+        self.outputs = outputs
+        self.order = topological(outputs.values())
+        self._streamers = {stage.key: stage.streamer() for stage in self.order if not isinstance(stage, Source)}
+
+    def push(self, **values) -> dict:
+        """Append one value per source; returns each output at the new position"""
+        current = {}
+        for stage in self.order:
+            if isinstance(stage, Source):
+                current[stage.key] = float(values[stage.name])
+            else:
+                current[stage.key] = self._streamers[stage.key](*(current[s.key] for s in stage.inputs))
+        return {name: current[stage.key] for name, stage in self.outputs.items()}
+
+
+def sbtc_stages(length=1000, lambda_=50, time_weight_power=1.5, vol_weight_power=1.5, vol_length=20,
+                input_smooth_length=150, output_smooth_length=1000, k=0.1, stdev_length=1000):
+    """The SBTC computation (compute_sbtc_series) as stages: the regression curve and the dampened curve"""
+    close = Validated(Source('price'))
+    log_return = LogReturn(close)
+    plr = Regression(SMA(close, input_smooth_length), RollingStd(log_return, vol_length),
+                     length, time_weight_power, vol_weight_power, lambda_)
+    final_plr = Dampen(SMA(plr, output_smooth_length), RollingStd(log_return, stdev_length) * k)
+    return {'plr': plr, 'final_plr': final_plr}
+
+
+def trend_stages(short_window=20, long_window=100, vol_window=20):
+    """Moving-average ratio and return volatility behind compute_sma.compute_trend_indicator"""
+    close = Source('price')
+    return {
+        'trend_ratio': SMA(close, short_window) / SMA(close, long_window),
+        'volatility': RollingStd(PctChange(close), vol_window, ddof=1),
+    }
@@ -0,0 +1,247 @@
+"""
+Intraday provisional SBTC target from the Pyth Hermes price stream
+The daily pipeline only sees closed bars. IntradayTarget keeps today's
+provisional close in memory and, on every tick, refits only the latest
+regression window with it and applies one dampening step from the closed-bar
+fit. Everything that depends only on closed bars is precomputed by rebase(),
+so a tick costs a few small array operations instead of a compute_sbtc call.
+HermesStream reads the live SSE endpoint; ReplayStream replays recorded
+Hermes messages for tests and offline runs
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from lazy_imports import lazy_import
+from powerlaw import regression_inputs, regression_source, regression_sums, ridge_fit, validate_prices, weight_table
+
+np = lazy_import('numpy')
+requests = lazy_import('requests')
+
+HERMES_STREAM_URL = "https://hermes.pyth.network/v2/updates/price/stream"
+# Hermes price feed ID for BTC/USD (the stream is keyed by feed ID, not the Solana account)
+PYTH_BTC_USD_PRICE_ID = "e62df6c8b4a85fe1a67db44dc12de5db330f7ac66b72dc658afedf0f4a415b43"
+# update_trend rejects Pyth prices older than this (seconds)
+MAX_PRICE_AGE = 60
+
+Tick = namedtuple('Tick', 'price publish_time')
+
+
+def parse_hermes_message(message: dict) -> List[Tick]:
+    """Ticks in one Hermes price update message (requested with parsed=true)"""
+    ticks = []
+    for update in message.get('parsed', []):
+        price = update['price']
+        ticks.append(Tick(int(price['price']) * 10.0 ** int(price['expo']), int(price['publish_time'])))
+    return ticks
+
+
+class HermesStream:
+    """Ticks from the Hermes server-sent events endpoint, reconnecting with exponential backoff"""
+
+    def __init__(self, price_id: str = PYTH_BTC_USD_PRICE_ID, url: str = HERMES_STREAM_URL,
+                 timeout: float = 30.0, max_backoff: float = 60.0):
+        self.price_id = price_id
+        self.url = url
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.closed = False
+
+    def __iter__(self) -> Iterator[Tick]:
+        backoff = 1.0
+        while not self.closed:
+            try:
+                params = {'ids[]': self.price_id, 'parsed': 'true'}
+                with requests.get(self.url, params=params, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines(decode_unicode=True):
+                        if self.closed:
+                            return
+                        if line and line.startswith('data:'):
+                            yield from parse_hermes_message(json.loads(line[5:]))
+                            backoff = 1.0
+            except (requests.RequestException, ValueError) as e:
+                print(f"Hermes stream error: {e}; reconnecting in {backoff:.0f}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def close(self):
+        self.closed = True
+
+
+class ReplayStream:
+    """Replays Hermes messages (dicts, or a file with one JSON message per line)
+
+    speed=None replays as fast as possible; otherwise publish_time gaps are
+    slept through, divided by speed.
+    """
+
+    def __init__(self, messages, speed: Optional[float] = None):
+        self.messages = messages
+        self.speed = speed
+        self.closed = False
+
+    def _messages(self) -> Iterable[dict]:
+        if isinstance(self.messages, str):
+            with open(self.messages) as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        else:
+            yield from self.messages
+
+    def __iter__(self) -> Iterator[Tick]:
+        previous = None
+        for message in self._messages():
+            for tick in parse_hermes_message(message):
+                if self.closed:
+                    return
+                if self.speed and previous is not None:
+                    time.sleep(max(tick.publish_time - previous, 0) / self.speed)
+                previous = tick.publish_time
+                yield tick
+
+    def close(self):
+        self.closed = True
+
+
+class IntradayTarget:
+    """Provisional target for today's partial bar, updated per tick
+
+    With today's price prepended to the closed bars (recent first), only the
+    first `head` points of the latest regression window change: their smoothed
+    price and volatility windows reach today. rebase() sums the rest of the
+    window once; update() recomputes the head, adds the tail sums, refits and
+    limits the move from the previous target to k standard deviations of the
+    daily log returns (today's provisional return included).
+    """
+
+    def __init__(self):
+        self.bar_date = None
+        self.latest = None
+
+    def rebase(self, closed, params: dict, bar_date, previous_target: Optional[float] = None):
+        """Precompute from closed daily bars (recent first, all before bar_date)"""
+        length = params['length']
+        close, _ = validate_prices(closed['price'].values[:max(length, params['stdev_length'])])
+        self.params = params
+        self.bar_date = bar_date
+        self.last_close = close[0]
+        self.head = min(length, max(params['input_smooth_length'], params['vol_length'] + 1))
+        self.head_close = close[:self.head - 1]
+        xw = weight_table(length, params['time_weight_power'])
+        self.head_xw = xw[:self.head]
+
+        # Tail of today's window (indices head..length-1) does not depend on today's price
+        _, vol, smoothed = regression_source(np.concatenate((close[:1], close[:length - 1])),
+                                             params['vol_length'], params['input_smooth_length'])
+        valid, log_y, vol_w = regression_inputs(smoothed[self.head:], vol[self.head:], params['vol_weight_power'])
+        self.tail_sums = regression_sums(log_y, vol_w, xw[self.head:], valid)
+
+        # The closed-bar fit is where the dampening step starts unless a previous target is given
+        _, vol, smoothed = regression_source(close[:length], params['vol_length'], params['input_smooth_length'])
+        valid, log_y, vol_w = regression_inputs(smoothed, vol, params['vol_weight_power'])
+        self.closed_fit = float(ridge_fit(regression_sums(log_y, vol_w, xw, valid)[:, None],
+                                          params['lambda_'], length)[0])
+        self.previous_target = previous_target if previous_target else self.closed_fit
+
+        # Sums of the stdev_length - 1 most recent closed log returns (older minus newer, as log_return)
+        returns = np.diff(np.log(close[:params['stdev_length']]))
+        returns = returns[~np.isnan(returns)]
+        self.return_stats = (len(returns), float(returns.sum()), float((returns * returns).sum()))
+        self.latest = None
+
+    def update(self, price: float, publish_time: int) -> dict:
+        """Provisional target with today's close at price"""
+        started = time.perf_counter()
+        params = self.params
+        _, vol, smoothed = regression_source(np.concatenate(([price], self.head_close)),
+                                             params['vol_length'], params['input_smooth_length'])
+        valid, log_y, vol_w = regression_inputs(smoothed, vol, params['vol_weight_power'])
+        sums = self.tail_sums + regression_sums(log_y, vol_w, self.head_xw, valid)
+        fit = float(ridge_fit(sums[:, None], params['lambda_'], params['length'])[0])
+
+        # One dampening step from the previous target
+        today_return = math.log(self.last_close) - math.log(price)
+        count, total, squares = self.return_stats
+        count, total, squares = count + 1, total + today_return, squares + today_return * today_return
+        threshold = params['k'] * math.sqrt(max(squares / count - (total / count) ** 2, 0.0))
+        target = fit
+        if fit > 0 and self.previous_target > 0:
+            deviation = math.log(fit / self.previous_target)
+            target = self.previous_target * math.exp(min(max(deviation, -threshold), threshold))
+
+        self.latest = {
+            'bar_date': self.bar_date.isoformat(),
+            'btc_price': float(price),
+            'publish_time': int(publish_time),
+            'provisional_target': target,
+            'fit': fit,
+            'previous_target': self.previous_target,
+            'threshold': threshold,
+            'tick_to_target_us': round((time.perf_counter() - started) * 1e6, 1),
+        }
+        return self.latest
+
+
+class IntradayFeed:
+    """Consumes a tick stream on a background thread and keeps the provisional target current
+
+    load_base(day) returns (closed bars before day, parameters); it is called
+    for the first tick and again when ticks roll over to a new UTC day, with
+    the previous day's last provisional target carried into the dampening.
+    """
+
+    def __init__(self, stream, load_base: Callable, on_update: Optional[Callable] = None):
+        self.stream = stream
+        self.load_base = load_base
+        self.on_update = on_update
+        self.target = IntradayTarget()
+        self.ticks = 0
+        self.errors = 0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='intraday-feed', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        self.stream.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run(self):
+        for tick in self.stream:
+            try:
+                self.process(tick)
+            except Exception as e:
+                self.errors += 1
+                print(f"Intraday tick failed: {e}")
+
+    def process(self, tick: Tick) -> dict:
+        day = datetime.fromtimestamp(tick.publish_time, timezone.utc).date()
+        if self.target.bar_date != day:
+            previous = self.target.latest['provisional_target'] if self.target.latest else None
+            closed, params = self.load_base(day)
+            self.target.rebase(closed, params, day, previous_target=previous)
+        result = self.target.update(tick.price, tick.publish_time)
+        self.ticks += 1
+        if self.on_update is not None:
+            self.on_update(result)
+        return result
+
+    @property
+    def latest(self) -> Optional[dict]:
+        latest = self.target.latest
+        if latest is None:
+            return None
+        age = time.time() - latest['publish_time']
+        return {**latest, 'price_age': round(age, 1), 'stale': age > MAX_PRICE_AGE}
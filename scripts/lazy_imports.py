@@ -0,0 +1,48 @@
+"""
+Deferred imports for the SBTC Oracle scripts
+numpy, pandas, requests and pyarrow make up most of the start-up time; a
+LazyModule only imports its target on first attribute access, so /health,
+--help and short CLI runs never pay for the scientific stack
+"""
+
+import importlib
+import importlib.util
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access"""
+
+    def __init__(self, name: str):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_import(name: str, optional: bool = False):
+    """LazyModule for name; with optional=True, None when the package is not installed"""
+    if optional and importlib.util.find_spec(name.split('.')[0]) is None:
+        return None
+    return LazyModule(name)
+
+
+def preload(*modules):
+    """Force the import of lazy modules (e.g. before forking workers)"""
+    for module in modules:
+        if isinstance(module, LazyModule):
+            module._load()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Load generator and latency SLO report for the SBTC Oracle API
+Drives a weighted mix of /sbtc/current, /datapoints/store, /datapoints/last and
+/datapoints/batch from asyncio virtual users over keep-alive connections and
+reports p50/p95/p99 latency, throughput and error rate per endpoint as JSON
+and HTML. With --server it starts the API locally on a stub price history
+(a generated CSV behind the csv: price source), so no network is needed:
+
+    python load_test.py --server flask --duration 30 --concurrency 32 --html report.html
+    python load_test.py --server gunicorn --workers 4 --worker-class gthread --json gthread.json
+    python load_test.py --url http://localhost:5000 --mix current=80,last=20
+"""
+
+import argparse
+import asyncio
+import html
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MIX = 'current=40,store=10,last=30,batch=20'
+PERCENTILES = (50, 95, 99)
+
+
+def endpoint_request(name):
+    """(method, path, JSON body) for one request of the named endpoint"""
+    now = int(time.time())
+    if name == 'current':
+        return 'GET', '/sbtc/current', None
+    if name == 'store':
+        return 'POST', '/datapoints/store', {'sbtc_value': 46000.0 + random.random(), 'btc_price': 47000.0,
+                                             'data_points_used': 1000}
+    if name == 'last':
+        return 'GET', '/datapoints/last', None
+    if name == 'batch':
+        return 'GET', f"/datapoints/batch?start_timestamp={now - 86_400}&end_timestamp={now}", None
+    raise ValueError(f"Unknown endpoint: {name}")
+
+
+def parse_mix(spec):
+    """'current=40,last=60' -> {'current': 40.0, 'last': 60.0}"""
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        endpoint_request(name.strip())  # validates the name
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class Connection:
+    """Minimal keep-alive HTTP/1.1 client connection (stdlib only)"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b''
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nConnection: keep-alive\r\n"
+                f"Accept: application/json\r\nContent-Length: {len(payload)}\r\n")
+        if body is not None:
+            head += "Content-Type: application/json\r\n"
+        self.writer.write(head.encode() + b"\r\n" + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        version, status = status_line.split()[:2]
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = b''
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                body += await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif 'content-length' in headers:
+            await self.reader.readexactly(int(headers['content-length']))
+        else:
+            await self.reader.read()
+            self.close()
+        if version == b'HTTP/1.0' or headers.get('connection', '').lower() == 'close':
+            self.close()
+        return int(status)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def virtual_user(host, port, mix, deadline, samples, timeout):
+    names, weights = list(mix), list(mix.values())
+    connection = Connection(host, port)
+    while time.perf_counter() < deadline:
+        name = random.choices(names, weights)[0]
+        method, path, body = endpoint_request(name)
+        started = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(connection.request(method, path, body), timeout)
+            error = None if status < 400 else f"HTTP {status}"
+        except Exception as e:
+            connection.close()
+            status, error = None, type(e).__name__
+        samples.append((name, (time.perf_counter() - started) * 1000, status, error))
+    connection.close()
+
+
+async def generate_load(url, mix, duration, concurrency, timeout=30.0):
+    """Run concurrency virtual users for duration seconds; returns (samples, elapsed seconds)"""
+    parts = urlsplit(url)
+    samples = []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(virtual_user(parts.hostname, parts.port or 80, mix, deadline, samples, timeout)
+                           for _ in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+def summarize(samples, elapsed):
+    """Latency percentiles (ms), throughput (requests/s) and error rate, overall and per endpoint"""
+    def stats(rows):
+        latencies = sorted(latency for _, latency, _, _ in rows)
+        errors = {}
+        for _, _, _, error in rows:
+            if error:
+                errors[error] = errors.get(error, 0) + 1
+        return {
+            'requests': len(rows),
+            'throughput_rps': round(len(rows) / elapsed, 1) if elapsed else None,
+            'error_rate': round(sum(errors.values()) / len(rows), 4) if rows else None,
+            'errors': errors,
+            **{f"p{p}_ms": round(percentile(latencies, p), 2) if latencies else None for p in PERCENTILES},
+            'max_ms': round(latencies[-1], 2) if latencies else None,
+            'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else None,
+        }
+
+    endpoints = sorted({name for name, _, _, _ in samples})
+    return {
+        'overall': stats(samples),
+        'endpoints': {name: stats([row for row in samples if row[0] == name]) for name in endpoints},
+    }
+
+
+def render_html(report):
+    """Self-contained HTML table of a report"""
+    columns = ['requests', 'throughput_rps', 'error_rate'] + [f"p{p}_ms" for p in PERCENTILES] + ['max_ms']
+    rows = [('overall', report['results']['overall'])] + list(report['results']['endpoints'].items())
+    cells = ''.join(
+        f"<tr><th>{html.escape(name)}</th>" + ''.join(f"<td>{stats[c]}</td>" for c in columns) + "</tr>"
+        for name, stats in rows)
+    config = html.escape(json.dumps(report['config'], indent=2))
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>SBTC API load test</title>"
+        "<style>body{font-family:sans-serif}table{border-collapse:collapse}"
+        "td,th{border:1px solid #ccc;padding:4px 8px;text-align:right}</style></head><body>"
+        f"<h1>SBTC API load test</h1><p>{html.escape(report['started_at'])}</p>"
+        f"<table><tr><th>endpoint</th>{''.join(f'<th>{c}</th>' for c in columns)}</tr>{cells}</table>"
+        f"<h2>Configuration</h2><pre>{config}</pre></body></html>"
+    )
+
+
+def write_stub_history(path, days=1100):
+    """Deterministic daily BTC history ending today, for the csv: price source"""
+    rng = random.Random(42)
+    today = datetime.now(timezone.utc).date()
+    price, rows = 30000.0, []
+    for i in range(days, -1, -1):
+        price *= math.exp(rng.gauss(0.001, 0.03))
+        rows.append(f"{today - timedelta(days=i)},{price:.2f}")
+    with open(path, 'w') as f:
+        f.write("date,price\n" + "\n".join(rows) + "\n")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind, port, history_path, workers=1, worker_class='sync', threads=1):
+    """Start the API on 127.0.0.1:port with the stub history; returns the process once /health answers"""
+    # Measure the server, not the per-client rate limits (every virtual user shares one address)
+    env = {**os.environ, 'SBTC_PRICE_SOURCES': f"csv:{history_path}", 'SBTC_RATE_LIMIT': 'off',
+           'PYTHONUNBUFFERED': '1'}
+    if kind == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '--preload', '-w', str(workers), '-k', worker_class,
+                   '--threads', str(threads), '-b', f"127.0.0.1:{port}", 'sbtc_api:create_app()']
+    else:
+        command = [sys.executable, '-c', "import sbtc_api; sbtc_api.create_app()"
+                   f".run(host='127.0.0.1', port={port}, threaded=True)"]
+    process = subprocess.Popen(command, cwd=SCRIPTS_DIR, env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{kind} server exited with code {process.returncode}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{kind} server did not start within 60s")
+
+
+def run(url, mix, duration, concurrency, warmup=1.0):
+    """Warm up, then measure; returns the report"""
+    if warmup:
+        asyncio.run(generate_load(url, mix, warmup, concurrency))
+    started_at = datetime.now(timezone.utc).isoformat()
+    samples, elapsed = asyncio.run(generate_load(url, mix, duration, concurrency))
+    return {
+        'started_at': started_at,
+        'config': {'url': url, 'mix': mix, 'duration': duration, 'concurrency': concurrency},
+        'elapsed_seconds': round(elapsed, 3),
+        'results': summarize(samples, elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the SBTC Oracle API and report latency SLOs")
+    parser.add_argument('--url', help="Test an already running server instead of starting one")
+    parser.add_argument('--server', choices=('flask', 'gunicorn'), default='flask',
+                        help="Server to start locally on a stub price history")
+    parser.add_argument('--workers', type=int, default=1, help="gunicorn workers")
+    parser.add_argument('--worker-class', default='sync', help="gunicorn worker class (sync, gthread, gevent)")
+    parser.add_argument('--threads', type=int, default=1, help="gunicorn threads per worker")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Weighted endpoint mix (default {DEFAULT_MIX})")
+    parser.add_argument('--duration', type=float, default=10.0, help="Measured seconds")
+    parser.add_argument('--warmup', type=float, default=1.0, help="Unmeasured seconds before measuring")
+    parser.add_argument('--concurrency', type=int, default=16, help="Virtual users")
+    parser.add_argument('--json', help="Write the report as JSON to this file")
+    parser.add_argument('--html', help="Write the report as HTML to this file")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    process = None
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url
+        if url is None:
+            history_path = os.path.join(tmp, 'btc_history.csv')
+            write_stub_history(history_path)
+            port = free_port()
+            process = start_server(args.server, port, history_path, args.workers, args.worker_class, args.threads)
+            url = f"http://127.0.0.1:{port}"
+        try:
+            report = run(url, mix, args.duration, args.concurrency, args.warmup)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+    if args.url is None:
+        report['config']['server'] = {'kind': args.server, 'workers': args.workers,
+                                      'worker_class': args.worker_class, 'threads': args.threads}
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.html:
+        with open(args.html, 'w') as f:
+            f.write(render_html(report))
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report['results']['overall']['error_rate'] else 0)
+
+
+if __name__ == "__main__":
+    main()
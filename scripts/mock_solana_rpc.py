@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Local mock Solana JSON-RPC server for testing the SBTC Oracle clients
+Keeps accounts in memory and applies sma_oracle store_datapoint/update_trend
+instructions from submitted transactions (signatures are not verified)
+"""
+
+import base64
+import json
+import struct
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import base58
+
+from solana_rpc import (
+    PROGRAM_ID, DATAPOINT_HISTORY_DISCRIMINATOR, HISTORY_ACCOUNT_SIZE, HISTORY_CAPACITY,
+    HISTORY_HEADER_LAYOUT, HISTORY_SLOT_LAYOUT, INITIALIZE_HISTORY_DISCRIMINATOR,
+    ORACLE_STATE_DISCRIMINATOR, ORACLE_STATE_LAYOUT, STORE_DATAPOINT_DISCRIMINATOR,
+    UPDATE_TREND_DISCRIMINATOR, parse_transaction,
+)
+
+
+class MockSolanaRpcServer:
+    """In-memory JSON-RPC server; use as a context manager or call start()/stop()"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, program_id: str = PROGRAM_ID):
+        self.program_id = program_id
+        self.accounts = {}          # pubkey -> {'data': bytes, 'owner': str, 'lamports': int}
+        self.signature_statuses = {}
+        self.transactions = []
+        self.call_counts = Counter()
+        self.slot = 1
+        self.clock = None           # Override unix_timestamp seen by the program
+        self.drop_transactions = 0  # Accept but never land the next N transactions
+        self.prioritization_fees = [0]
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockSolanaRpcServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # State helpers ----------------------------------------------------------
+
+    def set_account(self, pubkey: str, data: bytes, owner: Optional[str] = None, lamports: int = 1_000_000):
+        with self.lock:
+            self.accounts[pubkey] = {'data': bytes(data), 'owner': owner or self.program_id, 'lamports': lamports}
+            self.slot += 1
+
+    def advance(self, slots: int):
+        """Advance the slot (and block height), e.g. to expire blockhashes"""
+        with self.lock:
+            self.slot += slots
+
+    def _now(self) -> int:
+        return int(self.clock if self.clock is not None else time.time())
+
+    def _account_json(self, account: Optional[Dict], data_slice: Optional[Dict] = None) -> Optional[Dict]:
+        if account is None:
+            return None
+        data = account['data']
+        if data_slice:
+            data = data[data_slice['offset']:data_slice['offset'] + data_slice['length']]
+        return {
+            'data': [base64.b64encode(data).decode(), 'base64'],
+            'executable': False,
+            'lamports': account['lamports'],
+            'owner': account['owner'],
+            'rentEpoch': 0,
+            'space': len(account['data']),
+        }
+
+    def _context(self, value):
+        return {'context': {'slot': self.slot}, 'value': value}
+
+    def _matches(self, data: bytes, filters) -> bool:
+        for f in filters or []:
+            if 'dataSize' in f and len(data) != f['dataSize']:
+                return False
+            if 'memcmp' in f:
+                offset = f['memcmp']['offset']
+                expected = base58.b58decode(f['memcmp']['bytes'])
+                if data[offset:offset + len(expected)] != expected:
+                    return False
+        return True
+
+    def _apply_instruction(self, ix: Dict):
+        if ix['program_id'] != self.program_id:
+            return
+        data = ix['data']
+        if data[:8] == INITIALIZE_HISTORY_DISCRIMINATOR:
+            history, authority = ix['accounts'][0], ix['accounts'][1]
+            if history in self.accounts:
+                raise ValueError(f"Account {history} already in use")
+            header = HISTORY_HEADER_LAYOUT.pack(base58.b58decode(authority), 0, 0)
+            self.accounts[history] = {
+                'data': (DATAPOINT_HISTORY_DISCRIMINATOR + header).ljust(HISTORY_ACCOUNT_SIZE, b"\x00"),
+                'owner': self.program_id, 'lamports': 1_000_000,
+            }
+        elif data[:8] == STORE_DATAPOINT_DISCRIMINATOR:
+            history, authority = ix['accounts'][0], ix['accounts'][1]
+            account = self.accounts.get(history)
+            if account is None:
+                raise ValueError("AccountNotInitialized: history")
+            stored_authority, head, count = HISTORY_HEADER_LAYOUT.unpack_from(account['data'], 8)
+            if base58.b58encode(stored_authority).decode() != authority:
+                raise ValueError("ConstraintHasOne: authority")
+            sbtc_value, btc_price, data_points_used = struct.unpack_from("<QQI", data, 8)
+            buf = bytearray(account['data'])
+            offset = 8 + HISTORY_HEADER_LAYOUT.size + head * HISTORY_SLOT_LAYOUT.size
+            HISTORY_SLOT_LAYOUT.pack_into(buf, offset, self._now(), sbtc_value, btc_price, data_points_used)
+            HISTORY_HEADER_LAYOUT.pack_into(buf, 8, stored_authority, (head + 1) % HISTORY_CAPACITY,
+                                            min(count + 1, HISTORY_CAPACITY))
+            account['data'] = bytes(buf)
+        elif data[:8] == UPDATE_TREND_DISCRIMINATOR:
+            (new_trend,) = struct.unpack_from("<Q", data, 8)
+            self.accounts[ix['accounts'][0]] = {
+                'data': ORACLE_STATE_DISCRIMINATOR + ORACLE_STATE_LAYOUT.pack(new_trend, self._now()),
+                'owner': self.program_id, 'lamports': 1_000_000,
+            }
+
+    # JSON-RPC methods -------------------------------------------------------
+
+    def handle(self, method: str, params: list):
+        with self.lock:
+            self.call_counts[method] += 1
+            if method == "getSlot":
+                return self.slot
+            if method == "getBlockHeight":
+                return self.slot
+            if method == "getBalance":
+                account = self.accounts.get(params[0])
+                return self._context(account['lamports'] if account else 0)
+            if method == "getAccountInfo":
+                return self._context(self._account_json(self.accounts.get(params[0])))
+            if method == "getMultipleAccounts":
+                if len(params[0]) > 100:
+                    raise ValueError("Too many inputs provided; max 100")
+                return self._context([self._account_json(self.accounts.get(key)) for key in params[0]])
+            if method == "getProgramAccounts":
+                config = params[1] if len(params) > 1 else {}
+                filters, data_slice = config.get('filters'), config.get('dataSlice')
+                return [{'pubkey': key, 'account': self._account_json(account, data_slice)}
+                        for key, account in self.accounts.items()
+                        if account['owner'] == params[0] and self._matches(account['data'], filters)]
+            if method == "getLatestBlockhash":
+                blockhash = base58.b58encode(struct.pack("<Q", self.slot).ljust(32, b"\x01")).decode()
+                return self._context({'blockhash': blockhash, 'lastValidBlockHeight': self.slot + 150})
+            if method == "getRecentPrioritizationFees":
+                return [{'slot': self.slot - i, 'prioritizationFee': fee}
+                        for i, fee in enumerate(self.prioritization_fees)]
+            if method == "sendTransaction":
+                tx = parse_transaction(base64.b64decode(params[0]))
+                self.transactions.append(tx)
+                if self.drop_transactions > 0:
+                    self.drop_transactions -= 1
+                    return tx['signatures'][0]
+                signature = tx['signatures'][0]
+                if signature in self.signature_statuses:
+                    return signature  # Duplicate broadcast, already processed
+                # Transactions are atomic: roll back every instruction if one fails
+                snapshot = {key: dict(account) for key, account in self.accounts.items()}
+                try:
+                    for ix in tx['instructions']:
+                        self._apply_instruction(ix)
+                except Exception:
+                    self.accounts = snapshot
+                    raise
+                self.slot += 1
+                self.signature_statuses[signature] = {
+                    'slot': self.slot, 'confirmations': None, 'err': None, 'confirmationStatus': 'confirmed',
+                }
+                return signature
+            if method == "getSignatureStatuses":
+                return self._context([self.signature_statuses.get(sig) for sig in params[0]])
+        raise NotImplementedError(method)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive so pooled client sessions are reused
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                try:
+                    body = {'jsonrpc': '2.0', 'id': request.get('id'),
+                            'result': server.handle(request['method'], request.get('params', []))}
+                except NotImplementedError as e:
+                    body = {'jsonrpc': '2.0', 'id': request.get('id'),
+                            'error': {'code': -32601, 'message': f"Method not found: {e}"}}
+                except Exception as e:
+                    body = {'jsonrpc': '2.0', 'id': request.get('id'),
+                            'error': {'code': -32602, 'message': str(e)}}
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    with MockSolanaRpcServer(port=8899) as mock:
+        print(f"Mock Solana RPC listening on {mock.url}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
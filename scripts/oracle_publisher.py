@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Asynchronous submission pipeline for SBTC Oracle updates
+Packs update_trend and store_datapoint into one transaction with compute
+budget instructions, reuses a pre-fetched blockhash, and tracks many
+in-flight signatures with a single getSignatureStatuses poll loop
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from lazy_imports import lazy_import
+from solana_rpc import (
+    PROGRAM_ID, PYTH_BTC_PRICE_ACCOUNT, RPC_URL, Keypair, SolanaRpcClient, build_transaction,
+    get_history_address, get_oracle_state_address, set_compute_unit_limit_instruction,
+    set_compute_unit_price_instruction, store_datapoint_instruction, update_trend_instruction,
+)
+
+requests = lazy_import('requests')
+
+API_BASE_URL = "http://localhost:5000"
+
+# Headroom over the measured cost of update_trend + store_datapoint
+DEFAULT_COMPUTE_UNIT_LIMIT = 100_000
+# Priority fee ceiling (micro-lamports per CU) when pricing from recent fees
+DEFAULT_MAX_COMPUTE_UNIT_PRICE = 50_000
+# getSignatureStatuses accepts up to 256 signatures per call
+MAX_SIGNATURES_PER_STATUS_CALL = 256
+
+COMMITMENT_LEVELS = {'processed': 0, 'confirmed': 1, 'finalized': 2}
+
+
+class TransactionFailed(Exception):
+    """The transaction landed but the program returned an error"""
+
+
+class BlockhashExpired(Exception):
+    """The blockhash expired before the transaction was confirmed"""
+
+
+class BlockhashCache:
+    """Keeps a recent blockhash (and priority fee estimate) warm in the background"""
+
+    def __init__(self, rpc: SolanaRpcClient, refresh_interval: float = 20.0,
+                 fee_accounts: Optional[List[str]] = None, fee_percentile: float = 75.0):
+        self.rpc = rpc
+        self.refresh_interval = refresh_interval
+        self.fee_accounts = fee_accounts or []
+        self.fee_percentile = fee_percentile
+        self.blockhash = None
+        self.last_valid_block_height = 0
+        self.priority_fee = 0
+        self.fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    async def refresh(self) -> Tuple[str, int]:
+        async with self._lock:
+            blockhash, last_valid = await asyncio.to_thread(self.rpc.get_latest_blockhash)
+            self.blockhash, self.last_valid_block_height = blockhash, last_valid
+            self.fetched_at = time.monotonic()
+            try:
+                fees = await asyncio.to_thread(self.rpc.get_recent_prioritization_fees, self.fee_accounts)
+                self.priority_fee = percentile(fees, self.fee_percentile)
+            except Exception as e:
+                print(f"Priority fee estimate unavailable: {e}")
+            return blockhash, last_valid
+
+    async def get(self) -> Tuple[str, int]:
+        """Cached blockhash, refetched only if older than the refresh interval"""
+        if self.blockhash is None or time.monotonic() - self.fetched_at > self.refresh_interval:
+            return await self.refresh()
+        return self.blockhash, self.last_valid_block_height
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Blockhash refresh failed: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def percentile(values: List[int], pct: float) -> int:
+    """Nearest-rank percentile of the non-zero values (0 if none)"""
+    nonzero = sorted(v for v in values if v > 0)
+    if not nonzero:
+        return 0
+    rank = max(int(round(pct / 100.0 * len(nonzero))) - 1, 0)
+    return nonzero[min(rank, len(nonzero) - 1)]
+
+
+class OracleUpdatePipeline:
+    """Publishes oracle updates concurrently with bounded retries
+
+    Usage:
+        async with OracleUpdatePipeline(rpc, authority) as pipeline:
+            result = await pipeline.publish(47000.0, 46500.0, 1000)
+    """
+
+    def __init__(self, rpc: SolanaRpcClient, authority: Keypair, program_id: str = PROGRAM_ID,
+                 pyth_price_account: str = PYTH_BTC_PRICE_ACCOUNT,
+                 compute_unit_limit: int = DEFAULT_COMPUTE_UNIT_LIMIT,
+                 compute_unit_price: Optional[int] = None,
+                 max_compute_unit_price: int = DEFAULT_MAX_COMPUTE_UNIT_PRICE,
+                 max_retries: int = 3, poll_interval: float = 0.4, rebroadcast_interval: float = 2.0,
+                 blockhash_refresh_interval: float = 20.0, max_in_flight: int = 32):
+        if max_retries < 1:
+            raise ValueError(f"max_retries must be at least 1 (one attempt), got {max_retries}")
+        self.rpc = rpc
+        self.authority = authority
+        self.program_id = program_id
+        self.pyth_price_account = pyth_price_account
+        self.oracle_state = get_oracle_state_address(program_id)
+        self.history = get_history_address(program_id)
+        self.compute_unit_limit = compute_unit_limit
+        self.compute_unit_price = compute_unit_price  # None = derive from recent fees
+        self.max_compute_unit_price = max_compute_unit_price
+        self.max_retries = max_retries
+        self.poll_interval = poll_interval
+        self.rebroadcast_interval = rebroadcast_interval
+        self.blockhashes = BlockhashCache(rpc, blockhash_refresh_interval,
+                                          fee_accounts=[self.oracle_state, self.history])
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._pending = {}  # signature -> future resolved by the status poller
+        self._tracker = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def start(self):
+        await self.blockhashes.refresh()
+        self.blockhashes.start()
+        self._tracker = asyncio.create_task(self._track_confirmations())
+
+    async def stop(self):
+        await self.blockhashes.stop()
+        if self._tracker is not None:
+            self._tracker.cancel()
+            try:
+                await self._tracker
+            except asyncio.CancelledError:
+                pass
+            self._tracker = None
+
+    def build_instructions(self, sbtc_value: float, btc_price: float, data_points_used: int,
+                           update_trend: bool = True, store_datapoint: bool = True) -> list:
+        """Compute budget + update_trend + store_datapoint in one transaction"""
+        price = self.compute_unit_price
+        if price is None:
+            price = min(self.blockhashes.priority_fee, self.max_compute_unit_price)
+        instructions = [set_compute_unit_limit_instruction(self.compute_unit_limit)]
+        if price:
+            instructions.append(set_compute_unit_price_instruction(price))
+        sbtc_cents = int(sbtc_value * 100)
+        if update_trend:
+            instructions.append(update_trend_instruction(sbtc_cents, self.authority.pubkey, self.oracle_state,
+                                                         self.pyth_price_account, self.program_id))
+        if store_datapoint:
+            instructions.append(store_datapoint_instruction(sbtc_cents, int(btc_price * 100), data_points_used,
+                                                            self.authority.pubkey, self.history,
+                                                            self.program_id))
+        return instructions
+
+    async def publish(self, sbtc_value: float, btc_price: float, data_points_used: int,
+                      update_trend: bool = True, store_datapoint: bool = True) -> Dict:
+        """Submit one update and wait for confirmation, re-signing on blockhash expiry"""
+        started = time.perf_counter()
+        async with self._in_flight:
+            last_error = None
+            for attempt in range(1, self.max_retries + 1):
+                if attempt > 1:
+                    await self.blockhashes.refresh()
+                blockhash, last_valid = await self.blockhashes.get()
+                instructions = self.build_instructions(sbtc_value, btc_price, data_points_used,
+                                                       update_trend, store_datapoint)
+                tx = build_transaction(instructions, self.authority, [], blockhash)
+                try:
+                    signature = await asyncio.to_thread(self.rpc.send_transaction, tx)
+                    status = await self._await_confirmation(signature, tx, last_valid)
+                    return {
+                        'signature': signature,
+                        'slot': status.get('slot'),
+                        'attempts': attempt,
+                        'latency_ms': (time.perf_counter() - started) * 1000,
+                    }
+                except BlockhashExpired as e:
+                    last_error = e
+                    print(f"Attempt {attempt}/{self.max_retries} expired, re-signing with a fresh blockhash")
+            raise last_error
+
+    async def _await_confirmation(self, signature: str, tx: bytes, last_valid_block_height: int) -> Dict:
+        future = asyncio.get_running_loop().create_future()
+        self._pending[signature] = (future, last_valid_block_height)
+        try:
+            while True:
+                try:
+                    return await asyncio.wait_for(asyncio.shield(future), self.rebroadcast_interval)
+                except asyncio.TimeoutError:
+                    # Still unconfirmed: rebroadcast the same signed bytes (deduplicated by signature)
+                    try:
+                        await asyncio.to_thread(self.rpc.send_transaction, tx, True)
+                    except Exception as e:
+                        print(f"Rebroadcast of {signature} failed: {e}")
+        finally:
+            self._pending.pop(signature, None)
+
+    async def _track_confirmations(self):
+        target = COMMITMENT_LEVELS.get(self.rpc.commitment, 1)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not self._pending:
+                continue
+            try:
+                signatures = list(self._pending)
+                statuses = []
+                for i in range(0, len(signatures), MAX_SIGNATURES_PER_STATUS_CALL):
+                    chunk = signatures[i:i + MAX_SIGNATURES_PER_STATUS_CALL]
+                    statuses += await asyncio.to_thread(self.rpc.get_signature_statuses, chunk)
+                block_height = await asyncio.to_thread(self.rpc.get_block_height)
+            except Exception as e:
+                print(f"Confirmation poll failed: {e}")
+                continue
+            for signature, status in zip(signatures, statuses):
+                entry = self._pending.get(signature)
+                if entry is None or entry[0].done():
+                    continue
+                future, last_valid = entry
+                if status is not None and status.get('err') is not None:
+                    future.set_exception(TransactionFailed(f"{signature}: {status['err']}"))
+                elif status is not None and COMMITMENT_LEVELS.get(status.get('confirmationStatus'), -1) >= target:
+                    future.set_result(status)
+                elif status is None and block_height > last_valid:
+                    future.set_exception(BlockhashExpired(signature))
+
+
+def fetch_sbtc_from_api(api_base_url: str = API_BASE_URL) -> Tuple[float, float, int]:
+    response = requests.get(f"{api_base_url}/sbtc/current", timeout=60)
+    response.raise_for_status()
+    data = response.json()
+    if not data['success']:
+        raise Exception(f"API error: {data.get('error', 'Unknown error')}")
+    return data['data']['sbtc_target_price'], data['data']['current_btc_price'], data['data']['data_points_used']
+
+
+async def run_publisher(args):
+    rpc = SolanaRpcClient(args.rpc_url)
+    authority = Keypair.from_file(args.keypair)
+    async with OracleUpdatePipeline(rpc, authority, compute_unit_price=args.compute_unit_price,
+                                    max_retries=args.max_retries) as pipeline:
+        while True:
+            try:
+                sbtc_value, btc_price, data_points_used = await asyncio.to_thread(fetch_sbtc_from_api, args.api_url)
+                result = await pipeline.publish(sbtc_value, btc_price, data_points_used)
+                print(f"Published SBTC=${sbtc_value:.2f}: {result['signature']} "
+                      f"({result['attempts']} attempt(s), {result['latency_ms']:.0f} ms)")
+            except Exception as e:
+                print(f"Update failed: {e}")
+            if args.once:
+                return
+            await asyncio.sleep(args.interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish SBTC target prices to the on-chain oracle")
+    parser.add_argument('--rpc-url', default=RPC_URL)
+    parser.add_argument('--api-url', default=API_BASE_URL)
+    parser.add_argument('--keypair', default="~/.config/solana/id.json")
+    parser.add_argument('--interval', type=float, default=3600, help="Seconds between updates")
+    parser.add_argument('--compute-unit-price', type=int, default=None,
+                        help="Priority fee in micro-lamports/CU (default: from recent fees)")
+    parser.add_argument('--max-retries', type=int, default=3)
+    parser.add_argument('--once', action='store_true', help="Publish a single update and exit")
+    asyncio.run(run_publisher(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
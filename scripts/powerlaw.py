@@ -0,0 +1,157 @@
+"""
+Vectorized weighted ridge power-law regression for the SBTC indicator
+validate_prices/regression_source prepare its inputs; regression_series fits
+every trailing window of a series at once; the same sums/fit kernels evaluate
+single windows (intraday ticks) and many reweighted samples of one window
+(bootstrap, jackknife) without importing the API. dampen() limits the daily
+steps of the smoothed fit curve into the published SBTC curve
+"""
+
+import math
+from functools import lru_cache
+
+from lazy_imports import lazy_import
+from rolling_stats import rolling_mean, rolling_std
+
+np = lazy_import('numpy')
+
+# Regression windows evaluated per matrix block (bounds the temporaries to ~2 MB each)
+REGRESSION_BLOCK = 1024
+
+
+def validate_prices(close):
+    """Copy of close with NaN, infinite and non-positive prices flagged as NaN, plus the validity mask
+
+    Flagged gaps stay NaN rather than being forward-filled: the rolling
+    statistics skip them, and log() never sees a non-positive price.
+    """
+    close = np.asarray(close, dtype=float)
+    valid = np.isfinite(close) & (close > 0)
+    return np.where(valid, close, np.nan), valid
+
+
+def regression_source(close, vol_length, input_smooth_length):
+    """Log returns, their rolling volatility and the smoothed prices fed to the regression"""
+    # Calculate log returns and volatility
+    log_return = np.diff(np.log(close), prepend=np.nan)
+    vol = rolling_std(log_return, vol_length)
+
+    # Input smoothing
+    smoothed_close = rolling_mean(close, input_smooth_length)
+    return log_return, vol, smoothed_close
+
+
+@lru_cache(maxsize=32)
+def weight_table(length, time_pow):
+    """Per-window constants for a (length, time power) pair, computed once per process
+
+    Columns of `xw` are time_w, time_w*log(x) and time_w*log(x)^2 for
+    x = length..1, so a window only multiplies them by its volatility weights.
+    """
+    x = np.arange(length, 0, -1, dtype=float)
+    time_w = np.power(x, time_pow)
+    log_x = np.log(x)
+    xw = np.column_stack((time_w, time_w * log_x, time_w * log_x * log_x))
+    xw.setflags(write=False)
+    return xw
+
+
+def regression_inputs(src, vol, vol_pow):
+    """Per-point validity, log(y) (0 where invalid) and volatility weight"""
+    src = np.asarray(src, dtype=float)
+    valid = np.isfinite(src) & (src > 0)
+    log_y = np.log(np.where(valid, src, 1.0))
+    vol = np.where(np.isnan(vol), 0.01, vol)
+    return valid, log_y, 1.0 / np.power(np.abs(vol) + 1e-10, vol_pow)
+
+
+def regression_sums(log_y, vol_w, xw, mask=None):
+    """Weighted sums for a block of windows (rows); mask scales (zeroes, or counts) each point's weight"""
+    if mask is not None:
+        vol_w = vol_w * mask
+    w_sums = vol_w @ xw  # sum_w, sum_w_logx, sum_w_logx_logx
+    wy_sums = (vol_w * log_y) @ xw[:, :2]  # sum_w_logy, sum_w_logx_logy
+    return np.stack((w_sums[..., 0], w_sums[..., 1], wy_sums[..., 0], wy_sums[..., 1], w_sums[..., 2]))
+
+
+def ridge_fit(sums, lam, length, offs=0):
+    """Power-law value at x = length - offs from regression_sums (NaN where the fit is undefined)"""
+    sum_w, sum_w_logx, sum_w_logy, sum_w_logx_logy, sum_w_logx_logx = sums
+    with np.errstate(invalid='ignore', divide='ignore'):
+        xm = sum_w_logx / sum_w
+        ym = sum_w_logy / sum_w
+        num = sum_w_logx_logy - sum_w * xm * ym
+        denom = sum_w_logx_logx - sum_w * xm * xm + lam
+        b = np.where(denom > 0, num / denom, np.nan)
+        result = np.exp(ym - b * xm + b * np.log(float(length - offs)))
+    result[sum_w == 0] = np.nan
+    return result
+
+
+def regression_series(src, vol, length, time_pow, vol_pow, lam, skipped=None):
+    """weighted_ridge_powerlaw over every trailing window of src, vectorized.
+
+    Validity is decided once for the whole series: windows without invalid
+    points go through the branch-free kernel, the rest through the masked one.
+    """
+    n = len(src)
+    plr = np.full(n, np.nan)
+    if n < length:
+        return plr
+    valid, log_y, vol_w = regression_inputs(src, vol, vol_pow)
+    xw = weight_table(length, time_pow)
+
+    # Invalid points per window from an integer cumsum (exact)
+    invalid = np.concatenate(([0], np.cumsum(~valid)))
+    invalid = invalid[length:] - invalid[:-length]
+    windows = np.lib.stride_tricks.sliding_window_view
+    log_y_w, vol_w_w, valid_w = windows(log_y, length), windows(vol_w, length), windows(valid, length)
+
+    sums = np.empty((5, n - length + 1))
+    for lo in range(0, n - length + 1, REGRESSION_BLOCK):
+        hi = min(lo + REGRESSION_BLOCK, n - length + 1)
+        clean = lo + np.flatnonzero(invalid[lo:hi] == 0)
+        dirty = lo + np.flatnonzero(invalid[lo:hi] != 0)
+        if len(clean):
+            sums[:, clean] = regression_sums(log_y_w[clean], vol_w_w[clean], xw)
+        if len(dirty):
+            sums[:, dirty] = regression_sums(log_y_w[dirty], vol_w_w[dirty], xw, valid_w[dirty])
+    if skipped is not None:
+        skipped['masked_windows'] += int(np.count_nonzero(invalid))
+        skipped['regression_points'] += int(invalid.sum())
+
+    plr[length - 1:] = ridge_fit(sums, lam, length)
+    return plr
+
+
+def dampen_step(current, value, limit):
+    """Next dampened value: current moved toward value by at most +/- limit in log terms"""
+    if current == 0:
+        return current
+    deviation = math.log(value / current) if value > 0 else -math.inf
+    return current * math.exp(min(max(deviation, -limit), limit))
+
+
+def dampen(smoothed_plr, threshold, skipped=None):
+    """Limit each step of the curve to +/- threshold (log terms), holding across NaN gaps"""
+    final_plr = np.array(smoothed_plr, dtype=float)
+    started = np.flatnonzero(~np.isnan(final_plr))
+    if len(started) == 0:
+        return final_plr
+    # Before the first valid value the curve is just smoothed_plr (NaN); after it,
+    # a step is taken only where both inputs are valid and the value is held otherwise
+    first = started[0]
+    usable = (~np.isnan(final_plr) & ~np.isnan(threshold)).tolist()
+    smoothed, limit = final_plr.tolist(), np.asarray(threshold, dtype=float).tolist()
+    holds = 0
+    current = smoothed[first]
+    for i in range(first + 1, len(smoothed)):
+        if usable[i]:
+            current = dampen_step(current, smoothed[i], limit[i])
+        else:
+            holds += 1
+        smoothed[i] = current
+    if skipped is not None:
+        skipped['dampening_holds'] += holds
+    final_plr[first:] = smoothed[first:]
+    return final_plr
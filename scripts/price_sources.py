@@ -0,0 +1,388 @@
+"""
+Pluggable BTC/USD price sources for the SBTC Oracle
+Fetches every configured source concurrently with per-source timeouts and
+circuit breakers, aligns them on daily bars and combines them into a per-day
+consensus price (median after MAD outlier rejection, or a spread check when
+only two sources report a day). HistoryCache serves the last good history
+while refreshing it in the background
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+requests = lazy_import('requests')
+
+# Pyth Network BTC/USD price feed ID for Solana
+PYTH_BTC_FEED_ID = "8SXvChNYFh3qEi4J6tK1wQREu5x6YdE3C6HmZzThoG6E"
+PYTH_HISTORY_URL = f"https://hermes.pyth.network/v2/updates/price/{PYTH_BTC_FEED_ID}"
+COINGECKO_HISTORY_URL = "https://api.coingecko.com/api/v3/coins/bitcoin/market_chart"
+
+DEFAULT_SOURCES = "pyth,coingecko"
+# Scale factor making the MAD a consistent estimator of the standard deviation
+MAD_SCALE = 1.4826
+
+HEADERS = {
+    'User-Agent': 'SBTC-Oracle/1.0',
+    'Accept': 'application/json'
+}
+
+
+class PriceSourceError(Exception):
+    """A source returned no usable data"""
+
+
+def daily_frame(timestamps_ms, prices) -> pd.DataFrame:
+    """Daily bars (last observation per UTC day), indexed by date, recent first"""
+    df = pd.DataFrame({'timestamp': np.asarray(timestamps_ms, dtype=np.int64),
+                       'price': np.asarray(prices, dtype=float)})
+    df = df[np.isfinite(df['price']) & (df['price'] > 0)]
+    if len(df) == 0:
+        raise PriceSourceError("no valid prices")
+    df['date'] = pd.to_datetime(df['timestamp'], unit='ms').dt.date
+    df = df.sort_values('timestamp').groupby('date').last()
+    return df.sort_index(ascending=False)  # Recent first
+
+
+class PriceSource:
+    """Base class: fetch(days) returns a daily_frame or raises"""
+
+    name = 'source'
+
+    def __init__(self, timeout: float = 10.0):
+        self.timeout = timeout
+
+    def fetch(self, days: int) -> pd.DataFrame:
+        raise NotImplementedError
+
+
+class PythSource(PriceSource):
+    name = 'pyth'
+
+    def fetch(self, days):
+        end_time = datetime.now()
+        start_time = end_time - timedelta(days=days)
+        params = {
+            'start_time': int(start_time.timestamp()),
+            'end_time': int(end_time.timestamp()),
+            'interval': '1d'  # Daily interval
+        }
+        response = requests.get(PYTH_HISTORY_URL, params=params, headers=HEADERS, timeout=self.timeout)
+        if response.status_code != 200:
+            raise PriceSourceError(f"HTTP {response.status_code}")
+        updates = response.json().get('price_updates')
+        if updates is None:
+            raise PriceSourceError("unexpected response format")
+        updates = [u for u in updates if 'price' in u and 'timestamp' in u]
+        return daily_frame([u['timestamp'] * 1000 for u in updates],  # Convert to milliseconds
+                           [u['price'] for u in updates])
+
+
+class CoinGeckoSource(PriceSource):
+    name = 'coingecko'
+
+    def fetch(self, days):
+        params = {'vs_currency': 'usd', 'days': days, 'interval': 'daily'}
+        response = requests.get(COINGECKO_HISTORY_URL, params=params, headers=HEADERS, timeout=self.timeout)
+        if response.status_code != 200:
+            raise PriceSourceError(f"HTTP {response.status_code}")
+        prices = np.asarray(response.json()['prices'], dtype=float).reshape(-1, 2)
+        return daily_frame(prices[:, 0], prices[:, 1])
+
+
+class CsvSource(PriceSource):
+    """Local CSV with a `price` column and either `date` or `timestamp` (ms)"""
+
+    def __init__(self, path: str, timeout: float = 10.0):
+        super().__init__(timeout)
+        self.path = os.path.expanduser(path)
+        self.name = f"csv:{os.path.basename(self.path)}"
+
+    def fetch(self, days):
+        df = pd.read_csv(self.path)
+        if 'timestamp' in df:
+            timestamps = df['timestamp'].to_numpy(dtype=np.int64)
+        else:
+            timestamps = pd.to_datetime(df['date']).to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        frame = daily_frame(timestamps, df['price'].to_numpy(dtype=float))
+        return frame.iloc[:days]
+
+
+class CircuitBreaker:
+    """Stops calling an upstream after repeated failures
+
+    closed: calls pass; failure_threshold consecutive failures open the circuit.
+    open: calls are skipped until reset_timeout has elapsed.
+    half_open: one probe call is let through; success closes, failure reopens.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.failure_threshold:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+def build_sources(spec: str = None, timeout: float = 10.0) -> List[PriceSource]:
+    """Sources from a comma-separated spec such as "pyth,coingecko,csv:/data/btc.csv"
+
+    Defaults to the SBTC_PRICE_SOURCES environment variable, then DEFAULT_SOURCES.
+    """
+    spec = spec or os.environ.get('SBTC_PRICE_SOURCES', DEFAULT_SOURCES)
+    sources = []
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        if item == 'pyth':
+            sources.append(PythSource(timeout))
+        elif item == 'coingecko':
+            sources.append(CoinGeckoSource(timeout))
+        elif item.startswith('csv:'):
+            sources.append(CsvSource(item[4:], timeout))
+        else:
+            raise ValueError(f"Unknown price source: {item}")
+    return sources
+
+
+def align_daily(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Outer-join daily prices into one column per source, recent first"""
+    wide = pd.concat({name: frame['price'] for name, frame in frames.items()}, axis=1)
+    return wide.sort_index(ascending=False)
+
+
+def consensus(wide: pd.DataFrame, mad_threshold: float = 3.0, max_spread: float = 0.02) -> pd.DataFrame:
+    """Per-day consensus price of the sources (rows recent first)
+
+    With three or more prices on a day, the median of those within
+    mad_threshold scaled MADs of the day's median; days where all sources
+    agree exactly (MAD 0) keep every source. Two prices cannot outvote each
+    other (both are always within 3 MADs), so they are averaged only when
+    they differ by at most max_spread (relative to their mean); otherwise the
+    one closer to the last earlier consensus price is used, and the day is
+    dropped (NaN) when there is none. Returns price plus the number of
+    sources used per day.
+    """
+    values = wide.to_numpy(dtype=float)
+    with np.errstate(all='ignore'):
+        median = np.nanmedian(values, axis=1, keepdims=True)
+        deviation = np.abs(values - median)
+        mad = np.nanmedian(deviation, axis=1, keepdims=True) * MAD_SCALE
+        keep = ~np.isnan(values) & ((mad == 0) | (deviation <= mad_threshold * mad))
+        price = np.nanmedian(np.where(keep, values, np.nan), axis=1)
+        low, high = np.nanmin(values, axis=1), np.nanmax(values, axis=1)
+        spread = (high - low) / ((high + low) / 2)
+    disputed = np.flatnonzero((keep.sum(axis=1) == 2) & ~(spread <= max_spread))
+    # Oldest first, so a resolved day is the previous consensus of the next one
+    for i in disputed[::-1]:
+        earlier = price[i + 1:][~np.isnan(price[i + 1:])]
+        keep[i] = False
+        if len(earlier) == 0:
+            price[i] = np.nan
+            continue
+        closest = np.nanargmin(np.abs(values[i] - earlier[0]))
+        keep[i, closest] = True
+        price[i] = values[i, closest]
+    return pd.DataFrame({'price': price, 'sources_used': keep.sum(axis=1)}, index=wide.index)
+
+
+class PriceAggregator:
+    """Fetches all sources concurrently and returns the consensus history
+
+    Latency is bounded by timeout (default: the largest source timeout); no
+    source's request timeout may exceed it. Sources that fail or time out are
+    reported in source_status and skipped. Each fetch runs on its own threads,
+    and threads still stuck in a timed-out source are abandoned, so a hung
+    upstream cannot hold the workers of the next fetch.
+    """
+
+    def __init__(self, sources: Optional[List[PriceSource]] = None, mad_threshold: float = 3.0,
+                 min_sources: int = 1, failure_threshold: int = 3, reset_timeout: float = 60.0,
+                 max_spread: float = 0.02, timeout: Optional[float] = None):
+        self.sources = sources if sources is not None else build_sources()
+        self.timeout = timeout if timeout is not None else max((s.timeout for s in self.sources), default=0)
+        for source in self.sources:
+            source.timeout = min(source.timeout, self.timeout)
+        self.mad_threshold = mad_threshold
+        self.max_spread = max_spread
+        self.min_sources = min_sources
+        self.breakers = {source.name: CircuitBreaker(failure_threshold, reset_timeout) for source in self.sources}
+        self.source_status = {}
+
+    def _timed_fetch(self, source, days):
+        started = time.perf_counter()
+        frame = source.fetch(days)
+        return frame, (time.perf_counter() - started) * 1000
+
+    def fetch_all(self, days: int) -> Dict[str, pd.DataFrame]:
+        frames, status, futures = {}, {}, {}
+        executor = ThreadPoolExecutor(max_workers=max(len(self.sources), 1), thread_name_prefix='price-source')
+        try:
+            for source in self.sources:
+                if self.breakers[source.name].allow():
+                    futures[executor.submit(self._timed_fetch, source, days)] = source
+                else:
+                    status[source.name] = {'status': 'circuit_open'}
+            wait(futures, timeout=self.timeout)
+        finally:
+            # Abandon stuck fetches: their threads exit when the request times out
+            executor.shutdown(wait=False, cancel_futures=True)
+        for future, source in futures.items():
+            breaker = self.breakers[source.name]
+            if not future.done():
+                breaker.record_failure()
+                status[source.name] = {'status': 'timeout'}
+                continue
+            try:
+                frame, latency_ms = future.result()
+            except Exception as e:
+                breaker.record_failure()
+                status[source.name] = {'status': 'error', 'error': str(e)}
+                continue
+            breaker.record_success()
+            frames[source.name] = frame
+            status[source.name] = {'status': 'ok', 'rows': len(frame), 'latency_ms': round(latency_ms, 1)}
+        for name in status:
+            status[name]['circuit'] = self.breakers[name].state
+        self.source_status = status
+        return frames
+
+    def fetch(self, days: int) -> pd.DataFrame:
+        """Consensus daily history (date index, recent first) with timestamp and price columns"""
+        frames = self.fetch_all(days)
+        if len(frames) < self.min_sources:
+            raise PriceSourceError(f"{len(frames)} of {len(self.sources)} price sources available: {self.source_status}")
+        df = consensus(align_daily(frames), self.mad_threshold, self.max_spread).iloc[:days]
+        df['timestamp'] = pd.to_datetime(pd.Index(df.index)).to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        df.index.name = 'date'
+        return df[['timestamp', 'price', 'sources_used']]
+
+
+HistorySnapshot = namedtuple('HistorySnapshot', ['df', 'fetched_at', 'source_status'])
+
+
+class HistoryCache:
+    """Stale-while-revalidate cache of consensus histories, keyed by days
+
+    A fresh snapshot is returned as is. A stale one (older than max_age or
+    fetched before fresh_after) is returned immediately while a single
+    background refresh runs; failed refreshes keep the last good snapshot.
+    Only a cold cache waits on the upstreams. At most max_entries lengths are
+    kept; the least recently used one is dropped first.
+    """
+
+    def __init__(self, aggregator: PriceAggregator, max_age: float = 3600.0, on_refresh=None,
+                 max_entries: int = 4):
+        self.aggregator = aggregator
+        self.max_age = max_age
+        self.on_refresh = on_refresh  # called as on_refresh(days, snapshot) after each fetch
+        self.max_entries = max_entries
+        self._snapshots = OrderedDict()  # days -> snapshot, least recently used first
+        self._refreshing = {}  # days -> background refresh thread
+        self._lock = threading.Lock()  # guards _snapshots and _refreshing
+        self._fetch_lock = threading.Lock()  # one upstream fetch at a time
+
+    def _refresh(self, days: int) -> HistorySnapshot:
+        requested_at = time.time()
+        with self._fetch_lock:
+            snapshot = self._snapshots.get(days)
+            if snapshot is not None and snapshot.fetched_at >= requested_at:
+                return snapshot  # refreshed by a concurrent caller while we waited
+            df = self.aggregator.fetch(days)
+            snapshot = HistorySnapshot(df, time.time(), self.aggregator.source_status)
+            with self._lock:
+                self._snapshots[days] = snapshot
+                self._snapshots.move_to_end(days)
+                while len(self._snapshots) > self.max_entries:
+                    self._snapshots.popitem(last=False)
+        if self.on_refresh is not None:
+            self.on_refresh(days, snapshot)
+        return snapshot
+
+    def revalidate(self, days: int):
+        """Start a background refresh of days (no-op if one is already running)"""
+        self._refresh_in_background(days)
+
+    def _refresh_in_background(self, days: int):
+        def run():
+            try:
+                self._refresh(days)
+            except Exception as e:
+                print(f"Background price refresh failed, serving stale history: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.pop(days, None)
+
+        with self._lock:
+            if days in self._refreshing:
+                return
+            thread = self._refreshing[days] = threading.Thread(target=run, name='price-refresh', daemon=True)
+        thread.start()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Wait for running background refreshes, e.g. before forking (a refresh holds the fetch lock)"""
+        with self._lock:
+            threads = list(self._refreshing.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def get(self, days: int, fresh_after: float = 0.0) -> HistorySnapshot:
+        """Snapshot for days; raises PriceSourceError only when nothing was ever fetched"""
+        with self._lock:
+            snapshot = self._snapshots.get(days)
+            if snapshot is not None:
+                self._snapshots.move_to_end(days)
+        if snapshot is None:
+            return self._refresh(days)
+        if time.time() - snapshot.fetched_at > self.max_age or snapshot.fetched_at < fresh_after:
+            self._refresh_in_background(days)
+        return snapshot
+
+    @property
+    def source_status(self) -> Dict[str, dict]:
+        """Latest per-source status, including circuit state"""
+        status = {name: dict(info) for name, info in self.aggregator.source_status.items()}
+        for name, breaker in self.aggregator.breakers.items():
+            status.setdefault(name, {'status': 'unknown'})['circuit'] = breaker.state
+        return status
@@ -0,0 +1,194 @@
+"""
+On-demand request profiling for the SBTC Oracle API
+A request to a fetch-and-compute endpoint is profiled when an admin key
+(X-API-Key listed in SBTC_ADMIN_KEYS) asks for it with `X-Profile: cprofile`
+or `?profiling=cprofile`, or when it is picked at random at
+SBTC_PROFILING_SAMPLE_RATE. Two kinds of profile are captured:
+
+    cprofile  deterministic (cProfile); a .prof file for pstats/snakeviz
+    sample    statistical: the request thread's stack every few milliseconds,
+              as folded stacks (.folded) for flamegraph.pl or speedscope
+
+Profiles go to SBTC_PROFILING_DIR, which keeps the newest
+SBTC_PROFILING_MAX_FILES files and at most SBTC_PROFILING_MAX_MB megabytes.
+"""
+
+import cProfile
+import os
+import re
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, namedtuple
+from datetime import datetime, timezone
+from typing import List, Optional
+
+PROFILE_KINDS = {'cprofile': 'prof', 'sample': 'folded'}
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+NAME_PATTERN = re.compile(r'^(\d{8}T\d{6}Z)-([a-z0-9-]+)-(\d+)ms-([0-9a-f]{8})\.(prof|folded)$')
+
+ProfilingConfig = namedtuple('ProfilingConfig', 'admin_keys sample_rate sample_kind directory max_files max_bytes')
+
+
+def load_profiling_config(environ=os.environ) -> ProfilingConfig:
+    """Admin keys, sampling and the profile directory's bounds from the environment"""
+    sample_kind = environ.get('SBTC_PROFILING_SAMPLE_KIND', 'sample')
+    if sample_kind not in PROFILE_KINDS:
+        raise ValueError(f"SBTC_PROFILING_SAMPLE_KIND must be one of {', '.join(PROFILE_KINDS)}")
+    sample_rate = float(environ.get('SBTC_PROFILING_SAMPLE_RATE', 0))
+    if not 0 <= sample_rate <= 1:
+        raise ValueError("SBTC_PROFILING_SAMPLE_RATE must be between 0 and 1")
+    return ProfilingConfig(
+        admin_keys=frozenset(filter(None, (key.strip() for key in environ.get('SBTC_ADMIN_KEYS', '').split(',')))),
+        sample_rate=sample_rate,
+        sample_kind=sample_kind,
+        directory=environ.get('SBTC_PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'sbtc-profiles')),
+        max_files=int(environ.get('SBTC_PROFILING_MAX_FILES', 50)),
+        max_bytes=int(float(environ.get('SBTC_PROFILING_MAX_MB', 100)) * 1024 * 1024),
+    )
+
+
+class StackSampler:
+    """Statistical profiler: samples one thread's Python stack from a background thread"""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path: str):
+        """Folded stacks, one "frame;frame;frame count" line per distinct stack"""
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class RequestProfiler:
+    """Profile of the current thread between start() and stop(), of the given kind"""
+
+    def __init__(self, kind: str):
+        if kind not in PROFILE_KINDS:
+            raise ValueError(f"Unknown profile kind {kind!r}; expected one of {', '.join(PROFILE_KINDS)}")
+        self.kind = kind
+        self.started = None
+        self.duration = None
+        self._profiler = None
+
+    def start(self):
+        """Start profiling; raises ValueError if another profiler is already active (cProfile)"""
+        self.started = time.perf_counter()
+        if self.kind == 'cprofile':
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = StackSampler(threading.get_ident()).start()
+        return self
+
+    def stop(self):
+        if self.duration is None:
+            if self.kind == 'cprofile':
+                self._profiler.disable()
+            else:
+                self._profiler.stop()
+            self.duration = time.perf_counter() - self.started
+        return self
+
+    def dump(self, path: str):
+        if self.kind == 'cprofile':
+            self._profiler.dump_stats(path)
+        else:
+            self._profiler.dump(path)
+
+
+class ProfileStore:
+    """Directory of profiles, oldest removed beyond max_files or max_bytes"""
+
+    def __init__(self, directory: str, max_files: int = 50, max_bytes: int = 100 * 1024 * 1024):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()  # serializes rotation
+
+    def save(self, profiler: RequestProfiler, route: str) -> str:
+        """Write a stopped profiler's profile; returns its name"""
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        slug = re.sub(r'[^a-z0-9]+', '-', route.lower()).strip('-') or 'root'
+        name = (f"{stamp}-{slug}-{round(profiler.duration * 1000)}ms-{secrets.token_hex(4)}"
+                f".{PROFILE_KINDS[profiler.kind]}")
+        temporary = os.path.join(self.directory, f".{name}.tmp")
+        profiler.dump(temporary)
+        os.replace(temporary, os.path.join(self.directory, name))
+        self.rotate()
+        return name
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory) if os.path.isdir(self.directory) else ():
+            match = NAME_PATTERN.match(name)
+            if match is None:
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue  # rotated away concurrently
+            entries.append((stat.st_mtime, name, stat.st_size, match))
+        return sorted(entries)
+
+    def rotate(self):
+        """Remove the oldest profiles until the directory is within its bounds"""
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, _, size, _ in entries)
+            while entries and (len(entries) > self.max_files or total > self.max_bytes):
+                _, name, size, _ = entries.pop(0)
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def list(self) -> List[dict]:
+        """Profiles, newest first"""
+        profiles = []
+        for mtime, name, size, match in reversed(self._entries()):
+            stamp, route, duration_ms, _, extension = match.groups()
+            profiles.append({
+                'name': name,
+                'kind': next(kind for kind, ext in PROFILE_KINDS.items() if ext == extension),
+                'route': route,
+                'duration_ms': int(duration_ms),
+                'size': size,
+                'created': datetime.fromtimestamp(mtime, timezone.utc).isoformat(),
+            })
+        return profiles
+
+    def path(self, name: str) -> Optional[str]:
+        """Path of a stored profile, or None for names that are not profiles in this directory"""
+        if NAME_PATTERN.match(name) is None:
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
@@ -0,0 +1,104 @@
+"""
+Rate limits for the SBTC Oracle API
+Every request takes a token from the client's `read` bucket; requests that
+fetch the price history and run the computation (a /sbtc/current cache miss,
+/sbtc/series, an auto-computed datapoint) also take one from its `compute`
+bucket. Buckets live in shared memory (shared_state.TokenBuckets), so the
+limits hold across all workers. Limits are "requests/seconds":
+
+    SBTC_RATE_LIMIT_COMPUTE=30/60 SBTC_RATE_LIMIT_READ=600/60
+
+Clients are identified by address, or by X-API-Key for keys listed with their
+own quotas in the JSON file named by SBTC_API_QUOTAS:
+
+    {"publisher-key": {"compute": "600/60", "read": "6000/60"}}
+
+Behind reverse proxies every request comes from the proxy's address; set
+SBTC_TRUSTED_PROXIES to the number of proxies in front of the API so the
+client address is taken from X-Forwarded-For (entries added by clients
+themselves, left of the trusted ones, are ignored).
+
+SBTC_RATE_LIMIT=off disables limiting.
+"""
+
+import json
+import math
+import os
+from collections import namedtuple
+from typing import Dict, Optional
+
+BUCKET_CLASSES = ('compute', 'read')
+DEFAULT_LIMITS = {'compute': '30/60', 'read': '600/60'}
+
+
+class Limit(namedtuple('Limit', 'requests seconds')):
+    """Burst of `requests`, refilled evenly over `seconds`"""
+
+    @property
+    def rate(self) -> float:
+        return self.requests / self.seconds
+
+    @property
+    def policy(self) -> str:
+        return f"{self.requests};w={self.seconds:g}"
+
+
+def parse_limit(spec: str) -> Limit:
+    """'30/60' -> Limit(30, 60.0)"""
+    try:
+        requests, _, seconds = str(spec).partition('/')
+        limit = Limit(int(requests), float(seconds or 1))
+    except ValueError:
+        raise ValueError(f"Invalid rate limit {spec!r}; expected requests/seconds, e.g. 30/60")
+    if limit.requests < 1 or limit.seconds <= 0:
+        raise ValueError(f"Invalid rate limit {spec!r}")
+    return limit
+
+
+def load_limits(environ=os.environ) -> Dict[str, Limit]:
+    """Default limit per bucket class from the environment (empty when disabled)"""
+    if environ.get('SBTC_RATE_LIMIT', 'on').lower() in ('off', '0', 'false'):
+        return {}
+    return {name: parse_limit(environ.get(f"SBTC_RATE_LIMIT_{name.upper()}", DEFAULT_LIMITS[name]))
+            for name in BUCKET_CLASSES}
+
+
+def load_quotas(path: Optional[str] = None) -> Dict[str, Dict[str, Limit]]:
+    """Per-API-key limits from the JSON file at path (default: $SBTC_API_QUOTAS)"""
+    path = path or os.environ.get('SBTC_API_QUOTAS')
+    if not path:
+        return {}
+    with open(path) as f:
+        config = json.load(f)
+    quotas = {}
+    for key, limits in config.items():
+        unknown = set(limits) - set(BUCKET_CLASSES)
+        if unknown:
+            raise ValueError(f"Quota for key {key[:4]}…: unknown bucket classes {sorted(unknown)}")
+        quotas[key] = {name: parse_limit(spec) for name, spec in limits.items()}
+    return quotas
+
+
+def load_trusted_proxies(environ=os.environ) -> int:
+    """Number of reverse proxies whose X-Forwarded-For entries are trusted (0: none)"""
+    value = environ.get('SBTC_TRUSTED_PROXIES', '0')
+    try:
+        count = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid SBTC_TRUSTED_PROXIES {value!r}; expected a number of proxies")
+    if count < 0:
+        raise ValueError(f"Invalid SBTC_TRUSTED_PROXIES {value!r}")
+    return count
+
+
+def rate_limit_headers(limit: Limit, decision) -> dict:
+    """RateLimit-* headers (IETF draft) for a bucket decision; Retry-After when refused"""
+    headers = {
+        'RateLimit-Limit': str(limit.requests),
+        'RateLimit-Remaining': str(decision.remaining),
+        'RateLimit-Reset': str(math.ceil(decision.reset)),
+        'RateLimit-Policy': limit.policy,
+    }
+    if not decision.allowed:
+        headers['Retry-After'] = str(math.ceil(decision.retry_after))
+    return headers
@@ -0,0 +1,143 @@
+"""
+Rolling-window statistics for the SBTC indicators
+Batch functions compute a whole series at once from blocked cumulative sums;
+RollingWindow keeps a ring buffer with Welford running mean/variance for
+streaming updates. Both follow pandas rolling(window, min_periods) semantics:
+a window covers the last `window` positions and NaNs in it are skipped
+"""
+
+import math
+
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+
+
+def _windowed_sum(values, window):
+    """Sum of each trailing window from cumulative sums restarted every `window` values
+
+    With one running cumsum over the whole series, a window sum is the
+    difference of two large prefixes and loses digits as the series grows.
+    Restarting per block keeps every prefix within one window's magnitude:
+    sum(i-w+1..i) = P[b, j] + (T[b-1] - P[b-1, j]) for i = b*w + j.
+    """
+    n = len(values)
+    blocks = -(-n // window)
+    padded = np.zeros(blocks * window)
+    padded[:n] = values
+    prefix = np.cumsum(padded.reshape(blocks, window), axis=1)
+    sums = prefix.copy()
+    sums[1:] += prefix[:-1, -1:] - prefix[:-1]
+    return sums.ravel()[:n]
+
+
+def _window_sums(x, window):
+    """Per-position count, sum and sum of squares of the non-NaN values in each window
+
+    Values are centered on their mean first so the sum-of-squares difference
+    does not lose precision for large-magnitude inputs such as prices.
+    """
+    x = np.asarray(x, dtype=float)
+    valid = ~np.isnan(x)
+    shift = x[valid].mean() if valid.any() else 0.0
+    centered = np.where(valid, x - shift, 0.0)
+    return (_windowed_sum(valid.astype(float), window), _windowed_sum(centered, window),
+            _windowed_sum(centered * centered, window), shift)
+
+
+def rolling_mean(x, window: int, min_periods: int = 1):
+    """Mean over each trailing window (NaN where fewer than min_periods valid values)"""
+    count, total, _, shift = _window_sums(x, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count + shift
+    mean[count < max(min_periods, 1)] = np.nan
+    return mean
+
+
+def rolling_std(x, window: int, ddof: int = 0, min_periods: int = 1):
+    """Standard deviation over each trailing window (ddof=0: population, 1: sample)"""
+    count, total, squares, _ = _window_sums(x, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        deviations = squares - total * total / count
+        variance = deviations / (count - ddof)
+    # Near-constant windows (a single value, a run of equal returns) cancel to
+    # rounding noise, which 1/vol weights would amplify; recompute those exactly
+    x = np.asarray(x, dtype=float)
+    for i in np.flatnonzero((deviations <= 1e-6 * squares) & (count - ddof > 0)):
+        values = x[max(i - window + 1, 0):i + 1]
+        variance[i] = np.var(values[~np.isnan(values)], ddof=ddof)
+    variance = np.maximum(variance, 0.0)
+    variance[(count < max(min_periods, 1)) | (count - ddof <= 0)] = np.nan
+    return np.sqrt(variance)
+
+
+class RollingWindow:
+    """Streaming mean/std over the last `window` values with O(1) push
+
+    Sliding Welford updates add the new value and remove the evicted one; the
+    accumulators are recomputed exactly from the ring buffer once per window
+    so rounding error cannot build up over long streams.
+    """
+
+    def __init__(self, window: int, ddof: int = 0, min_periods: int = 1):
+        self.window = window
+        self.ddof = ddof
+        self.min_periods = max(min_periods, 1)
+        self.buffer = [math.nan] * window
+        self.head = 0
+        self.pushed = 0
+        self.count = 0  # valid (non-NaN) values in the window
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def push(self, x: float):
+        x = float(x)
+        evicted = self.buffer[self.head]
+        self.buffer[self.head] = x
+        self.head = (self.head + 1) % self.window
+        self.pushed += 1
+        if self.pushed > self.window and not math.isnan(evicted):
+            self._remove(evicted)
+        if not math.isnan(x):
+            self._add(x)
+        if self.pushed % self.window == 0:
+            self._resync()
+
+    def extend(self, values):
+        for x in values:
+            self.push(x)
+
+    def _add(self, x):
+        self.count += 1
+        delta = x - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (x - self._mean)
+
+    def _remove(self, x):
+        if self.count <= 1:
+            self.count, self._mean, self._m2 = 0, 0.0, 0.0
+            return
+        self.count -= 1
+        delta = x - self._mean
+        self._mean -= delta / self.count
+        self._m2 = max(self._m2 - delta * (x - self._mean), 0.0)
+
+    def _resync(self):
+        values = [v for v in self.buffer if not math.isnan(v)]
+        self.count = len(values)
+        self._mean = math.fsum(values) / self.count if values else 0.0
+        self._m2 = math.fsum((v - self._mean) ** 2 for v in values)
+
+    @property
+    def mean(self) -> float:
+        return self._mean if self.count >= self.min_periods else math.nan
+
+    @property
+    def var(self) -> float:
+        if self.count < self.min_periods or self.count - self.ddof <= 0:
+            return math.nan
+        return self._m2 / (self.count - self.ddof)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.var)
@@ -1,18 +1,92 @@
-import numpy as np
-import pandas as pd
-import requests
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import json
-from flask import Flask, jsonify, request
+import os
+from flask import Flask, Response, g, request, send_file
+from werkzeug.middleware.proxy_fix import ProxyFix
+import random
+import time
 import traceback
 
+from lazy_imports import lazy_import, preload
+
+from api_encoding import negotiate, pa, respond
+from checkpoint import Checkpointer, SnapshotError, fingerprint, read_snapshot
+from event_stream import EventBroadcaster
+from shared_state import SharedState
+from powerlaw import weight_table
+from sbtc_compute import (
+    PROFILES, SBTC_PROFILE, SKIP_COUNT_KEYS, compute_sbtc, compute_sbtc_series, get_adjusted_parameters,
+    get_parameters, latest_regression_window, simplified_sbtc, weighted_ridge_powerlaw,
+)
+from uncertainty import UNCERTAINTY_METHODS, UncertaintyEstimator
+from intraday import HermesStream, IntradayFeed, ReplayStream
+from profiling import PROFILE_KINDS, ProfileStore, RequestProfiler, load_profiling_config
+from price_sources import DEFAULT_SOURCES, HistoryCache, PriceAggregator, PriceSourceError, build_sources
+from ratelimit import load_limits, load_quotas, load_trusted_proxies, rate_limit_headers
+
+from http_cache import (
+    cache_headers, is_not_modified, last_bar_date, last_daily_close, make_etag, not_modified,
+    seconds_until_next_close,
+)
+
+# The scientific stack loads on first compute (create_app(warm=True) preloads it)
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
 # Genesis date for Bitcoin (July 17, 2010)
 GENESIS_DATE = datetime(2010, 7, 17)
 
 app = Flask(__name__)
 
-# In-memory storage for datapoints (in production, use a database)
-datapoints_storage = []
+# Price history, latest /sbtc/current payload and datapoints, shared by all workers
+# forked after create_app() (a process-local instance until then)
+state = SharedState()
+
+# Days of BTC history used for /sbtc/current
+SBTC_HISTORY_DAYS = 1000
+
+# Fewest days /sbtc/series will compute a curve over
+SBTC_MIN_SERIES_DAYS = 100
+
+# Push channel for new datapoints and target prices (GET /stream), over the shared event ring
+events = EventBroadcaster(ring=state.events)
+
+# Built on first use from SBTC_PRICE_SOURCES (see price_sources.build_sources)
+history_cache = None
+# Price history older than this is refreshed in the background (seconds)
+HISTORY_MAX_AGE = 3600
+
+# Intraday provisional target: 'hermes' (live Pyth stream), 'replay:<file>' (recorded messages) or off
+INTRADAY_STREAM = os.environ.get('SBTC_INTRADAY_STREAM', 'off')
+# Minimum seconds between 'provisional' events on /stream (ticks arrive several times a second)
+PROVISIONAL_EVENT_INTERVAL = float(os.environ.get('SBTC_PROVISIONAL_INTERVAL', 5))
+intraday_feed = None
+intraday_feed_pid = None
+last_provisional_event = 0.0
+
+# Confidence intervals for /sbtc/current?uncertainty=true, resampled on a process pool
+uncertainty = UncertaintyEstimator(resamples=int(os.environ.get('SBTC_UNCERTAINTY_RESAMPLES', 500)),
+                                   budget=float(os.environ.get('SBTC_UNCERTAINTY_BUDGET', 2.0)))
+
+# Token buckets per client for all requests ('read') and for fetch-and-compute
+# requests ('compute'), kept in shared memory (see ratelimit.py)
+RATE_LIMITS = load_limits()
+API_QUOTAS = load_quotas()
+RATE_LIMIT_EXEMPT = ('/health',)
+# Reverse proxies in front of the API whose X-Forwarded-For entries identify clients
+TRUSTED_PROXIES = load_trusted_proxies()
+
+# Opt-in profiles of fetch-and-compute requests, asked for by admin keys (X-Profile header or
+# ?profiling=) or sampled at SBTC_PROFILING_SAMPLE_RATE, kept in a bounded directory (see profiling.py)
+PROFILING = load_profiling_config()
+profile_store = ProfileStore(PROFILING.directory, PROFILING.max_files, PROFILING.max_bytes)
+PROFILED_ROUTES = ('/sbtc/current', '/sbtc/series', '/datapoints/store')
+
+# Warm-restart snapshot of the shared history, the SBTC curves and the result cache
+# (checkpoint.py), rewritten every SBTC_SNAPSHOT_INTERVAL seconds; off unless a path is set
+SNAPSHOT_PATH = os.environ.get('SBTC_SNAPSHOT')
+SNAPSHOT_INTERVAL = float(os.environ.get('SBTC_SNAPSHOT_INTERVAL', 300))
+checkpointer = None
 
 def get_days_since_genesis(date):
     """Calculate days since genesis, ensuring >=1."""
@@ -23,76 +97,75 @@ def get_days_since_genesis(date):
         date_dt = datetime.combine(date, datetime.min.time())
     return max((date_dt - GENESIS_DATE).days, 1)
 
-def get_btc_historical_pyth(days=365):
-    """Fetch historical BTC/USD daily prices from Pyth Network API."""
-    print(f"Fetching {days} days of Bitcoin data from Pyth Network...")
-    
-    # Pyth Network BTC/USD price feed ID for Solana
-    price_feed_id = "8SXvChNYFh3qEi4J6tK1wQREu5x6YdE3C6HmZzThoG6E"
-    
-    # Pyth Network API endpoint for historical data
-    url = f"https://hermes.pyth.network/v2/updates/price/{price_feed_id}"
-    
-    # Calculate start and end timestamps
-    end_time = datetime.now()
-    start_time = end_time - timedelta(days=days)
-    
-    params = {
-        'start_time': int(start_time.timestamp()),
-        'end_time': int(end_time.timestamp()),
-        'interval': '1d'  # Daily interval
-    }
+def get_history_cache():
+    """Shared stale-while-revalidate cache over the sources in SBTC_PRICE_SOURCES."""
+    global history_cache
+    if history_cache is None:
+        history_cache = HistoryCache(PriceAggregator(build_sources()), max_age=HISTORY_MAX_AGE,
+                                     on_refresh=publish_history)
+    return history_cache
+
+def publish_history(days, snapshot):
+    """Copy a freshly fetched history into shared memory for every worker."""
+    if days != SBTC_HISTORY_DAYS:
+        return
+    df = snapshot.df
+    state.history.write(days, df['timestamp'].to_numpy(), df['price'].to_numpy(), df['sources_used'].to_numpy(),
+                        snapshot.fetched_at, snapshot.source_status)
+
+def history_frame(days, fetched_at, source_status, timestamps, prices, sources_used):
+    """DataFrame (copied out of the shared arrays) in the get_btc_history layout."""
+    df = pd.DataFrame({'timestamp': timestamps, 'price': prices, 'sources_used': sources_used},
+                      index=pd.Index(pd.to_datetime(timestamps, unit='ms').date, name='date'))
+    df.attrs.update(days=days, fetched_at=fetched_at, source_status=source_status)
+    return df
+
+def get_btc_history(days=365):
+    """Consensus BTC/USD daily history from all configured price sources (recent first).
     
-    headers = {
-        'User-Agent': 'SBTC-Oracle/1.0',
-        'Accept': 'application/json'
+    Stale history is returned immediately while a background refresh runs, so a
+    dead upstream never blocks the request. Raises PriceSourceError only if no
+    source has returned data since startup. df.attrs carries fetched_at and
+    source_status.
+    """
+    cache = get_history_cache()
+    fresh_after = last_daily_close().timestamp()
+    df = state.history.read(history_frame) if days == SBTC_HISTORY_DAYS else None
+    if df is not None and df.attrs['days'] == days:
+        # Another worker (or the master) already fetched it
+        fetched_at = df.attrs['fetched_at']
+        if fetched_at < fresh_after or time.time() - fetched_at > HISTORY_MAX_AGE:
+            cache.revalidate(days)
+    else:
+        snapshot = cache.get(days, fresh_after=fresh_after)
+        df = snapshot.df.copy()
+        df.attrs['fetched_at'] = snapshot.fetched_at
+        df.attrs['source_status'] = cache.source_status
+    df['days'] = [get_days_since_genesis(d) for d in df.index]
+    return df
+
+def data_freshness(df):
+    """data_age (seconds since the history was fetched) and per-source status."""
+    return {
+        'data_age': round(time.time() - df.attrs.get('fetched_at', time.time()), 1),
+        'source_status': df.attrs.get('source_status', {}),
     }
-    
-    try:
-        response = requests.get(url, params=params, headers=headers)
-        print(f"Pyth API Response Status: {response.status_code}")
-        
-        if response.status_code != 200:
-            print(f"Pyth API Error response: {response.text}")
-            # Fallback to a simple price simulation for testing
-            print("Falling back to simulated data for testing...")
-            return get_simulated_btc_data(days)
-        
-        data = response.json()
-        print(f"Received data from Pyth Network")
-        
-        # Process Pyth Network data format
-        if 'price_updates' in data:
-            prices = []
-            for update in data['price_updates']:
-                if 'price' in update and 'timestamp' in update:
-                    prices.append({
-                        'timestamp': update['timestamp'] * 1000,  # Convert to milliseconds
-                        'price': update['price']
-                    })
-        else:
-            # If data format is different, fallback to simulation
-            print("Unexpected Pyth data format, using simulation...")
-            return get_simulated_btc_data(days)
-        
-        if len(prices) == 0:
-            print("No price data from Pyth, using simulation...")
-            return get_simulated_btc_data(days)
-        
-        df = pd.DataFrame(prices, columns=['timestamp', 'price'])
-        df['date'] = pd.to_datetime(df['timestamp'], unit='ms').dt.date
-        df = df.set_index('date')
-        df['days'] = [get_days_since_genesis(d) for d in df.index]
-        df = df.sort_index(ascending=False)  # Recent first
-        return df
-        
-    except Exception as e:
-        print(f"Error fetching from Pyth Network: {e}")
-        print("Falling back to simulated data...")
-        return get_simulated_btc_data(days)
+
+def describe_price_sources(df):
+    """Human-readable list of the sources behind a consensus history."""
+    used = [name for name, info in df.attrs.get('source_status', {}).items() if info['status'] == 'ok']
+    return f"Median consensus of {', '.join(used)}" if used else 'Consensus of configured price sources'
+
+def price_sources_unavailable(e):
+    """503 response for when no price history has ever been fetched."""
+    return respond({
+        'error': f'No price data available: {e}',
+        'source_status': get_history_cache().source_status,
+        'success': False
+    }, 503)
 
 def get_simulated_btc_data(days=365):
-    """Generate simulated BTC price data for testing when Pyth API is unavailable."""
+    """Generate simulated BTC price data for tests (never served in place of real prices)."""
     print(f"Generating {days} days of simulated BTC data for testing...")
     
     # Start with current BTC price around $46,521
@@ -125,199 +198,381 @@ def get_simulated_btc_data(days=365):
     print(f"Generated {len(df)} simulated price points")
     return df
 
-def weighted_ridge_powerlaw(src, vol, len_, offs, time_pow, vol_pow, lam):
-    """Weighted ridge power law regression function."""
-    sum_w = 0.0
-    sum_w_logx = 0.0
-    sum_w_logy = 0.0
-    sum_w_logx_logy = 0.0
-    sum_w_logx_logx = 0.0
-    
-    for k in range(len_):
-        time_w = np.power(len_ - k, time_pow)
-        v = 0.01 if np.isnan(vol[k]) else vol[k]
-        vol_w = 1.0 / np.power(np.abs(v) + 1e-10, vol_pow)
-        w = time_w * vol_w
-        
-        x = float(len_ - k)
-        y = src[k]
-        
-        if np.isnan(y) or np.isnan(w) or y <= 0 or x <= 0:
-            continue
-            
-        log_x = np.log(x)
-        log_y = np.log(y)
-        
-        sum_w += w
-        sum_w_logx += w * log_x
-        sum_w_logy += w * log_y
-        sum_w_logx_logy += w * log_x * log_y
-        sum_w_logx_logx += w * log_x * log_x
-    
-    if sum_w == 0:
-        return np.nan
-    
-    xm = sum_w_logx / sum_w
-    ym = sum_w_logy / sum_w
-    num = sum_w_logx_logy - sum_w * xm * ym
-    denom = sum_w_logx_logx - sum_w * xm * xm
-    
-    b = num / (denom + lam) if denom + lam > 0 else np.nan
-    c = ym - b * xm if not np.isnan(b) else np.nan
-    
-    if np.isnan(c) or np.isnan(b):
-        return np.nan
-    
-    return np.exp(c + b * np.log(float(len_ - offs)))
+def request_profile():
+    """Profile named by the ?profile= query parameter, or None if it is unknown."""
+    profile = request.args.get('profile', SBTC_PROFILE)
+    return profile if profile in PROFILES else None
 
-def compute_sbtc(df, length=1000, lambda_=50, time_weight_power=1.5, vol_weight_power=1.5,
-                 vol_length=20, input_smooth_length=150, output_smooth_length=1000,
-                 k=0.1, stdev_length=1000):
-    """Compute the SBTC indicator value for the current (most recent) day."""
-    close = df['price'].values  # Recent first
-    
-    # Calculate log returns and volatility
-    log_return = np.diff(np.log(close), prepend=np.nan)
-    vol = pd.Series(log_return).rolling(vol_length, min_periods=1).std(ddof=0).values
-    
-    # Input smoothing
-    smoothed_close = pd.Series(close).rolling(input_smooth_length, min_periods=1).mean().values
+def result_key(bar_date, profile, method=None):
+    """Shared-result key: the bar date, qualified by a non-default profile and the uncertainty method."""
+    qualifiers = [part for part in (profile != SBTC_PROFILE and profile, method) if part]
+    return ':'.join([str(bar_date)] + qualifiers) if qualifiers else bar_date
+
+def unknown_profile():
+    return respond({
+        'error': f"Unknown profile {request.args.get('profile')}; available: {', '.join(PROFILES)}",
+        'success': False
+    }, 400)
+
+def trust_proxies(count):
+    """Take request.remote_addr from the X-Forwarded-For entries of `count` trusted proxies (0: the socket peer)."""
+    global TRUSTED_PROXIES
+    TRUSTED_PROXIES = count
+    wsgi_app = app.wsgi_app.app if isinstance(app.wsgi_app, ProxyFix) else app.wsgi_app
+    app.wsgi_app = ProxyFix(wsgi_app, x_for=count) if count else wsgi_app
+
+trust_proxies(TRUSTED_PROXIES)
+
+def rate_limit(bucket_class):
+    """Take a token from the client's bucket; returns a 429 response when it is empty, else None."""
+    if bucket_class not in RATE_LIMITS:
+        return None
+    api_key = request.headers.get('X-API-Key')
+    quota = API_QUOTAS.get(api_key)
+    client = f"key:{api_key}" if quota is not None else f"ip:{request.remote_addr}"
+    limit = (quota or {}).get(bucket_class, RATE_LIMITS[bucket_class])
+    decision = state.rate_limits.take(f"{bucket_class}:{client}", limit.requests, limit.rate)
+    g.rate_limit = rate_limit_headers(limit, decision)
+    if decision.allowed:
+        return None
+    return respond({
+        'error': f"Too many {bucket_class} requests; retry in {g.rate_limit['Retry-After']}s",
+        'success': False
+    }, 429)
+
+@app.before_request
+def limit_requests():
+    if request.path not in RATE_LIMIT_EXEMPT:
+        return rate_limit('read')
+
+@app.after_request
+def add_rate_limit_headers(response):
+    response.headers.update(g.get('rate_limit', {}))
+    return response
+
+def is_admin():
+    """Whether the request carries one of the SBTC_ADMIN_KEYS."""
+    return request.headers.get('X-API-Key') in PROFILING.admin_keys
+
+def admin_required():
+    return respond({
+        'error': 'This requires an admin API key (X-API-Key)',
+        'success': False
+    }, 403)
+
+@app.before_request
+def start_profiling():
+    """Profile this request if an admin asked for it or it was sampled (after the rate limit check)."""
+    if request.path not in PROFILED_ROUTES:
+        return None
+    kind = request.headers.get('X-Profile') or request.args.get('profiling')
+    if kind:
+        if not is_admin():
+            return admin_required()
+        if kind not in PROFILE_KINDS:
+            return respond({
+                'error': f"profiling must be one of {', '.join(PROFILE_KINDS)}",
+                'success': False
+            }, 400)
+    elif PROFILING.sample_rate and random.random() < PROFILING.sample_rate:
+        kind = PROFILING.sample_kind
+    else:
+        return None
+    try:
+        g.profiler = RequestProfiler(kind).start()
+    except ValueError as e:
+        print(f"Not profiling {request.path}: {e}")
+    return None
+
+@app.after_request
+def save_profile(response):
+    """Store the request's profile and name it in X-Profile-Id."""
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        try:
+            response.headers['X-Profile-Id'] = profile_store.save(profiler.stop(), request.path)
+        except OSError as e:
+            print(f"Could not save profile of {request.path}: {e}")
+    return response
+
+@app.teardown_request
+def stop_profiling(exc):
+    """Stop a profiler left running by an unhandled exception."""
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+
+def intraday_base(day):
+    """Closed daily bars before day (recent first) and the parameters for the provisional target."""
+    df = get_btc_history(days=SBTC_HISTORY_DAYS)
+    closed = df[df.index < day]
+    return closed, get_parameters(len(closed) + 1, SBTC_PROFILE)
+
+def publish_provisional(result):
+    """Push the provisional target on /stream, at most every PROVISIONAL_EVENT_INTERVAL seconds."""
+    global last_provisional_event
+    if time.time() - last_provisional_event >= PROVISIONAL_EVENT_INTERVAL:
+        last_provisional_event = time.time()
+        events.publish('provisional', result, timestamp=result['publish_time'])
+
+def get_intraday_feed():
+    """This process's intraday feed, started on first use (threads do not survive the fork)."""
+    global intraday_feed, intraday_feed_pid
+    if INTRADAY_STREAM == 'off':
+        return None
+    if intraday_feed_pid != os.getpid():
+        if INTRADAY_STREAM.startswith('replay:'):
+            stream = ReplayStream(INTRADAY_STREAM[len('replay:'):], speed=1.0)
+        else:
+            stream = HermesStream()
+        intraday_feed = IntradayFeed(stream, intraday_base, on_update=publish_provisional).start()
+        intraday_feed_pid = os.getpid()
+    return intraday_feed
+
+def uncertainty_method(value):
+    """Method named by the uncertainty query parameter (true means bootstrap, absent/false None)."""
+    value = (value or 'false').lower()
+    if value in ('false', '0', 'no'):
+        return None
+    return 'bootstrap' if value in ('true', '1', 'yes') else value
+
+def estimate_uncertainty(df, params, bar_date, method, target, algorithm):
+    """Confidence interval of the latest power-law fit (fit_percentiles).
     
-    # Power law regression
-    plr = np.full(len(close), np.nan)
-    for i in range(length - 1, len(close)):
-        src_slice = smoothed_close[i - length + 1:i + 1]
-        vol_slice = vol[i - length + 1:i + 1]
-        plr[i] = weighted_ridge_powerlaw(src_slice, vol_slice, length, 0, 
-                                       time_weight_power, vol_weight_power, lambda_)
+    The band describes the ridge regression fit. It is also scaled onto the
+    target (target_percentiles) only when the full algorithm produced the
+    target; the simplified blend does not come from the fit.
+    """
+    window = latest_regression_window(df, **params)
+    estimate = uncertainty.estimate((bar_date, len(df), tuple(sorted(params.items()))), window, method)
+    estimate['fit_percentiles'] = fit_percentiles = estimate.pop('percentiles')
+    fit = estimate['fit']
+    if algorithm == 'full':
+        estimate['target_percentiles'] = {
+            name: None if value is None or not fit > 0 else float(target) * value / fit
+            for name, value in fit_percentiles.items()
+        }
+    return estimate
+
+class TargetUnavailable(ValueError):
+    """The target cannot be computed from the history available (answered with 400)."""
+
+def cached_target(bar_date, profile, method=None):
+    """The /sbtc/current payload already computed for this bar and profile, or None (O(1))."""
+    return state.result.get(result_key(bar_date, profile, method))
+
+def compute_target(bar_date, profile, method=None):
+    """Compute the /sbtc/current payload from the shared price history.
     
-    # Output smoothing
-    smoothed_plr = pd.Series(plr).rolling(output_smooth_length, min_periods=1).mean().values
+    Shared by /sbtc/current and auto-computed datapoints, so both report the same
+    target, algorithm and parameters. The payload goes into the shared result
+    cache unless it was computed from stale history or its uncertainty estimate
+    is unfinished; returns (payload, cacheable).
+    """
+    # Fetch 1000 days of consensus historical data from the configured price sources
+    df = get_btc_history(days=SBTC_HISTORY_DAYS)
+    print(f"Data points: {len(df)}")
+    if len(df) == 0:
+        raise TargetUnavailable('No data available')
     
-    # Dampening mechanism
-    final_plr = np.full(len(close), np.nan)
-    threshold = k * pd.Series(log_return).rolling(stdev_length, min_periods=1).std(ddof=0).values
+    # Adjust the profile's parameters based on available data
+    params = get_parameters(len(df), profile)
+    print(f"Using {profile} parameters: length={params['length']}, input_smooth={params['input_smooth_length']}, "
+          f"output_smooth={params['output_smooth_length']}")
     
-    for i in range(len(close)):
-        if i == 0 or np.isnan(final_plr[i - 1]):
-            final_plr[i] = smoothed_plr[i]
+    # The full algorithm when it is defined for the latest bar, else the simplified blend
+    algorithm = 'simplified'
+    sbtc_value = simplified_sbtc(df['price'].values)
+    skipped = dict.fromkeys(SKIP_COUNT_KEYS, 0)
+    try:
+        full_sbtc = compute_sbtc(df, skipped=skipped, **params)
+        if not np.isnan(full_sbtc):
+            algorithm, sbtc_value = 'full', full_sbtc
         else:
-            deviation_rel = np.log(smoothed_plr[i] / final_plr[i - 1]) if final_plr[i - 1] != 0 else 0
-            if np.isnan(deviation_rel) or np.isnan(threshold[i]):
-                final_plr[i] = final_plr[i - 1]
-            else:
-                adjusted_dev = np.sign(deviation_rel) * threshold[i] if np.abs(deviation_rel) > threshold[i] else deviation_rel
-                final_plr[i] = final_plr[i - 1] * np.exp(adjusted_dev)
+            print("Full SBTC algorithm returned NaN, using simplified calculation")
+    except Exception as e:
+        print(f"Full SBTC algorithm failed: {e}, using simplified calculation")
+    print(f"SBTC target ({algorithm}): ${sbtc_value:.2f}")
+    
+    if np.isnan(sbtc_value):
+        raise TargetUnavailable('SBTC computation resulted in NaN')
     
-    return final_plr[0]  # Current SBTC value
+    current_btc_price = df['price'].iloc[0]
+    payload = {
+        'success': True,
+        'data': {
+            'current_btc_price': float(current_btc_price),
+            'sbtc_target_price': float(sbtc_value),
+            'sbtc_scaled_cents': int(sbtc_value * 100),  # Scaled to cents for on-chain u64
+            'data_points_used': len(df),
+            'algorithm': algorithm,
+            'profile': profile,
+            'parameters': params,
+            'skipped_points': skipped,
+            'computation_timestamp': datetime.now().isoformat(),
+            'data_source': describe_price_sources(df),
+            **data_freshness(df)
+        }
+    }
+    cacheable = df.attrs.get('fetched_at', time.time()) >= last_daily_close().timestamp()
+    if method:
+        payload['data']['uncertainty'] = estimate_uncertainty(df, params, bar_date, method, sbtc_value, algorithm)
+        # The remaining resamples finish in the background; the next request gets them
+        cacheable = cacheable and payload['data']['uncertainty']['complete']
+    if cacheable:
+        state.result.put(result_key(bar_date, profile, method), payload)
+    events.publish('target', payload['data'])
+    return payload, cacheable
 
 @app.route('/sbtc/current', methods=['GET'])
 def get_current_sbtc():
     """API endpoint to compute current SBTC target price using last 1000 days of BTC data."""
     try:
-        # Fetch 1000 days of historical data from Pyth Network
-        print("Fetching 1000 days of Bitcoin historical data from Pyth Network...")
-        df = get_btc_historical_pyth(days=1000)
-        print(f"Data points: {len(df)}")
-        
-        if len(df) == 0:
-            return jsonify({
-                'error': 'No data available',
+        method = uncertainty_method(request.args.get('uncertainty'))
+        if method not in UNCERTAINTY_METHODS + (None,):
+            return respond({
+                'error': f"uncertainty must be true, false or one of {', '.join(UNCERTAINTY_METHODS)}",
                 'success': False
-            }), 400
-        
-        # Compute SBTC target price with adjusted parameters for smaller dataset
-        print("Computing SBTC target price...")
-        data_length = len(df)
-        print(f"Available data points: {data_length}")
-        
-        # Adjust parameters based on available data
-        length = min(300, data_length - 50)  # Use 300 days or available data minus buffer
-        input_smooth = min(50, data_length // 10)  # 10% of data or 50, whichever is smaller
-        output_smooth = min(200, data_length // 5)  # 20% of data or 200, whichever is smaller
-        stdev_length = min(200, data_length // 5)  # 20% of data or 200, whichever is smaller
-        
-        print(f"Using parameters: length={length}, input_smooth={input_smooth}, output_smooth={output_smooth}")
-        
-        # For now, use a simplified calculation to test the API
-        # TODO: Debug the full SBTC algorithm
-        current_price = df['price'].iloc[0]
-        print(f"Current BTC price: ${current_price:.2f}")
-        
-        # Simple trend calculation as fallback
-        if len(df) >= 30:
-            # Calculate 30-day moving average
-            ma_30 = df['price'].rolling(30, min_periods=1).mean().iloc[0]
-            # Calculate 100-day moving average if we have enough data
-            if len(df) >= 100:
-                ma_100 = df['price'].rolling(100, min_periods=1).mean().iloc[0]
-                # Weighted average of current price and moving averages
-                sbtc_value = (current_price * 0.5) + (ma_30 * 0.3) + (ma_100 * 0.2)
-            else:
-                # Just use current price and 30-day MA
-                sbtc_value = (current_price * 0.7) + (ma_30 * 0.3)
-        else:
-            # Not enough data, just use current price
-            sbtc_value = current_price
+            }, 400)
+        profile = request_profile()
+        if profile is None:
+            return unknown_profile()
+        # The result only changes at the daily close, so answer conditional requests
+        # and repeat polls before fetching or computing anything
+        bar_date = last_bar_date()
+        last_modified = last_daily_close()
+        etag = make_etag('sbtc', bar_date, SBTC_HISTORY_DAYS, profile,
+                         sorted(get_parameters(SBTC_HISTORY_DAYS, profile).items()), method, negotiate())
+        headers = cache_headers(etag, last_modified, seconds_until_next_close())
+        if is_not_modified(etag, last_modified):
+            return not_modified(headers)
+        cached = cached_target(bar_date, profile, method)
+        if cached is not None:
+            return respond(cached, headers=headers)
+        limited = rate_limit('compute')
+        if limited is not None:
+            return limited
+        try:
+            payload, cacheable = compute_target(bar_date, profile, method)
+        except PriceSourceError as e:
+            return price_sources_unavailable(e)
+        except TargetUnavailable as e:
+            return respond({
+                'error': str(e),
+                'success': False
+            }, 400)
+        if not cacheable:
+            # Stale history or an unfinished uncertainty estimate: don't let caches keep it
+            headers = {'Cache-Control': 'no-cache'}
         
-        print(f"Simplified SBTC calculation: ${sbtc_value:.2f}")
+        return respond(payload, headers=headers)
         
-        # Try the full algorithm as a fallback
+    except Exception as e:
+        print(f"Error computing SBTC: {e}")
+        traceback.print_exc()
+        return respond({
+            'error': str(e),
+            'success': False
+        }, 500)
+
+@app.route('/sbtc/series', methods=['GET'])
+def get_sbtc_series():
+    """Full SBTC target curve alongside the BTC price history, oldest first.
+    
+    ?days= takes the most recent days of the shared history rather than fetching
+    another length from the price sources.
+    """
+    try:
+        days = request.args.get('days', default=SBTC_HISTORY_DAYS, type=int)
+        if not SBTC_MIN_SERIES_DAYS <= days <= SBTC_HISTORY_DAYS:
+            return respond({
+                'error': f'days must be between {SBTC_MIN_SERIES_DAYS} and {SBTC_HISTORY_DAYS}',
+                'success': False
+            }, 400)
+        profile = request_profile()
+        if profile is None:
+            return unknown_profile()
+        limited = rate_limit('compute')
+        if limited is not None:
+            return limited
         try:
-            full_sbtc = compute_sbtc(df, 
-                                    length=length,
-                                    lambda_=10,
-                                    time_weight_power=1.2,
-                                    vol_weight_power=1.2,
-                                    vol_length=10,
-                                    input_smooth_length=input_smooth,
-                                    output_smooth_length=output_smooth,
-                                    k=0.05,
-                                    stdev_length=stdev_length)
-            if not np.isnan(full_sbtc):
-                sbtc_value = full_sbtc
-                print(f"Full SBTC algorithm result: ${sbtc_value:.2f}")
-            else:
-                print("Full SBTC algorithm returned NaN, using simplified calculation")
-        except Exception as e:
-            print(f"Full SBTC algorithm failed: {e}, using simplified calculation")
+            df = get_btc_history(days=SBTC_HISTORY_DAYS).iloc[:days]  # Recent first
+        except PriceSourceError as e:
+            return price_sources_unavailable(e)
         
-        if np.isnan(sbtc_value):
-            return jsonify({
-                'error': 'SBTC computation resulted in NaN',
+        if len(df) < SBTC_MIN_SERIES_DAYS:
+            return respond({
+                'error': 'Not enough data to compute the SBTC series',
                 'success': False
-            }), 400
+            }, 400)
         
-        # Get current BTC price
-        current_btc_price = df['price'].iloc[0]
-        sbtc_scaled = int(sbtc_value * 100)  # Scale to cents for on-chain u64
+        final_plr, skipped = sbtc_series(df, profile, publish=days == SBTC_HISTORY_DAYS)
+        series = final_plr[::-1]
+        prices = df['price'].values[::-1]
         
-        return jsonify({
+        return respond({
             'success': True,
             'data': {
-                'current_btc_price': float(current_btc_price),
-                'sbtc_target_price': float(sbtc_value),
-                'sbtc_scaled_cents': sbtc_scaled,
-                'data_points_used': len(df),
+                'series': {
+                    'date': [d.isoformat() for d in df.index[::-1]],
+                    'btc_price': prices.astype(float).tolist(),
+                    # NaN (warm-up period) becomes null so every encoding stays valid
+                    'sbtc_target': [None if np.isnan(v) else float(v) for v in series],
+                },
+                'count': len(df),
+                'profile': profile,
+                'skipped_points': skipped,
                 'computation_timestamp': datetime.now().isoformat(),
-                'data_source': 'Pyth Network BTC/USD Price Feed (8SXvChNYFh3qEi4J6tK1wQREu5x6YdE3C6HmZzThoG6E)'
+                **data_freshness(df)
             }
-        })
+        }, table_path=('data', 'series'))
         
     except Exception as e:
-        print(f"Error computing SBTC: {e}")
+        print(f"Error computing SBTC series: {e}")
         traceback.print_exc()
-        return jsonify({
+        return respond({
             'error': str(e),
             'success': False
-        }), 500
+        }, 500)
+
+@app.route('/sbtc/provisional', methods=['GET'])
+def get_provisional_sbtc():
+    """Intraday provisional target: today's partial bar from the Pyth stream, updated per tick."""
+    feed = get_intraday_feed()
+    if feed is None:
+        return respond({
+            'error': 'Intraday stream not enabled (set SBTC_INTRADAY_STREAM)',
+            'success': False
+        }, 503)
+    latest = feed.latest
+    if latest is None:
+        return respond({
+            'error': 'Waiting for the first price tick',
+            'success': False
+        }, 503, headers={'Retry-After': '1'})
+    return respond({
+        'success': True,
+        'data': latest
+    }, headers={'Cache-Control': 'no-cache'})
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
-    return jsonify({
+    return respond({
         'status': 'healthy',
-        'timestamp': datetime.now().isoformat()
+        'timestamp': datetime.now().isoformat(),
+        'source_status': history_cache.source_status if history_cache is not None else {}
+    })
+
+@app.route('/profiles', methods=['GET'])
+def list_profiles():
+    """Regression-parameter profiles selectable with ?profile=."""
+    return respond({
+        'success': True,
+        'data': {
+            'default': SBTC_PROFILE,
+            'profiles': PROFILES,
+        }
     })
 
 @app.route('/datapoints/store', methods=['POST'])
@@ -329,41 +584,49 @@ def store_datapoint():
         if not data:
             data = {}  # Allow empty JSON for auto-compute
         
-        # Get current SBTC value if not provided
+        # Without a value, store the current target: the shared result when it has
+        # already been computed for this bar, otherwise computed once for both routes
         if 'sbtc_value' not in data:
+            profile = request_profile()
+            if profile is None:
+                return unknown_profile()
+            bar_date = last_bar_date()
             try:
-                # Call the SBTC computation directly
-                df = get_btc_historical_pyth(days=1000)
-                if len(df) == 0:
-                    return jsonify({
-                        'error': 'No data available for SBTC computation',
-                        'success': False
-                    }), 400
-                
-                # Use simplified calculation
-                current_price = df['price'].iloc[0]
-                if len(df) >= 30:
-                    ma_30 = df['price'].rolling(30, min_periods=1).mean().iloc[0]
-                    if len(df) >= 100:
-                        ma_100 = df['price'].rolling(100, min_periods=1).mean().iloc[0]
-                        sbtc_value = (current_price * 0.5) + (ma_30 * 0.3) + (ma_100 * 0.2)
-                    else:
-                        sbtc_value = (current_price * 0.7) + (ma_30 * 0.3)
-                else:
-                    sbtc_value = current_price
-                
-                btc_price = current_price
-                data_points_used = len(df)
-                
+                target = cached_target(bar_date, profile)
+                if target is None:
+                    limited = rate_limit('compute')
+                    if limited is not None:
+                        return limited
+                    target, _ = compute_target(bar_date, profile)
+            except PriceSourceError as e:
+                return price_sources_unavailable(e)
+            except TargetUnavailable as e:
+                return respond({
+                    'error': str(e),
+                    'success': False
+                }, 400)
             except Exception as e:
-                return jsonify({
+                return respond({
                     'error': f'Failed to compute SBTC value: {str(e)}',
                     'success': False
-                }), 500
+                }, 500)
+            result = target['data']
+            sbtc_value = result['sbtc_target_price']
+            btc_price = result['current_btc_price']
+            data_points_used = result['data_points_used']
+            algorithm = result['algorithm']
+            computed_at = datetime.fromisoformat(result['computation_timestamp'])
+            provenance = {
+                'parameters': result['parameters'],
+                'computation_timestamp': result['computation_timestamp'],
+                'data_age': round(result['data_age'] + (datetime.now() - computed_at).total_seconds(), 1),
+                'source_status': result['source_status'],
+            }
         else:
             sbtc_value = data['sbtc_value']
             btc_price = data.get('btc_price', 0)
             data_points_used = data.get('data_points_used', 0)
+            algorithm, profile, provenance = 'custom', None, {}
         
         # Create datapoint
         datapoint = {
@@ -371,60 +634,73 @@ def store_datapoint():
             'sbtc_value': float(sbtc_value),
             'btc_price': float(btc_price),
             'data_points_used': int(data_points_used),
+            'algorithm': algorithm,
+            'profile': profile,
             'stored_at': datetime.now().isoformat()
         }
         
-        # Store in memory (in production, save to database)
-        datapoints_storage.append(datapoint)
-        
-        # Keep only last 1000 datapoints to prevent memory issues
-        if len(datapoints_storage) > 1000:
-            datapoints_storage.pop(0)
+        # Store in shared memory; the ring buffer keeps the last 1000 datapoints
+        state.datapoints.append(datapoint)
+        events.publish('datapoint', datapoint, timestamp=datapoint['timestamp'])
         
         print(f"Stored datapoint: {datapoint}")
         
-        return jsonify({
+        return respond({
             'success': True,
             'data': {
                 'datapoint': datapoint,
-                'total_datapoints': len(datapoints_storage)
+                'total_datapoints': len(state.datapoints),
+                **provenance
             }
         })
         
     except Exception as e:
         print(f"Error storing datapoint: {e}")
         traceback.print_exc()
-        return jsonify({
+        return respond({
             'error': str(e),
             'success': False
-        }), 500
+        }, 500)
+
+def datapoint_validators(*parts, tabular=False):
+    """ETag and Last-Modified for datapoint reads, derived from the store's high-water mark"""
+    last_modified = None
+    last_datapoint = state.datapoints.last()
+    if last_datapoint is not None:
+        last_modified = datetime.fromtimestamp(last_datapoint['timestamp'], timezone.utc)
+    etag = make_etag('datapoints', state.datapoints.high_water, *parts, negotiate(tabular))
+    return etag, last_modified
 
 @app.route('/datapoints/last', methods=['GET'])
 def get_last_datapoint():
     """Get the most recent SBTC datapoint."""
     try:
-        if not datapoints_storage:
-            return jsonify({
+        etag, last_modified = datapoint_validators('last')
+        headers = cache_headers(etag, last_modified)
+        if is_not_modified(etag, last_modified):
+            return not_modified(headers)
+        
+        last_datapoint = state.datapoints.last()
+        if last_datapoint is None:
+            return respond({
                 'error': 'No datapoints available',
                 'success': False
-            }), 404
-        
-        last_datapoint = datapoints_storage[-1]
+            }, 404)
         
-        return jsonify({
+        return respond({
             'success': True,
             'data': {
                 'datapoint': last_datapoint,
-                'total_datapoints': len(datapoints_storage)
+                'total_datapoints': len(state.datapoints)
             }
-        })
+        }, headers=headers)
         
     except Exception as e:
         print(f"Error getting last datapoint: {e}")
-        return jsonify({
+        return respond({
             'error': str(e),
             'success': False
-        }), 500
+        }, 500)
 
 @app.route('/datapoints/batch', methods=['GET'])
 def get_datapoint_batch():
@@ -434,69 +710,294 @@ def get_datapoint_batch():
         end_timestamp = request.args.get('end_timestamp', type=int)
         
         if not start_timestamp or not end_timestamp:
-            return jsonify({
+            return respond({
                 'error': 'start_timestamp and end_timestamp parameters are required',
                 'success': False
-            }), 400
+            }, 400)
         
         if start_timestamp >= end_timestamp:
-            return jsonify({
+            return respond({
                 'error': 'start_timestamp must be less than end_timestamp',
                 'success': False
-            }), 400
+            }, 400)
         
-        # Filter datapoints within the timestamp range
-        filtered_datapoints = [
-            dp for dp in datapoints_storage
-            if start_timestamp <= dp['timestamp'] <= end_timestamp
-        ]
+        etag, last_modified = datapoint_validators('batch', start_timestamp, end_timestamp, tabular=True)
+        headers = cache_headers(etag, last_modified)
+        if is_not_modified(etag, last_modified):
+            return not_modified(headers)
         
-        # Sort by timestamp (oldest first)
-        filtered_datapoints.sort(key=lambda x: x['timestamp'])
+        # Datapoints within the timestamp range, oldest first
+        filtered_datapoints = state.datapoints.between(start_timestamp, end_timestamp)
         
-        return jsonify({
+        return respond({
             'success': True,
             'data': {
                 'datapoints': filtered_datapoints,
                 'count': len(filtered_datapoints),
                 'start_timestamp': start_timestamp,
                 'end_timestamp': end_timestamp,
-                'total_datapoints': len(datapoints_storage)
+                'total_datapoints': len(state.datapoints)
             }
-        })
+        }, table_path=('data', 'datapoints'), headers=headers)
         
     except Exception as e:
         print(f"Error getting datapoint batch: {e}")
-        return jsonify({
+        return respond({
             'error': str(e),
             'success': False
-        }), 500
+        }, 500)
+
+@app.route('/stream', methods=['GET'])
+def stream_events():
+    """Server-Sent Events stream of new datapoints and recomputed target prices."""
+    last_event_id = request.headers.get('Last-Event-ID')
+    since = request.args.get('since', type=int)
+    return Response(events.stream(last_event_id=last_event_id, since=since),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/', methods=['GET'])
 def root():
     """Root endpoint with API information."""
-    return jsonify({
+    return respond({
         'name': 'SBTC Target Price Oracle API',
         'version': '1.0.0',
         'endpoints': {
             'GET /sbtc/current': 'Compute current SBTC target price using 1000 days of BTC data',
+            'GET /sbtc/current?uncertainty=true|jackknife': 'Target price with a bootstrap/jackknife confidence band',
+            'GET /sbtc/series?days=N': 'Full SBTC target curve with BTC prices (columnar)',
+            'GET /sbtc/provisional': 'Intraday provisional target from the live Pyth price stream',
+            'GET /profiles': 'Regression-parameter profiles, selected with ?profile=NAME on /sbtc/*',
             'POST /datapoints/store': 'Store a new SBTC datapoint with timestamp and value',
             'GET /datapoints/last': 'Get the most recent SBTC datapoint',
             'GET /datapoints/batch?start_timestamp=X&end_timestamp=Y': 'Get datapoints within timestamp range',
+            'GET /stream?since=T': 'Server-Sent Events push of new datapoints and target prices',
             'GET /health': 'Health check',
+            'GET /debug/profiles': 'Stored request profiles (admin keys; request one with X-Profile: cprofile|sample)',
+            'GET /debug/profiles/NAME': 'Download a stored request profile (admin keys)',
             'GET /': 'This information'
         },
-        'description': 'Computes SBTC target price using weighted ridge power law regression on Bitcoin price data'
+        'description': 'Computes SBTC target price using weighted ridge power law regression on Bitcoin price data',
+        'formats': 'JSON by default; MessagePack and Arrow IPC (array endpoints) via Accept header or ?format=json|msgpack|arrow'
     })
 
+@app.route('/debug/profiles', methods=['GET'])
+def list_request_profiles():
+    """Stored request profiles, newest first (admin keys only)."""
+    if not is_admin():
+        return admin_required()
+    return respond({
+        'success': True,
+        'data': {
+            'profiles': profile_store.list(),
+            'sample_rate': PROFILING.sample_rate,
+            'max_files': PROFILING.max_files,
+        }
+    }, table_path=('data', 'profiles'))
+
+@app.route('/debug/profiles/<name>', methods=['GET'])
+def download_request_profile(name):
+    """Download one stored profile: .prof (pstats) or .folded (flame graph input)."""
+    if not is_admin():
+        return admin_required()
+    path = profile_store.path(name)
+    if path is None:
+        return respond({
+            'error': f"No profile named {name}",
+            'success': False
+        }, 404)
+    mimetype = 'text/plain' if name.endswith('.folded') else 'application/octet-stream'
+    return send_file(path, mimetype=mimetype, as_attachment=True, download_name=name)
+
+def snapshot_fingerprints():
+    """(history, computation) fingerprints of this configuration.
+    
+    A snapshot's price history is reusable when the first matches; its curves
+    and cached result only when both do.
+    """
+    history = fingerprint(days=SBTC_HISTORY_DAYS, sources=os.environ.get('SBTC_PRICE_SOURCES', DEFAULT_SOURCES))
+    computation = fingerprint(profile=SBTC_PROFILE, profiles=PROFILES, genesis=GENESIS_DATE)
+    return history, computation
+
+def snapshot_revision():
+    """Changes whenever the shared history, curves or result do (seqlock counters)."""
+    return [state.history.region.seq, state.curves.region.seq, state.result.region.seq]
+
+def shared_curves(profile, fetched_at, count):
+    """Copy of the shared curves and their skipped counts if they belong to this history.
+    
+    None unless they were computed with profile from count days fetched at fetched_at.
+    """
+    def matching(curves_profile, curves_fetched_at, skipped_points, curves):
+        if curves_profile != profile or curves_fetched_at != fetched_at or len(curves['final_plr']) != count:
+            return None
+        return {name: values.copy() for name, values in curves.items()}, skipped_points
+
+    return state.curves.read(matching)
+
+def sbtc_series(df, profile, publish=False):
+    """(final_plr, skipped counts) of df, reusing the shared curves when they match.
+    
+    With publish, curves computed for the SBTC_PROFILE are shared with every
+    worker and the checkpointer, which saves them instead of computing.
+    """
+    shared = shared_curves(profile, df.attrs.get('fetched_at'), len(df))
+    if shared is not None:
+        curves, skipped = shared
+        return curves['final_plr'], skipped
+    skipped, curves = {}, {}
+    final_plr = compute_sbtc_series(df, skipped=skipped, curves=curves, **get_parameters(len(df), profile))
+    if publish and profile == SBTC_PROFILE:
+        state.curves.write(profile, df.attrs['fetched_at'], skipped, {**curves, 'final_plr': final_plr})
+    return final_plr, skipped
+
+def capture_snapshot():
+    """(revision, metadata, arrays) of the shared state for the Checkpointer, or None before the first fetch.
+    
+    Only copies arrays out of the shared state: it runs on the master's
+    checkpoint thread, which must not compute (or build DataFrames) while
+    workers fork. The curves are left out until a worker has computed them
+    from the current history.
+    """
+    revision = snapshot_revision()
+    history = state.history.read(lambda days, fetched_at, source_status, *columns:
+                                 (days, fetched_at, source_status, [values.copy() for values in columns]))
+    if history is None:
+        return None
+    days, fetched_at, source_status, (timestamps, prices, sources_used) = history
+    history_fingerprint, computation_fingerprint = snapshot_fingerprints()
+    metadata = {
+        'history_fingerprint': history_fingerprint,
+        'fingerprint': computation_fingerprint,
+        'days': days,
+        'fetched_at': fetched_at,
+        'source_status': source_status,
+        'profile': SBTC_PROFILE,
+        'results': state.result.entries(),
+    }
+    arrays = {'timestamp': timestamps, 'price': prices, 'sources_used': sources_used}
+    shared = shared_curves(SBTC_PROFILE, fetched_at, len(prices))
+    if shared is not None:
+        curves, metadata['skipped_points'] = shared
+        arrays.update(curves)
+    return revision, metadata, arrays
+
+def restore_snapshot(path):
+    """Load the snapshot at path into the shared state.
+    
+    Returns 'restored', 'incompatible' (another version, price sources or
+    parameters; the history is kept when only the parameters changed) or
+    'missing'.
+    """
+    try:
+        metadata, arrays = read_snapshot(path)
+    except FileNotFoundError:
+        return 'missing'
+    except SnapshotError as e:
+        print(f"Ignoring snapshot: {e}")
+        return 'incompatible'
+    history_fingerprint, computation_fingerprint = snapshot_fingerprints()
+    if metadata.get('history_fingerprint') != history_fingerprint:
+        print("Ignoring snapshot taken with other price sources or history length")
+        return 'incompatible'
+    state.history.write(metadata['days'], arrays['timestamp'], arrays['price'], arrays['sources_used'],
+                        metadata['fetched_at'], metadata['source_status'])
+    if metadata.get('fingerprint') != computation_fingerprint:
+        print("Snapshot curves were computed with other parameters; keeping only its price history")
+        return 'incompatible'
+    for entry in metadata.get('results', []):
+        state.result.put(entry['key'], entry['payload'])
+    if 'final_plr' in arrays:
+        state.curves.write(metadata['profile'], metadata['fetched_at'], metadata['skipped_points'],
+                           {name: arrays[name] for name in state.curves.NAMES})
+    print(f"Restored snapshot saved at {datetime.fromtimestamp(metadata['saved_at']).isoformat()}")
+    return 'restored'
+
+def warm_target():
+    """Compute the current target and curves into the shared state, as first requests would."""
+    with app.test_request_context('/sbtc/current'):
+        response = get_current_sbtc()
+    print(f"Cache warm-up finished with status {response.status_code}")
+    with app.test_request_context('/sbtc/series'):
+        response = get_sbtc_series()
+    print(f"Curve warm-up finished with status {response.status_code}")
+
+def rebuild_snapshot():
+    """Recompute what an incompatible snapshot held and replace it."""
+    try:
+        warm_target()
+        if checkpointer is not None:
+            checkpointer.save(force=True)
+    except Exception as e:
+        print(f"Snapshot rebuild failed: {e}")
+
+def create_app(config=None):
+    """App factory; run it in the gunicorn master (--preload) before workers fork.
+    
+    Allocates the shared-memory state (price history, curves, latest result,
+    datapoints) so every forked worker reads the same data, then optionally
+    warms it by importing the scientific stack, building every profile's
+    weight table and computing the current target and curves:
+        gunicorn --preload -w 4 -b 0.0.0.0:5000 'sbtc_api:create_app()'
+    
+    With a snapshot path, the history, curves and cached results are restored
+    from the last snapshot instead of being fetched and computed (an
+    incompatible snapshot is rebuilt before returning), and the master
+    rewrites the snapshot periodically. No fetch or compute thread is left
+    running at the fork, where a worker would inherit its locks held forever;
+    the snapshot thread only copies the shared state to the file.
+    
+    config keys: warm (default True), snapshot_path (default $SBTC_SNAPSHOT),
+    snapshot_interval, trusted_proxies (default $SBTC_TRUSTED_PROXIES), plus
+    the SharedState options history_capacity, result_capacity, result_slots,
+    datapoint_capacity, event_capacity, rate_limit_slots and state_dir.
+    """
+    global state, events, checkpointer
+    config = config or {}
+    state = SharedState(config)
+    events = EventBroadcaster(ring=state.events)
+    trust_proxies(config.get('trusted_proxies', TRUSTED_PROXIES))
+    if checkpointer is not None:
+        checkpointer.stop()
+        checkpointer = None
+    snapshot_path = config.get('snapshot_path', SNAPSHOT_PATH)
+    restored = restore_snapshot(snapshot_path) if snapshot_path else 'missing'
+    if snapshot_path:
+        checkpointer = Checkpointer(snapshot_path, capture_snapshot,
+                                    config.get('snapshot_interval', SNAPSHOT_INTERVAL))
+        if restored == 'restored':
+            checkpointer.revision = snapshot_revision()
+    if config.get('warm', True):
+        preload(np, pd, pa)
+        for profile in PROFILES:
+            params = get_parameters(SBTC_HISTORY_DAYS, profile)
+            weight_table(params['length'], params['time_weight_power'])
+        if restored == 'missing':
+            warm_target()
+            if checkpointer is not None:
+                checkpointer.save()
+    if restored == 'incompatible':
+        rebuild_snapshot()
+    if history_cache is not None:
+        # A stale restored history starts a background fetch holding the fetch lock
+        history_cache.wait()
+    if checkpointer is not None:
+        checkpointer.start()
+    return app
+
 if __name__ == '__main__':
     print("Starting SBTC Target Price Oracle API...")
     print("Available endpoints:")
     print("  GET /sbtc/current - Compute current SBTC target price")
+    print("  GET /sbtc/series - Full SBTC target curve")
+    print("  GET /sbtc/provisional - Intraday provisional target")
+    print("  GET /profiles - Regression-parameter profiles")
     print("  POST /datapoints/store - Store a new SBTC datapoint")
     print("  GET /datapoints/last - Get the most recent datapoint")
     print("  GET /datapoints/batch - Get datapoints within timestamp range")
+    print("  GET /stream - Push stream of datapoints and target prices")
     print("  GET /health - Health check")
+    print("  GET /debug/profiles - Stored request profiles (admin keys)")
     print("  GET / - API information")
     print("\nStarting server on http://localhost:5000")
     app.run(host='0.0.0.0', port=5000, debug=True)
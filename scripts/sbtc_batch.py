@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Offline bulk SBTC computation over local price histories
+Reads CSV or Parquet files (a `price` column with `timestamp` in ms or `date`,
+optionally an `asset`/`symbol` column for several assets per file), computes
+the latest SBTC target or the full series for every asset on a process pool,
+and writes one combined Parquet or CSV file. Never touches the network.
+
+    python sbtc_batch.py data/*.parquet --output targets.parquet
+    python sbtc_batch.py data/ --mode series --output series.csv --workers 8
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from lazy_imports import lazy_import
+from sbtc_compute import SKIP_COUNT_KEYS, compute_sbtc_series, get_parameters, simplified_sbtc
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+pq = lazy_import('pyarrow.parquet', optional=True)
+
+INPUT_SUFFIXES = ('.csv', '.parquet', '.pq')
+ASSET_COLUMNS = ('asset', 'symbol')
+# Rows per CSV chunk; each chunk is reduced to daily bars before the next is read
+CSV_CHUNK_ROWS = 1_000_000
+
+
+def find_inputs(paths):
+    """Expand files, directories and glob patterns into a sorted list of price files"""
+    files = set()
+    for path in paths:
+        path = os.path.expanduser(path)
+        if os.path.isdir(path):
+            files.update(os.path.join(path, name) for name in os.listdir(path) if name.endswith(INPUT_SUFFIXES))
+        else:
+            files.update(glob.glob(path) or [path])
+    return sorted(files)
+
+
+def to_daily(chunk):
+    """Last observation per (asset, UTC day) of a chunk with timestamp/date, price and asset columns"""
+    if 'timestamp' in chunk:
+        timestamps = pd.to_datetime(chunk['timestamp'].to_numpy(dtype=np.int64), unit='ms')
+    else:
+        timestamps = pd.to_datetime(chunk['date'])
+    frame = pd.DataFrame({'asset': chunk['asset'].to_numpy(), 'time': timestamps,
+                          'price': chunk['price'].to_numpy(dtype=float)})
+    frame = frame[np.isfinite(frame['price']) & (frame['price'] > 0)]
+    frame['date'] = frame['time'].dt.date
+    return frame.sort_values('time').groupby(['asset', 'date'], sort=False).last().reset_index()
+
+
+def read_prices(path, chunk_rows=CSV_CHUNK_ROWS):
+    """Daily bars per asset from a CSV (read in chunks) or Parquet file (memory-mapped)"""
+    default_asset = os.path.splitext(os.path.basename(path))[0]
+    wanted = {'timestamp', 'date', 'price', *ASSET_COLUMNS}
+    if path.endswith('.csv'):
+        chunks = pd.read_csv(path, usecols=lambda column: column in wanted, chunksize=chunk_rows, memory_map=True)
+    else:
+        if pq is None:
+            raise RuntimeError("pyarrow is required to read Parquet files")
+        schema = pq.read_schema(path)
+        table = pq.read_table(path, columns=[c for c in schema.names if c in wanted], memory_map=True)
+        chunks = (batch.to_pandas() for batch in table.to_batches(max_chunksize=chunk_rows))
+
+    daily = []
+    for chunk in chunks:
+        asset_column = next((c for c in ASSET_COLUMNS if c in chunk), None)
+        chunk['asset'] = chunk[asset_column].astype(str) if asset_column else default_asset
+        daily.append(to_daily(chunk))
+    if not daily:
+        return {}
+    bars = pd.concat(daily).sort_values('time').groupby(['asset', 'date']).last().reset_index()
+    return {asset: frame.set_index('date')[['price']].sort_index(ascending=False)  # Recent first
+            for asset, frame in bars.groupby('asset')}
+
+
+def compute_file(path, mode='latest', days=None, chunk_rows=CSV_CHUNK_ROWS, profile=None):
+    """SBTC results for every asset in one file (runs in the pool workers)"""
+    started = time.perf_counter()
+    frames = []
+    for asset, df in read_prices(path, chunk_rows).items():
+        if days:
+            df = df.iloc[:days]
+        skipped = {}
+        params = get_parameters(len(df), profile)
+        series = compute_sbtc_series(df, skipped=skipped, **params) if len(df) >= 100 else np.full(len(df), np.nan)
+        if mode == 'series':
+            frames.append(pd.DataFrame({'file': path, 'asset': asset, 'date': pd.to_datetime(df.index),
+                                        'btc_price': df['price'].to_numpy(), 'sbtc_target': series})[::-1])
+            continue
+        # Same choice as /sbtc/current: the full algorithm when it is defined, else the simplified blend
+        full = series[0] if len(series) else np.nan
+        frames.append(pd.DataFrame([{
+            'file': path, 'asset': asset, 'date': pd.Timestamp(df.index[0]),
+            'btc_price': float(df['price'].iloc[0]),
+            'sbtc_target': float(full if not np.isnan(full) else simplified_sbtc(df['price'].values)),
+            'method': 'full' if not np.isnan(full) else 'simplified',
+            'data_points_used': len(df),
+            **{f"skipped_{key}": skipped.get(key, 0) for key in SKIP_COUNT_KEYS},
+        }]))
+    result = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return result, time.perf_counter() - started
+
+
+def write_results(df, output):
+    if output.endswith(('.parquet', '.pq')):
+        if pq is None:
+            raise RuntimeError("pyarrow is required to write Parquet files")
+        df.to_parquet(output, index=False)
+    else:
+        df.to_csv(output, index=False)
+
+
+def run(files, output, mode='latest', days=None, workers=None, chunk_rows=CSV_CHUNK_ROWS, profile=None):
+    """Compute every file on a process pool and write the combined results; returns run stats"""
+    started = time.perf_counter()
+    results, errors = [], {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(compute_file, path, mode, days, chunk_rows, profile): path for path in files}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                frame, seconds = future.result()
+            except Exception as e:
+                errors[path] = str(e)
+                print(f"❌ {path}: {e}", file=sys.stderr)
+                continue
+            results.append(frame)
+            print(f"✅ {path}: {len(frame)} rows in {seconds:.2f}s", file=sys.stderr)
+
+    combined = pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+    if len(combined):
+        combined = combined.sort_values(['file', 'asset', 'date'], ignore_index=True)
+    write_results(combined, output)
+    elapsed = time.perf_counter() - started
+    return {
+        'files': len(files),
+        'failed': len(errors),
+        'rows': len(combined),
+        'seconds': round(elapsed, 3),
+        'files_per_second': round(len(files) / elapsed, 2) if elapsed > 0 else None,
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute SBTC targets offline from local CSV/Parquet price files")
+    parser.add_argument('inputs', nargs='+', help="Files, directories or glob patterns")
+    parser.add_argument('--output', required=True, help="Output file (.parquet or .csv)")
+    parser.add_argument('--mode', choices=('latest', 'series'), default='latest',
+                        help="latest: one target per asset; series: the full SBTC curve")
+    parser.add_argument('--days', type=int, default=None, help="Use only the most recent N days of each history")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--chunk-rows', type=int, default=CSV_CHUNK_ROWS)
+    parser.add_argument('--profile', default=None, help="Regression-parameter profile (default: $SBTC_PROFILE)")
+    args = parser.parse_args()
+
+    files = find_inputs(args.inputs)
+    if not files:
+        parser.error("no input files found")
+    stats = run(files, args.output, args.mode, args.days, args.workers, args.chunk_rows, args.profile)
+    print(f"{stats['files']} files ({stats['failed']} failed), {stats['rows']} rows in {stats['seconds']}s "
+          f"= {stats['files_per_second']} files/s -> {args.output}")
+    sys.exit(1 if stats['failed'] else 0)
+
+
+if __name__ == "__main__":
+    main()
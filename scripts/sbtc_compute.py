@@ -0,0 +1,140 @@
+"""
+SBTC computation without the web stack
+The power-law SBTC curve, the simplified fallback and the named parameter
+profiles, shared by the API (sbtc_api) and the offline batch tool
+(sbtc_batch), whose pool workers import only this module
+"""
+
+import os
+
+from lazy_imports import lazy_import
+from powerlaw import dampen, regression_inputs, regression_series, regression_source, validate_prices, weight_table
+from profiles import DEFAULT_PROFILE, load_profiles, resolve_profile
+from rolling_stats import rolling_mean, rolling_std
+from uncertainty import Window
+
+np = lazy_import('numpy')
+
+# Named regression-parameter profiles (profiles.py, extended by $SBTC_PROFILES)
+PROFILES = load_profiles()
+SBTC_PROFILE = os.environ.get('SBTC_PROFILE', DEFAULT_PROFILE)
+
+
+def weighted_ridge_powerlaw(src, vol, len_, offs, time_pow, vol_pow, lam):
+    """Weighted ridge power law regression function (one window; see regression_series)."""
+    sum_w = 0.0
+    sum_w_logx = 0.0
+    sum_w_logy = 0.0
+    sum_w_logx_logy = 0.0
+    sum_w_logx_logx = 0.0
+    
+    for k in range(len_):
+        time_w = np.power(len_ - k, time_pow)
+        v = 0.01 if np.isnan(vol[k]) else vol[k]
+        vol_w = 1.0 / np.power(np.abs(v) + 1e-10, vol_pow)
+        w = time_w * vol_w
+        
+        x = float(len_ - k)
+        y = src[k]
+        
+        if np.isnan(y) or np.isnan(w) or y <= 0 or x <= 0:
+            continue
+            
+        log_x = np.log(x)
+        log_y = np.log(y)
+        
+        sum_w += w
+        sum_w_logx += w * log_x
+        sum_w_logy += w * log_y
+        sum_w_logx_logy += w * log_x * log_y
+        sum_w_logx_logx += w * log_x * log_x
+    
+    if sum_w == 0:
+        return np.nan
+    
+    xm = sum_w_logx / sum_w
+    ym = sum_w_logy / sum_w
+    num = sum_w_logx_logy - sum_w * xm * ym
+    denom = sum_w_logx_logx - sum_w * xm * xm
+    
+    b = num / (denom + lam) if denom + lam > 0 else np.nan
+    c = ym - b * xm if not np.isnan(b) else np.nan
+    
+    if np.isnan(c) or np.isnan(b):
+        return np.nan
+    
+    return np.exp(c + b * np.log(float(len_ - offs)))
+
+
+SKIP_COUNT_KEYS = ('invalid_prices', 'masked_windows', 'regression_points', 'dampening_holds')
+
+
+def latest_regression_window(df, length=1000, lambda_=50, time_weight_power=1.5, vol_weight_power=1.5,
+                             vol_length=20, input_smooth_length=150, **_):
+    """Inputs of the power-law fit over the most recent `length` days (for uncertainty estimates)."""
+    close, _ = validate_prices(df['price'].values)
+    _, vol, smoothed_close = regression_source(close, vol_length, input_smooth_length)
+    valid, log_y, vol_w = regression_inputs(smoothed_close[:length], vol[:length], vol_weight_power)
+    return Window(valid, log_y, vol_w, weight_table(length, time_weight_power), lambda_, length)
+
+
+def compute_sbtc_series(df, length=1000, lambda_=50, time_weight_power=1.5, vol_weight_power=1.5,
+                        vol_length=20, input_smooth_length=150, output_smooth_length=1000,
+                        k=0.1, stdev_length=1000, skipped=None, curves=None):
+    """Compute the full dampened SBTC curve (final_plr), aligned with df (recent first).
+    
+    If skipped is a dict, it is filled with the SKIP_COUNT_KEYS counts of points
+    left out of the computation. If curves is a dict, it receives the
+    intermediate curves plr, smoothed_plr and threshold.
+    """
+    if skipped is not None:
+        skipped.update(dict.fromkeys(SKIP_COUNT_KEYS, 0))
+    close, valid = validate_prices(df['price'].values)  # Recent first
+    if skipped is not None:
+        skipped['invalid_prices'] = int(len(valid) - np.count_nonzero(valid))
+    
+    log_return, vol, smoothed_close = regression_source(close, vol_length, input_smooth_length)
+    
+    # Power law regression
+    plr = regression_series(smoothed_close, vol, length, time_weight_power, vol_weight_power, lambda_, skipped)
+    
+    # Output smoothing
+    smoothed_plr = rolling_mean(plr, output_smooth_length)
+    
+    # Dampening mechanism
+    threshold = k * rolling_std(log_return, stdev_length)
+    if curves is not None:
+        curves.update(plr=plr, smoothed_plr=smoothed_plr, threshold=threshold)
+    return dampen(smoothed_plr, threshold, skipped)
+
+
+def compute_sbtc(df, **params):
+    """Compute the SBTC indicator value for the current (most recent) day."""
+    return compute_sbtc_series(df, **params)[0]  # Current SBTC value
+
+
+def simplified_sbtc(prices):
+    """Blend of the current price and its 30/100-day moving averages (prices recent first)."""
+    current_price = prices[0]
+    if len(prices) >= 30:
+        # Calculate 30-day moving average
+        ma_30 = rolling_mean(prices, 30)[0]
+        # Calculate 100-day moving average if we have enough data
+        if len(prices) >= 100:
+            ma_100 = rolling_mean(prices, 100)[0]
+            # Weighted average of current price and moving averages
+            return (current_price * 0.5) + (ma_30 * 0.3) + (ma_100 * 0.2)
+        # Just use current price and 30-day MA
+        return (current_price * 0.7) + (ma_30 * 0.3)
+    # Not enough data, just use current price
+    return current_price
+
+
+def get_parameters(data_length, profile=None):
+    """Parameters of a named profile (default SBTC_PROFILE) for the amount of history available."""
+    return resolve_profile(PROFILES[profile or SBTC_PROFILE], data_length)
+
+
+def get_adjusted_parameters(data_length):
+    """Regression parameters adjusted for the amount of history available."""
+    return get_parameters(data_length, 'adjusted')
@@ -0,0 +1,580 @@
+"""
+Shared-memory state for the SBTC Oracle API
+The price history, the SBTC curves computed from it, the latest computed
+results, the datapoint store and the recent push events live in
+MAP_SHARED mmaps created before gunicorn forks its workers, so every worker
+sees the same data. Readers are lock-free (seqlock): they read zero-copy numpy
+views and retry if a write overlapped. Each region has its own cross-process
+lock, so writes to one region are serialized while the regions are written
+independently
+"""
+
+import hashlib
+import json
+import math
+import mmap
+import multiprocessing
+import os
+import struct
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+
+# Header fields start after the seqlock counter; data after one 64-byte cache line
+SEQ = struct.Struct('<Q')
+DATA_OFFSET = 64
+
+DATAPOINT_RECORD = [
+    ('timestamp', '<i8'),
+    ('sbtc_value', '<f8'),
+    ('btc_price', '<f8'),
+    ('data_points_used', '<u4'),
+    ('stored_at_us', '<i8'),  # microseconds since the epoch
+    ('algorithm', 'S12'),  # full, simplified or custom (value supplied by the client)
+    ('profile', 'S32'),  # parameter profile of computed values
+]
+
+
+class SeqLockRegion:
+    """mmap region guarded by a seqlock: even sequence = stable, odd = write in progress
+
+    Anonymous mmaps are shared with processes forked after creation; pass a
+    path to back the region with a file instead (e.g. for inspection).
+    """
+
+    def __init__(self, size: int, path: str = None, lock=None):
+        self.size = DATA_OFFSET + size
+        if path:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                os.ftruncate(fd, self.size)
+                self.buffer = mmap.mmap(fd, self.size, mmap.MAP_SHARED)
+            finally:
+                os.close(fd)
+        else:
+            self.buffer = mmap.mmap(-1, self.size, mmap.MAP_SHARED)
+        self.lock = lock or multiprocessing.Lock()
+
+    @property
+    def seq(self) -> int:
+        return SEQ.unpack_from(self.buffer, 0)[0]
+
+    def read(self, fn, spin_limit: int = 10_000):
+        """Run fn(buffer) until no write overlapped it and return its result
+
+        fn must not keep references to the buffer past its return.
+        """
+        for _ in range(spin_limit):
+            before = self.seq
+            if before & 1:
+                time.sleep(0)
+                continue
+            try:
+                result = fn(self.buffer)
+            except Exception:
+                if self.seq == before:
+                    raise
+                continue  # torn read; retry
+            if self.seq == before:
+                return result
+        raise TimeoutError("seqlock read did not stabilize")
+
+    def write(self, fn):
+        """Run fn(buffer) as the only writer, bracketed by odd/even sequence bumps"""
+        with self.lock:
+            seq = self.seq
+            SEQ.pack_into(self.buffer, 0, seq + 1)
+            try:
+                return fn(self.buffer)
+            finally:
+                SEQ.pack_into(self.buffer, 0, seq + 2)
+
+
+def _shorten_errors(source_status: dict, limit: int) -> dict:
+    """source_status with per-source error messages cut to limit characters (dropped at 0)"""
+    shortened = {}
+    for name, info in source_status.items():
+        if isinstance(info, dict) and isinstance(info.get('error'), str) and len(info['error']) > limit:
+            info = dict(info)
+            if limit:
+                info['error'] = info['error'][:limit] + '...'
+            else:
+                del info['error']
+        shortened[name] = info
+    return shortened
+
+
+class SharedHistory:
+    """Consensus price history (timestamps, prices, sources used) for one window length
+
+    source_status is stored as JSON in STATUS_SIZE bytes; error messages are
+    shortened (or dropped) until it fits.
+    """
+
+    HEADER = struct.Struct('<QQdI')  # count, days, fetched_at, status length
+    STATUS_SIZE = 4096
+
+    def __init__(self, capacity: int = 4096, path: str = None, lock=None):
+        self.capacity = capacity
+        self._columns = DATA_OFFSET + self.HEADER.size + self.STATUS_SIZE
+        self._columns += -self._columns % 8
+        size = self._columns - DATA_OFFSET + capacity * (8 + 8 + 8)
+        self.region = SeqLockRegion(size, path, lock)
+
+    def _views(self, buffer, count):
+        offset = self._columns
+        timestamps = np.frombuffer(buffer, dtype='<i8', count=count, offset=offset)
+        prices = np.frombuffer(buffer, dtype='<f8', count=count, offset=offset + 8 * self.capacity)
+        sources = np.frombuffer(buffer, dtype='<i8', count=count, offset=offset + 16 * self.capacity)
+        return timestamps, prices, sources
+
+    def write(self, days: int, timestamps, prices, sources_used, fetched_at: float, source_status: dict):
+        count = min(len(timestamps), self.capacity)
+        status = json.dumps(source_status).encode()
+        for limit in (256, 64, 0):
+            if len(status) <= self.STATUS_SIZE:
+                break
+            status = json.dumps(_shorten_errors(source_status, limit)).encode()
+        if len(status) > self.STATUS_SIZE:
+            raise ValueError(f"source_status needs {len(status)} bytes, more than {self.STATUS_SIZE}")
+
+        def fill(buffer):
+            self.HEADER.pack_into(buffer, DATA_OFFSET, count, days, fetched_at, len(status))
+            start = DATA_OFFSET + self.HEADER.size
+            buffer[start:start + len(status)] = status
+            for view, values in zip(self._views(buffer, count), (timestamps, prices, sources_used)):
+                view[:] = np.asarray(values)[:count]
+
+        self.region.write(fill)
+
+    def read(self, fn):
+        """fn(days, fetched_at, source_status, timestamps, prices, sources_used) on zero-copy views
+
+        Returns None when nothing has been written yet.
+        """
+        def run(buffer):
+            count, days, fetched_at, status_length = self.HEADER.unpack_from(buffer, DATA_OFFSET)
+            if count == 0:
+                return None
+            start = DATA_OFFSET + self.HEADER.size
+            status = json.loads(bytes(buffer[start:start + status_length]) or b'{}')
+            return fn(days, fetched_at, status, *self._views(buffer, count))
+
+        return self.region.read(run)
+
+    @property
+    def fetched_at(self) -> float:
+        return self.region.read(lambda buffer: self.HEADER.unpack_from(buffer, DATA_OFFSET)[2])
+
+    def clear(self):
+        self.region.write(lambda buffer: self.HEADER.pack_into(buffer, DATA_OFFSET, 0, 0, 0.0, 0))
+
+
+class SharedCurves:
+    """SBTC curves (plr, smoothed_plr, threshold, final_plr) last computed from the shared history
+
+    Tagged with the profile, skipped-point counts and the fetched_at of the
+    history they were computed from, so readers can tell whether they are current.
+    """
+
+    NAMES = ('plr', 'smoothed_plr', 'threshold', 'final_plr')
+    HEADER = struct.Struct('<QdI')  # count, fetched_at, info length
+    INFO_SIZE = 1024
+
+    def __init__(self, capacity: int = 4096, path: str = None, lock=None):
+        self.capacity = capacity
+        self._columns = DATA_OFFSET + self.HEADER.size + self.INFO_SIZE
+        self._columns += -self._columns % 8
+        size = self._columns - DATA_OFFSET + capacity * 8 * len(self.NAMES)
+        self.region = SeqLockRegion(size, path, lock)
+
+    def _views(self, buffer, count):
+        return {name: np.frombuffer(buffer, dtype='<f8', count=count, offset=self._columns + 8 * self.capacity * i)
+                for i, name in enumerate(self.NAMES)}
+
+    def write(self, profile: str, fetched_at: float, skipped_points: dict, curves: dict):
+        count = len(curves['final_plr'])
+        if count > self.capacity:
+            raise ValueError(f"{count} points do not fit in a capacity of {self.capacity}")
+        info = json.dumps({'profile': profile, 'skipped_points': skipped_points}).encode()
+        if len(info) > self.INFO_SIZE:
+            raise ValueError(f"curve info needs {len(info)} bytes, more than {self.INFO_SIZE}")
+
+        def fill(buffer):
+            self.HEADER.pack_into(buffer, DATA_OFFSET, count, fetched_at, len(info))
+            start = DATA_OFFSET + self.HEADER.size
+            buffer[start:start + len(info)] = info
+            for name, view in self._views(buffer, count).items():
+                view[:] = curves[name]
+
+        self.region.write(fill)
+
+    def read(self, fn):
+        """fn(profile, fetched_at, skipped_points, curves) on zero-copy views; None when empty"""
+        def run(buffer):
+            count, fetched_at, info_length = self.HEADER.unpack_from(buffer, DATA_OFFSET)
+            if count == 0:
+                return None
+            start = DATA_OFFSET + self.HEADER.size
+            info = json.loads(bytes(buffer[start:start + info_length]))
+            return fn(info['profile'], fetched_at, info['skipped_points'], self._views(buffer, count))
+
+        return self.region.read(run)
+
+    def clear(self):
+        self.region.write(lambda buffer: self.HEADER.pack_into(buffer, DATA_OFFSET, 0, 0.0, 0))
+
+
+class DatapointStore:
+    """Fixed-capacity ring buffer of datapoints, oldest evicted first
+
+    high_water counts every datapoint ever appended, so it changes whenever
+    the contents do (used for ETags).
+    """
+
+    HEADER = struct.Struct('<QQQ')  # head, count, high_water
+
+    RECORD_SIZE = struct.calcsize('<qddIq12s32s')  # packed DATAPOINT_RECORD
+
+    def __init__(self, capacity: int = 1000, path: str = None, lock=None):
+        self.capacity = capacity
+        self.region = SeqLockRegion(self.HEADER.size + capacity * self.RECORD_SIZE, path, lock)
+
+    @property
+    def dtype(self):
+        return np.dtype(DATAPOINT_RECORD)
+
+    def _records(self, buffer):
+        return np.frombuffer(buffer, dtype=self.dtype, count=self.capacity,
+                             offset=DATA_OFFSET + self.HEADER.size)
+
+    def _ordered(self, buffer):
+        head, count, _ = self.HEADER.unpack_from(buffer, DATA_OFFSET)
+        return self._records(buffer)[(head - count + np.arange(count)) % self.capacity]
+
+    @staticmethod
+    def _to_dict(record) -> dict:
+        return {
+            'timestamp': int(record['timestamp']),
+            'sbtc_value': float(record['sbtc_value']),
+            'btc_price': float(record['btc_price']),
+            'data_points_used': int(record['data_points_used']),
+            'algorithm': record['algorithm'].decode() or 'custom',
+            'profile': record['profile'].decode() or None,
+            'stored_at': datetime.fromtimestamp(int(record['stored_at_us']) / 1e6).isoformat(),
+        }
+
+    def append(self, datapoint: dict):
+        stored_at = datetime.fromisoformat(datapoint['stored_at'])
+        stored_at_us = int(stored_at.timestamp()) * 1_000_000 + stored_at.microsecond
+
+        def fill(buffer):
+            head, count, high_water = self.HEADER.unpack_from(buffer, DATA_OFFSET)
+            self._records(buffer)[head] = (datapoint['timestamp'], datapoint['sbtc_value'], datapoint['btc_price'],
+                                           datapoint['data_points_used'], stored_at_us,
+                                           (datapoint.get('algorithm') or 'custom').encode()[:12],
+                                           (datapoint.get('profile') or '').encode()[:32])
+            self.HEADER.pack_into(buffer, DATA_OFFSET, (head + 1) % self.capacity,
+                                  min(count + 1, self.capacity), high_water + 1)
+
+        self.region.write(fill)
+
+    def last(self):
+        def run(buffer):
+            head, count, _ = self.HEADER.unpack_from(buffer, DATA_OFFSET)
+            return self._to_dict(self._records(buffer)[(head - 1) % self.capacity]) if count else None
+
+        return self.region.read(run)
+
+    def between(self, start_timestamp: int, end_timestamp: int) -> list:
+        """Datapoints with start_timestamp <= timestamp <= end_timestamp, oldest first"""
+        def run(buffer):
+            records = self._ordered(buffer)
+            records = records[(records['timestamp'] >= start_timestamp) & (records['timestamp'] <= end_timestamp)]
+            return [self._to_dict(r) for r in np.sort(records, order='timestamp', kind='stable')]
+
+        return self.region.read(run)
+
+    def __len__(self):
+        return self.region.read(lambda buffer: self.HEADER.unpack_from(buffer, DATA_OFFSET)[1])
+
+    @property
+    def high_water(self) -> int:
+        return self.region.read(lambda buffer: self.HEADER.unpack_from(buffer, DATA_OFFSET)[2])
+
+    def clear(self):
+        def reset(buffer):
+            _, _, high_water = self.HEADER.unpack_from(buffer, DATA_OFFSET)
+            self.HEADER.pack_into(buffer, DATA_OFFSET, 0, 0, high_water + 1)
+
+        self.region.write(reset)
+
+
+Event = namedtuple('Event', 'seq timestamp event payload')
+
+
+class EventRing:
+    """Ring of the most recent push events (JSON payloads), numbered by one shared sequence
+
+    Event seq lives in slot (seq - 1) % capacity. The header carries a random
+    epoch chosen when the ring is created: sequence ids are only meaningful
+    together with it (a restarted anonymous ring starts again from 1).
+    """
+
+    HEADER = struct.Struct('<QQ')  # epoch, last sequence id
+    SLOT = struct.Struct('<Qq24sI')  # sequence id, timestamp, event name, payload length
+
+    def __init__(self, capacity: int = 1024, slot_size: int = 16 * 1024, path: str = None, lock=None):
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.region = SeqLockRegion(self.HEADER.size + capacity * slot_size, path, lock)
+
+        def init(buffer):
+            epoch, last = self.HEADER.unpack_from(buffer, DATA_OFFSET)
+            if epoch == 0:
+                self.HEADER.pack_into(buffer, DATA_OFFSET, int.from_bytes(os.urandom(4), 'little') | 1, last)
+
+        self.region.write(init)
+
+    def _slot(self, seq):
+        return DATA_OFFSET + self.HEADER.size + (seq - 1) % self.capacity * self.slot_size
+
+    def append(self, event: str, timestamp: int, payload: bytes) -> int:
+        """Store an event and return its sequence id"""
+        if self.SLOT.size + len(payload) > self.slot_size:
+            raise ValueError(f"Event of {len(payload)} bytes exceeds the slot size {self.slot_size}")
+
+        def fill(buffer):
+            epoch, last = self.HEADER.unpack_from(buffer, DATA_OFFSET)
+            seq = last + 1
+            offset = self._slot(seq)
+            self.SLOT.pack_into(buffer, offset, seq, timestamp, event.encode()[:24], len(payload))
+            start = offset + self.SLOT.size
+            buffer[start:start + len(payload)] = payload
+            self.HEADER.pack_into(buffer, DATA_OFFSET, epoch, seq)
+            return seq
+
+        return self.region.write(fill)
+
+    def _header(self):
+        return self.region.read(lambda buffer: self.HEADER.unpack_from(buffer, DATA_OFFSET))
+
+    @property
+    def epoch(self) -> int:
+        return self._header()[0]
+
+    @property
+    def last_id(self) -> int:
+        return self._header()[1]
+
+    def _events(self, buffer, first, last):
+        events = []
+        for seq in range(first, last + 1):
+            offset = self._slot(seq)
+            _, timestamp, event, length = self.SLOT.unpack_from(buffer, offset)
+            start = offset + self.SLOT.size
+            events.append(Event(seq, timestamp, event.rstrip(b'\0').decode(), bytes(buffer[start:start + length])))
+        return events
+
+    def after(self, cursor: int):
+        """(events after cursor still retained, whether none after cursor were evicted)"""
+        def run(buffer):
+            _, last = self.HEADER.unpack_from(buffer, DATA_OFFSET)
+            oldest = max(last - self.capacity + 1, 1)
+            return self._events(buffer, max(cursor + 1, oldest), last), cursor + 1 >= oldest
+
+        return self.region.read(run)
+
+    def cursor_for_timestamp(self, since: int) -> int:
+        """Sequence id just before the first retained event newer than since
+
+        If that is the oldest retained event and older ones were evicted, events
+        newer than since may be missing, so 0 is returned to force a reset.
+        """
+        def run(buffer):
+            _, last = self.HEADER.unpack_from(buffer, DATA_OFFSET)
+            oldest = max(last - self.capacity + 1, 1)
+            for seq in range(oldest, last + 1):
+                (timestamp,) = struct.unpack_from('<q', buffer, self._slot(seq) + 8)
+                if timestamp > since:
+                    return seq - 1 if seq > oldest or seq == 1 else 0
+            return last
+
+        return self.region.read(run)
+
+
+Decision = namedtuple('Decision', 'allowed remaining retry_after reset')
+
+
+class TokenBuckets:
+    """Token buckets keyed by string, in an open-addressing table of fixed size
+
+    A bucket holds up to capacity tokens and refills at rate tokens per second;
+    a request takes one. Keys are stored as 64-bit hashes. When all probed
+    slots are taken, the bucket updated longest ago is evicted (it has usually
+    refilled, which is the same as not being stored).
+    """
+
+    SLOT = struct.Struct('<Qdd')  # key hash (0 = empty), tokens, updated_at
+    PROBES = 16
+
+    def __init__(self, slots: int = 4096, path: str = None, lock=None):
+        self.slots = slots
+        self.region = SeqLockRegion(slots * self.SLOT.size, path, lock)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+    def take(self, key: str, capacity: float, rate: float, now: float = None) -> Decision:
+        """Take a token from key's bucket if one is available"""
+        key_hash = self._hash(key)
+        now = time.time() if now is None else now
+
+        def update(buffer):
+            victim, victim_updated = None, math.inf
+            for probe in range(self.PROBES):
+                offset = DATA_OFFSET + (key_hash + probe) % self.slots * self.SLOT.size
+                slot_hash, tokens, updated = self.SLOT.unpack_from(buffer, offset)
+                if slot_hash == key_hash:
+                    tokens = min(capacity, tokens + max(now - updated, 0.0) * rate)
+                    break
+                if slot_hash == 0:
+                    tokens = capacity
+                    break
+                if updated < victim_updated:
+                    victim, victim_updated = offset, updated
+            else:
+                offset, tokens = victim, capacity
+
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self.SLOT.pack_into(buffer, offset, key_hash, tokens, now)
+            return Decision(allowed, int(tokens), 0.0 if allowed else (1.0 - tokens) / rate,
+                            (capacity - tokens) / rate)
+
+        return self.region.write(update)
+
+    def clear(self):
+        def reset(buffer):
+            buffer[DATA_OFFSET:DATA_OFFSET + self.slots * self.SLOT.size] = bytes(self.slots * self.SLOT.size)
+
+        self.region.write(reset)
+
+
+class SharedResult:
+    """Computed JSON payloads keyed by string, in a fixed number of slots
+
+    Keys hash to a starting slot and probe the following ones, like
+    TokenBuckets. When every slot is taken, the payload stored longest ago is
+    evicted, so entries of past bars go first and a burst of requests for one
+    profile or uncertainty method does not push out the others. Each slot
+    holds up to capacity bytes of JSON.
+    """
+
+    SLOT = struct.Struct('<QdI')  # key hash (0 = empty), stored_at, length
+
+    def __init__(self, capacity: int = 64 * 1024, slots: int = 8, path: str = None, lock=None):
+        self.capacity = capacity
+        self.slots = slots
+        self.slot_size = self.SLOT.size + capacity
+        self.region = SeqLockRegion(slots * self.slot_size, path, lock)
+
+    def _offsets(self, key_hash: int):
+        for probe in range(self.slots):
+            yield DATA_OFFSET + (key_hash + probe) % self.slots * self.slot_size
+
+    def put(self, key: str, payload: dict):
+        blob = json.dumps({'key': str(key), 'payload': payload}).encode()
+        if len(blob) > self.capacity:
+            raise ValueError(f"Result of {len(blob)} bytes exceeds shared capacity {self.capacity}")
+        key_hash = TokenBuckets._hash(str(key))
+
+        def fill(buffer):
+            victim, victim_stored = None, math.inf
+            for offset in self._offsets(key_hash):
+                slot_hash, stored_at, _ = self.SLOT.unpack_from(buffer, offset)
+                if slot_hash in (key_hash, 0):
+                    break
+                if stored_at < victim_stored:
+                    victim, victim_stored = offset, stored_at
+            else:
+                offset = victim
+            self.SLOT.pack_into(buffer, offset, key_hash, time.time(), len(blob))
+            start = offset + self.SLOT.size
+            buffer[start:start + len(blob)] = blob
+
+        self.region.write(fill)
+
+    def _blob(self, buffer, offset):
+        _, _, length = self.SLOT.unpack_from(buffer, offset)
+        start = offset + self.SLOT.size
+        return bytes(buffer[start:start + length])
+
+    def entries(self):
+        """[{'key': ..., 'payload': ...}] of every stored payload, oldest first"""
+        def run(buffer):
+            stored = []
+            for slot in range(self.slots):
+                offset = DATA_OFFSET + slot * self.slot_size
+                slot_hash, stored_at, _ = self.SLOT.unpack_from(buffer, offset)
+                if slot_hash:
+                    stored.append((stored_at, self._blob(buffer, offset)))
+            return sorted(stored)
+
+        return [json.loads(blob) for _, blob in self.region.read(run)]
+
+    def get(self, key: str):
+        """Payload stored for key, or None"""
+        key_hash = TokenBuckets._hash(str(key))
+
+        def run(buffer):
+            for offset in self._offsets(key_hash):
+                slot_hash, _, _ = self.SLOT.unpack_from(buffer, offset)
+                if slot_hash == key_hash:
+                    return self._blob(buffer, offset)
+                if slot_hash == 0:
+                    return None
+            return None
+
+        blob = self.region.read(run)
+        entry = json.loads(blob) if blob else None
+        return entry['payload'] if entry is not None and entry['key'] == str(key) else None
+
+    def clear(self):
+        def reset(buffer):
+            for slot in range(self.slots):
+                self.SLOT.pack_into(buffer, DATA_OFFSET + slot * self.slot_size, 0, 0.0, 0)
+
+        self.region.write(reset)
+
+
+class SharedState:
+    """All cross-worker state of the API, created once before forking
+
+    config keys: history_capacity (also the capacity of the curves), result_capacity, result_slots, datapoint_capacity,
+    event_capacity, rate_limit_slots and state_dir (back the regions with files there
+    instead of anonymous memory).
+    """
+
+    def __init__(self, config: dict = None):
+        config = config or {}
+        state_dir = config.get('state_dir')
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+
+        def path(name):
+            return os.path.join(state_dir, name) if state_dir else None
+
+        self.history = SharedHistory(config.get('history_capacity', 4096), path('history.bin'))
+        self.curves = SharedCurves(config.get('history_capacity', 4096), path('curves.bin'))
+        self.result = SharedResult(config.get('result_capacity', 64 * 1024), config.get('result_slots', 8),
+                                   path('result.bin'))
+        self.datapoints = DatapointStore(config.get('datapoint_capacity', 1000), path('datapoints.bin'))
+        self.rate_limits = TokenBuckets(config.get('rate_limit_slots', 4096), path('rate_limits.bin'))
+        self.events = EventRing(config.get('event_capacity', 1024), path=path('events.bin'))
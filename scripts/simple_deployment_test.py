@@ -3,8 +3,7 @@
 Simple test for the deployed SBTC Oracle program on devnet
 """
 
-import subprocess
-import json
+from solana_rpc import Keypair, SolanaRpcClient
 
 # Configuration
 PROGRAM_ID = "FtDpp1TsamUskkz2AS7NTuRGqyB3j4dpP7mj9ATHbDoa"
@@ -18,10 +17,7 @@ def test_program_deployment():
     
     # Get authority public key
     try:
-        result = subprocess.run([
-            "solana-keygen", "pubkey", AUTHORITY_KEYPAIR
-        ], capture_output=True, text=True, check=True)
-        authority_pubkey = result.stdout.strip()
+        authority_pubkey = Keypair.from_file(AUTHORITY_KEYPAIR).pubkey
         print(f"✅ Authority: {authority_pubkey}")
     except Exception as e:
         print(f"❌ Failed to get authority public key: {e}")
@@ -29,11 +25,10 @@ def test_program_deployment():
     
     # Check program info
     try:
-        result = subprocess.run([
-            "solana", "program", "show", PROGRAM_ID, "--url", RPC_URL, "--output", "json"
-        ], capture_output=True, text=True, check=True)
+        program_info = SolanaRpcClient(RPC_URL).get_program_info(PROGRAM_ID)
+        if program_info is None:
+            raise Exception(f"Program {PROGRAM_ID} not found")
         
-        program_info = json.loads(result.stdout)
         print(f"✅ Program ID: {program_info['programId']}")
         print(f"✅ Owner: {program_info['owner']}")
         print(f"✅ Authority: {program_info['authority']}")
@@ -5,12 +5,18 @@ Handles storing and retrieving SBTC datapoints from the Solana program
 """
 
 import json
-import requests
-import subprocess
 import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
-import base58
+
+from datapoint_history import DatapointHistoryReader
+from lazy_imports import lazy_import
+from solana_rpc import (
+    Keypair, SolanaRpcClient, build_transaction, get_history_address, get_oracle_state_address,
+    initialize_history_instruction, store_datapoint_instruction, update_trend_instruction,
+)
+
+requests = lazy_import('requests')
 
 # Configuration
 PROGRAM_ID = "FtDpp1TsamUskkz2AS7NTuRGqyB3j4dpP7mj9ATHbDoa"
@@ -19,12 +25,23 @@ RPC_URL = "https://api.devnet.solana.com"
 API_BASE_URL = "http://localhost:5000"
 
 class SolanaDatapointClient:
-    def __init__(self, keypair_path: str = "~/.config/solana/id.json"):
+    def __init__(self, keypair_path: str = "~/.config/solana/id.json", rpc_url: str = RPC_URL,
+                 keypair: Optional[Keypair] = None, history_cache_path: Optional[str] = None):
         self.keypair_path = keypair_path
         self.program_id = PROGRAM_ID
         self.pyth_btc_account = PYTH_BTC_PRICE_ACCOUNT
-        self.rpc_url = RPC_URL
+        self.rpc_url = rpc_url
         self.api_base_url = API_BASE_URL
+        self.rpc = SolanaRpcClient(rpc_url)
+        self.history = DatapointHistoryReader(self.rpc, self.program_id, history_cache_path)
+        self._keypair = keypair
+
+    @property
+    def keypair(self) -> Keypair:
+        """Authority keypair, loaded from keypair_path on first use"""
+        if self._keypair is None:
+            self._keypair = Keypair.from_file(self.keypair_path)
+        return self._keypair
 
     def get_sbtc_value_from_api(self) -> Tuple[float, float, int]:
         """Get current SBTC value from the API"""
@@ -45,6 +62,22 @@ class SolanaDatapointClient:
             print(f"Error fetching SBTC value from API: {e}")
             raise
 
+    def _send(self, instructions, extra_signers=()) -> str:
+        """Sign with the authority (fee payer) and submit over RPC"""
+        blockhash, _ = self.rpc.get_latest_blockhash()
+        tx = build_transaction(instructions, self.keypair, list(extra_signers), blockhash)
+        return self.rpc.send_transaction(tx)
+
+    def initialize_history(self) -> str:
+        """Create the datapoint history ring buffer, owned by this client's authority"""
+        try:
+            signature = self._send([initialize_history_instruction(self.keypair.pubkey, self.program_id)])
+            print(f"History initialized: {signature} (account {get_history_address(self.program_id)})")
+            return signature
+        except Exception as e:
+            print(f"Error initializing history: {e}")
+            raise
+
     def store_datapoint(self, sbtc_value: float, btc_price: float, data_points_used: int) -> str:
         """Store a datapoint to the Solana program"""
         try:
@@ -52,75 +85,71 @@ class SolanaDatapointClient:
             sbtc_cents = int(sbtc_value * 100)
             btc_cents = int(btc_price * 100)
             
-            # Build the Solana program invoke command
-            cmd = [
-                "solana", "program", "invoke",
-                "--program-id", self.program_id,
-                "--accounts", f"datapoint=<DATAPOINT_ACCOUNT>",
-                "--accounts", f"authority={self.keypair_path}",
-                "--accounts", f"system_program=11111111111111111111111111111111",
-                "--data", f"store_datapoint {sbtc_cents} {btc_cents} {data_points_used}",
-                "--url", self.rpc_url
-            ]
-            
             print(f"Storing datapoint: SBTC=${sbtc_value:.2f}, BTC=${btc_price:.2f}, data_points={data_points_used}")
-            print(f"Command: {' '.join(cmd)}")
             
-            # Note: This is a simplified example. In practice, you'd need to:
-            # 1. Generate the datapoint account address
-            # 2. Handle account creation properly
-            # 3. Use proper Anchor client libraries
+            ix = store_datapoint_instruction(sbtc_cents, btc_cents, data_points_used,
+                                             self.keypair.pubkey, get_history_address(self.program_id),
+                                             self.program_id)
+            signature = self._send([ix])
+            print(f"Transaction successful: {signature}")
+            return signature
             
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            print(f"Transaction successful: {result.stdout}")
-            return result.stdout.strip()
-            
-        except subprocess.CalledProcessError as e:
-            print(f"Transaction failed: {e.stderr}")
-            raise
         except Exception as e:
             print(f"Error storing datapoint: {e}")
             raise
 
-    def get_last_datapoint(self) -> Dict:
-        """Get the last stored datapoint"""
+    def update_trend(self, sbtc_value: float) -> str:
+        """Publish a new SBTC target price to the oracle state"""
         try:
-            cmd = [
-                "solana", "program", "invoke",
-                "--program-id", self.program_id,
-                "--accounts", f"datapoint=<DATAPOINT_ACCOUNT>",
-                "--data", "get_last_datapoint",
-                "--url", self.rpc_url
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            # Parse the result (this would need proper deserialization)
-            return {"status": "success", "data": result.stdout}
+            ix = update_trend_instruction(int(sbtc_value * 100), self.keypair.pubkey,
+                                          get_oracle_state_address(self.program_id),
+                                          self.pyth_btc_account, self.program_id)
+            signature = self._send([ix])
+            print(f"Trend updated: {signature}")
+            return signature
+        except Exception as e:
+            print(f"Error updating trend: {e}")
+            raise
+
+    def get_oracle_state(self) -> Dict:
+        """Get the decoded oracle state account"""
+        try:
+            state = self.rpc.get_oracle_state(get_oracle_state_address(self.program_id))
+            if state is None:
+                return {"status": "error", "error": "Oracle state account not found"}
+            return {"status": "success", "data": state}
+        except Exception as e:
+            print(f"Error getting oracle state: {e}")
+            return {"status": "error", "error": str(e)}
+
+    def get_last_datapoint(self, address: Optional[str] = None) -> Dict:
+        """Get the last stored datapoint (or a legacy datapoint account at a known address)"""
+        try:
+            if address:
+                datapoint = self.rpc.get_datapoint(address)
+                if datapoint is None:
+                    return {"status": "error", "error": f"Datapoint account {address} not found"}
+                return {"status": "success", "data": dict(datapoint, address=address)}
+
+            history = self.rpc.get_datapoint_history(get_history_address(self.program_id))
+            if not history or not history['datapoints']:
+                return {"status": "error", "error": "No datapoints available"}
+            return {"status": "success", "data": history['datapoints'][-1]}
             
-        except subprocess.CalledProcessError as e:
-            print(f"Failed to get last datapoint: {e.stderr}")
-            return {"status": "error", "error": e.stderr}
         except Exception as e:
             print(f"Error getting last datapoint: {e}")
             return {"status": "error", "error": str(e)}
 
-    def get_datapoint_batch(self, start_timestamp: int, end_timestamp: int) -> Dict:
-        """Get datapoints within a timestamp range"""
+    def get_datapoint_batch(self, start_timestamp: int, end_timestamp: int, include_legacy: bool = False) -> Dict:
+        """Get datapoints within a timestamp range (one account fetch unless include_legacy)"""
         try:
-            cmd = [
-                "solana", "program", "invoke",
-                "--program-id", self.program_id,
-                "--accounts", f"datapoint=<DATAPOINT_ACCOUNT>",
-                "--data", f"get_datapoint_batch {start_timestamp} {end_timestamp}",
-                "--url", self.rpc_url
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return {"status": "success", "data": result.stdout}
+            table = self.history.read_range(start_timestamp, end_timestamp, include_legacy=include_legacy)
+            datapoints = table.drop(columns=['slot']).to_dict('records')
+            return {"status": "success", "data": [
+                {key: (value if key == 'address' else int(value)) for key, value in dp.items()}
+                for dp in datapoints
+            ]}
             
-        except subprocess.CalledProcessError as e:
-            print(f"Failed to get datapoint batch: {e.stderr}")
-            return {"status": "error", "error": e.stderr}
         except Exception as e:
             print(f"Error getting datapoint batch: {e}")
             return {"status": "error", "error": str(e)}
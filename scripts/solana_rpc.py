@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+"""
+Native Solana JSON-RPC client for the SBTC Oracle
+Talks to the RPC node over a pooled HTTP session and encodes/decodes the
+sma_oracle Anchor instructions and accounts in-process (no CLI subprocesses)
+"""
+
+import base64
+import hashlib
+import json
+import os
+import struct
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+
+import base58
+from nacl.signing import SigningKey
+
+from lazy_imports import lazy_import
+
+requests = lazy_import('requests')
+
+# Configuration
+PROGRAM_ID = "FtDpp1TsamUskkz2AS7NTuRGqyB3j4dpP7mj9ATHbDoa"
+PYTH_BTC_PRICE_ACCOUNT = "8SXvChNYFh3qEi4J6tK1wQREu5x6YdE3C6HmZzThoG6E"
+SYSTEM_PROGRAM_ID = "11111111111111111111111111111111"
+COMPUTE_BUDGET_PROGRAM_ID = "ComputeBudget111111111111111111111111111111"
+RPC_URL = "https://api.devnet.solana.com"
+
+# Account layouts (Anchor 8-byte discriminator + Borsh fields)
+DATAPOINT_LAYOUT = struct.Struct("<qQQI")     # timestamp, sbtc_value, btc_price, data_points_used
+ORACLE_STATE_LAYOUT = struct.Struct("<Qq")    # trend_value, last_update
+DATAPOINT_ACCOUNT_SIZE = 8 + DATAPOINT_LAYOUT.size
+ORACLE_STATE_ACCOUNT_SIZE = 8 + ORACLE_STATE_LAYOUT.size
+
+# Zero-copy DatapointHistory ring buffer (repr(C), see HISTORY_CAPACITY in lib.rs)
+HISTORY_CAPACITY = 256
+HISTORY_HEADER_LAYOUT = struct.Struct("<32sII")   # authority, head, count
+HISTORY_SLOT_LAYOUT = struct.Struct("<qQQI4x")    # timestamp, sbtc_value, btc_price, data_points_used, padding
+HISTORY_ACCOUNT_SIZE = 8 + HISTORY_HEADER_LAYOUT.size + HISTORY_CAPACITY * HISTORY_SLOT_LAYOUT.size
+
+# Ed25519 field parameters, used to keep program derived addresses off the curve
+_ED25519_P = 2 ** 255 - 19
+_ED25519_D = (-121665 * pow(121666, _ED25519_P - 2, _ED25519_P)) % _ED25519_P
+
+AccountMeta = namedtuple("AccountMeta", ["pubkey", "is_signer", "is_writable"])
+Instruction = namedtuple("Instruction", ["program_id", "accounts", "data"])
+
+
+class SolanaRpcError(Exception):
+    """Raised when the RPC node returns a JSON-RPC error object"""
+
+    def __init__(self, method: str, error: Dict):
+        self.method = method
+        self.code = error.get('code')
+        self.data = error.get('data')
+        super().__init__(f"{method} failed ({self.code}): {error.get('message', 'Unknown error')}")
+
+
+def anchor_discriminator(namespace: str, name: str) -> bytes:
+    """Anchor discriminator: first 8 bytes of sha256("<namespace>:<name>")"""
+    return hashlib.sha256(f"{namespace}:{name}".encode()).digest()[:8]
+
+
+UPDATE_TREND_DISCRIMINATOR = anchor_discriminator("global", "update_trend")
+STORE_DATAPOINT_DISCRIMINATOR = anchor_discriminator("global", "store_datapoint")
+INITIALIZE_HISTORY_DISCRIMINATOR = anchor_discriminator("global", "initialize_history")
+DATAPOINT_HISTORY_DISCRIMINATOR = anchor_discriminator("account", "DatapointHistory")
+DATAPOINT_DISCRIMINATOR = anchor_discriminator("account", "Datapoint")
+ORACLE_STATE_DISCRIMINATOR = anchor_discriminator("account", "OracleState")
+
+
+# ---------------------------------------------------------------------------
+# Borsh encoding / decoding
+# ---------------------------------------------------------------------------
+
+def encode_update_trend(new_trend: int) -> bytes:
+    """Instruction data for update_trend(new_trend: u64)"""
+    return UPDATE_TREND_DISCRIMINATOR + struct.pack("<Q", new_trend)
+
+
+def encode_store_datapoint(sbtc_value: int, btc_price: int, data_points_used: int) -> bytes:
+    """Instruction data for store_datapoint(sbtc_value: u64, btc_price: u64, data_points_used: u32)"""
+    return STORE_DATAPOINT_DISCRIMINATOR + struct.pack("<QQI", sbtc_value, btc_price, data_points_used)
+
+
+def decode_datapoint(data: bytes) -> Dict:
+    """Decode a Datapoint account; values stay in cents as stored on-chain"""
+    if len(data) < DATAPOINT_ACCOUNT_SIZE or data[:8] != DATAPOINT_DISCRIMINATOR:
+        raise ValueError("Account data is not a Datapoint")
+    timestamp, sbtc_value, btc_price, data_points_used = DATAPOINT_LAYOUT.unpack_from(data, 8)
+    return {
+        'timestamp': timestamp,
+        'sbtc_value': sbtc_value,
+        'btc_price': btc_price,
+        'data_points_used': data_points_used,
+    }
+
+
+def decode_datapoint_history(data: bytes) -> Dict:
+    """Decode the DatapointHistory ring buffer; datapoints are returned oldest first"""
+    if len(data) < HISTORY_ACCOUNT_SIZE or data[:8] != DATAPOINT_HISTORY_DISCRIMINATOR:
+        raise ValueError("Account data is not a DatapointHistory")
+    authority, head, count = HISTORY_HEADER_LAYOUT.unpack_from(data, 8)
+    slots_offset = 8 + HISTORY_HEADER_LAYOUT.size
+    oldest = (head - count) % HISTORY_CAPACITY
+    datapoints = []
+    for i in range(count):
+        offset = slots_offset + ((oldest + i) % HISTORY_CAPACITY) * HISTORY_SLOT_LAYOUT.size
+        timestamp, sbtc_value, btc_price, data_points_used = HISTORY_SLOT_LAYOUT.unpack_from(data, offset)
+        datapoints.append({
+            'timestamp': timestamp,
+            'sbtc_value': sbtc_value,
+            'btc_price': btc_price,
+            'data_points_used': data_points_used,
+        })
+    return {
+        'authority': base58.b58encode(authority).decode(),
+        'head': head,
+        'count': count,
+        'datapoints': datapoints,
+    }
+
+
+def decode_oracle_state(data: bytes) -> Dict:
+    """Decode the OracleState account"""
+    if len(data) < ORACLE_STATE_ACCOUNT_SIZE or data[:8] != ORACLE_STATE_DISCRIMINATOR:
+        raise ValueError("Account data is not an OracleState")
+    trend_value, last_update = ORACLE_STATE_LAYOUT.unpack_from(data, 8)
+    return {'trend_value': trend_value, 'last_update': last_update}
+
+
+def datapoint_filters() -> List[Dict]:
+    """getProgramAccounts filters selecting Datapoint accounts (dataSize + discriminator)"""
+    return [
+        {'dataSize': DATAPOINT_ACCOUNT_SIZE},
+        {'memcmp': {'offset': 0, 'bytes': base58.b58encode(DATAPOINT_DISCRIMINATOR).decode()}},
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Keys and program derived addresses
+# ---------------------------------------------------------------------------
+
+def is_on_curve(pubkey: bytes) -> bool:
+    """Return True if the 32 bytes decompress to an ed25519 point"""
+    y = int.from_bytes(pubkey, "little") & ((1 << 255) - 1)
+    p = _ED25519_P
+    y2 = y * y % p
+    u = (y2 - 1) % p
+    v = (_ED25519_D * y2 + 1) % p
+    # Candidate square root of u/v, see RFC 8032 section 5.1.3
+    x = u * pow(v, 3, p) * pow(u * pow(v, 7, p), (p - 5) // 8, p) % p
+    vx2 = v * x * x % p
+    return vx2 == u or vx2 == (-u) % p
+
+
+def create_program_address(seeds: List[bytes], program_id: str) -> Optional[str]:
+    """Hash seeds into an address, returning None if it lands on the curve"""
+    hasher = hashlib.sha256()
+    for seed in seeds:
+        hasher.update(seed)
+    hasher.update(base58.b58decode(program_id))
+    hasher.update(b"ProgramDerivedAddress")
+    address = hasher.digest()
+    if is_on_curve(address):
+        return None
+    return base58.b58encode(address).decode()
+
+
+def find_program_address(seeds: List[bytes], program_id: str = PROGRAM_ID) -> Tuple[str, int]:
+    """Find the canonical (highest bump) program derived address"""
+    for bump in range(255, -1, -1):
+        address = create_program_address(list(seeds) + [bytes([bump])], program_id)
+        if address is not None:
+            return address, bump
+    raise ValueError("Unable to find a viable program address bump seed")
+
+
+def get_oracle_state_address(program_id: str = PROGRAM_ID) -> str:
+    """Oracle state PDA (seeds = [b"oracle"])"""
+    return find_program_address([b"oracle"], program_id)[0]
+
+
+def get_history_address(program_id: str = PROGRAM_ID) -> str:
+    """Datapoint history ring buffer PDA (seeds = [b"history"])"""
+    return find_program_address([b"history"], program_id)[0]
+
+
+class Keypair:
+    """Ed25519 keypair compatible with the solana-keygen JSON file format"""
+
+    def __init__(self, signing_key: SigningKey):
+        self._signing_key = signing_key
+        self.pubkey = base58.b58encode(bytes(signing_key.verify_key)).decode()
+
+    @classmethod
+    def generate(cls) -> "Keypair":
+        return cls(SigningKey.generate())
+
+    @classmethod
+    def from_file(cls, path: str) -> "Keypair":
+        with open(os.path.expanduser(path)) as f:
+            secret = bytes(json.load(f))
+        return cls(SigningKey(secret[:32]))
+
+    def sign(self, message: bytes) -> bytes:
+        return self._signing_key.sign(message).signature
+
+
+# ---------------------------------------------------------------------------
+# Legacy transaction wire format
+# ---------------------------------------------------------------------------
+
+def encode_compact_u16(value: int) -> bytes:
+    """Solana's variable-length ("shortvec") u16 encoding"""
+    out = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def decode_compact_u16(data: bytes, offset: int) -> Tuple[int, int]:
+    """Decode a shortvec at offset, returning (value, new_offset)"""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def compile_message(instructions: List[Instruction], payer: str, recent_blockhash: str) -> bytes:
+    """Serialize a legacy message: header, account keys, blockhash, instructions"""
+    # Merge account flags, fee payer first
+    flags = {payer: [True, True]}
+    order = [payer]
+    for ix in instructions:
+        for meta in list(ix.accounts) + [AccountMeta(ix.program_id, False, False)]:
+            if meta.pubkey not in flags:
+                flags[meta.pubkey] = [meta.is_signer, meta.is_writable]
+                order.append(meta.pubkey)
+            else:
+                flags[meta.pubkey][0] |= meta.is_signer
+                flags[meta.pubkey][1] |= meta.is_writable
+
+    def rank(key):
+        is_signer, is_writable = flags[key]
+        return (0 if is_signer else 2) + (0 if is_writable else 1)
+
+    keys = sorted(order, key=lambda key: (rank(key), order.index(key)))
+    index = {key: i for i, key in enumerate(keys)}
+    num_signers = sum(1 for key in keys if flags[key][0])
+    num_readonly_signed = sum(1 for key in keys if flags[key][0] and not flags[key][1])
+    num_readonly_unsigned = sum(1 for key in keys if not flags[key][0] and not flags[key][1])
+
+    out = bytearray([num_signers, num_readonly_signed, num_readonly_unsigned])
+    out += encode_compact_u16(len(keys))
+    for key in keys:
+        out += base58.b58decode(key)
+    out += base58.b58decode(recent_blockhash)
+    out += encode_compact_u16(len(instructions))
+    for ix in instructions:
+        out.append(index[ix.program_id])
+        out += encode_compact_u16(len(ix.accounts))
+        out += bytes(index[meta.pubkey] for meta in ix.accounts)
+        out += encode_compact_u16(len(ix.data))
+        out += ix.data
+    return bytes(out)
+
+
+def build_transaction(instructions: List[Instruction], payer: Keypair, signers: List[Keypair],
+                      recent_blockhash: str) -> bytes:
+    """Compile and sign a transaction; payer must be the first signer"""
+    message = compile_message(instructions, payer.pubkey, recent_blockhash)
+    num_signers = message[0]
+    _, offset = decode_compact_u16(message, 3)
+    signer_keys = [base58.b58encode(message[offset + 32 * i:offset + 32 * (i + 1)]).decode()
+                   for i in range(num_signers)]
+    by_pubkey = {kp.pubkey: kp for kp in [payer] + list(signers)}
+    missing = [key for key in signer_keys if key not in by_pubkey]
+    if missing:
+        raise ValueError(f"Missing signers: {', '.join(missing)}")
+    signatures = b"".join(by_pubkey[key].sign(message) for key in signer_keys)
+    return encode_compact_u16(num_signers) + signatures + message
+
+
+def parse_transaction(raw: bytes) -> Dict:
+    """Decode a legacy transaction into signatures, account keys and instructions"""
+    num_sigs, offset = decode_compact_u16(raw, 0)
+    signatures = [base58.b58encode(raw[offset + 64 * i:offset + 64 * (i + 1)]).decode()
+                  for i in range(num_sigs)]
+    offset += 64 * num_sigs
+    header = raw[offset:offset + 3]
+    offset += 3
+    num_keys, offset = decode_compact_u16(raw, offset)
+    keys = [base58.b58encode(raw[offset + 32 * i:offset + 32 * (i + 1)]).decode() for i in range(num_keys)]
+    offset += 32 * num_keys
+    blockhash = base58.b58encode(raw[offset:offset + 32]).decode()
+    offset += 32
+    num_ix, offset = decode_compact_u16(raw, offset)
+    instructions = []
+    for _ in range(num_ix):
+        program_index = raw[offset]
+        offset += 1
+        num_accounts, offset = decode_compact_u16(raw, offset)
+        accounts = [keys[i] for i in raw[offset:offset + num_accounts]]
+        offset += num_accounts
+        data_len, offset = decode_compact_u16(raw, offset)
+        instructions.append({
+            'program_id': keys[program_index],
+            'accounts': accounts,
+            'data': raw[offset:offset + data_len],
+        })
+        offset += data_len
+    return {
+        'signatures': signatures,
+        'num_required_signatures': header[0],
+        'account_keys': keys,
+        'recent_blockhash': blockhash,
+        'instructions': instructions,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Instruction builders
+# ---------------------------------------------------------------------------
+
+def update_trend_instruction(new_trend: int, authority: str, oracle_state: Optional[str] = None,
+                             pyth_price_account: str = PYTH_BTC_PRICE_ACCOUNT,
+                             program_id: str = PROGRAM_ID) -> Instruction:
+    """update_trend: oracle_state (mut), pyth_price_account, authority (signer)"""
+    return Instruction(program_id, [
+        AccountMeta(oracle_state or get_oracle_state_address(program_id), False, True),
+        AccountMeta(pyth_price_account, False, False),
+        AccountMeta(authority, True, False),
+    ], encode_update_trend(new_trend))
+
+
+def store_datapoint_instruction(sbtc_cents: int, btc_cents: int, data_points_used: int, authority: str,
+                                history: Optional[str] = None, program_id: str = PROGRAM_ID) -> Instruction:
+    """store_datapoint: history (mut), authority (signer)"""
+    return Instruction(program_id, [
+        AccountMeta(history or get_history_address(program_id), False, True),
+        AccountMeta(authority, True, False),
+    ], encode_store_datapoint(sbtc_cents, btc_cents, data_points_used))
+
+
+def set_compute_unit_limit_instruction(units: int) -> Instruction:
+    """ComputeBudgetInstruction::SetComputeUnitLimit(u32)"""
+    return Instruction(COMPUTE_BUDGET_PROGRAM_ID, [], bytes([2]) + struct.pack("<I", units))
+
+
+def set_compute_unit_price_instruction(micro_lamports: int) -> Instruction:
+    """ComputeBudgetInstruction::SetComputeUnitPrice(u64), priority fee per CU in micro-lamports"""
+    return Instruction(COMPUTE_BUDGET_PROGRAM_ID, [], bytes([3]) + struct.pack("<Q", micro_lamports))
+
+
+def initialize_history_instruction(authority: str, program_id: str = PROGRAM_ID) -> Instruction:
+    """initialize_history: history (init PDA), authority (mut signer), system_program"""
+    return Instruction(program_id, [
+        AccountMeta(get_history_address(program_id), False, True),
+        AccountMeta(authority, True, True),
+        AccountMeta(SYSTEM_PROGRAM_ID, False, False),
+    ], INITIALIZE_HISTORY_DISCRIMINATOR)
+
+
+# ---------------------------------------------------------------------------
+# JSON-RPC client
+# ---------------------------------------------------------------------------
+
+class SolanaRpcClient:
+    """Minimal JSON-RPC client reusing one keep-alive HTTP connection pool"""
+
+    def __init__(self, rpc_url: str = RPC_URL, timeout: float = 10.0, pool_size: int = 10,
+                 commitment: str = "confirmed"):
+        self.rpc_url = rpc_url
+        self.timeout = timeout
+        self.commitment = commitment
+        self.last_context_slot = None  # Slot of the most recent response carrying a context
+        self._request_id = 0
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({'Content-Type': 'application/json', 'User-Agent': 'SBTC-Oracle/1.0'})
+
+    def close(self):
+        self.session.close()
+
+    def _call(self, method: str, params: Optional[list] = None):
+        self._request_id += 1
+        payload = {'jsonrpc': '2.0', 'id': self._request_id, 'method': method, 'params': params or []}
+        response = self.session.post(self.rpc_url, data=json.dumps(payload), timeout=self.timeout)
+        response.raise_for_status()
+        body = response.json()
+        if 'error' in body:
+            raise SolanaRpcError(method, body['error'])
+        result = body['result']
+        if isinstance(result, dict) and 'context' in result:
+            self.last_context_slot = result['context'].get('slot')
+            return result['value']
+        return result
+
+    @staticmethod
+    def _decode_account(value: Optional[Dict]) -> Optional[Dict]:
+        if value is None:
+            return None
+        return {
+            'data': base64.b64decode(value['data'][0]),
+            'owner': value['owner'],
+            'lamports': value['lamports'],
+            'executable': value.get('executable', False),
+        }
+
+    def get_slot(self) -> int:
+        return self._call("getSlot", [{'commitment': self.commitment}])
+
+    def get_block_height(self) -> int:
+        return self._call("getBlockHeight", [{'commitment': self.commitment}])
+
+    def get_balance(self, pubkey: str) -> int:
+        return self._call("getBalance", [pubkey, {'commitment': self.commitment}])
+
+    def get_account_info(self, pubkey: str) -> Optional[Dict]:
+        value = self._call("getAccountInfo", [pubkey, {'encoding': 'base64', 'commitment': self.commitment}])
+        return self._decode_account(value)
+
+    def get_multiple_accounts(self, pubkeys: List[str]) -> List[Optional[Dict]]:
+        values = self._call("getMultipleAccounts",
+                            [list(pubkeys), {'encoding': 'base64', 'commitment': self.commitment}])
+        return [self._decode_account(value) for value in values]
+
+    def get_program_accounts(self, program_id: str = PROGRAM_ID, filters: Optional[List[Dict]] = None,
+                             data_slice: Optional[Tuple[int, int]] = None) -> List[Tuple[str, Dict]]:
+        config = {'encoding': 'base64', 'commitment': self.commitment}
+        if filters:
+            config['filters'] = filters
+        if data_slice is not None:
+            config['dataSlice'] = {'offset': data_slice[0], 'length': data_slice[1]}
+        results = self._call("getProgramAccounts", [program_id, config])
+        return [(item['pubkey'], self._decode_account(item['account'])) for item in results]
+
+    def get_latest_blockhash(self) -> Tuple[str, int]:
+        value = self._call("getLatestBlockhash", [{'commitment': self.commitment}])
+        return value['blockhash'], value['lastValidBlockHeight']
+
+    def send_transaction(self, raw_transaction: bytes, skip_preflight: bool = False) -> str:
+        return self._call("sendTransaction", [
+            base64.b64encode(raw_transaction).decode(),
+            {'encoding': 'base64', 'skipPreflight': skip_preflight, 'preflightCommitment': self.commitment},
+        ])
+
+    def get_signature_statuses(self, signatures: List[str]) -> List[Optional[Dict]]:
+        return self._call("getSignatureStatuses", [list(signatures), {'searchTransactionHistory': False}])
+
+    def get_recent_prioritization_fees(self, writable_accounts: Optional[List[str]] = None) -> List[int]:
+        """Per-slot minimum priority fees (micro-lamports/CU) paid by transactions locking the accounts"""
+        results = self._call("getRecentPrioritizationFees", [list(writable_accounts or [])])
+        return [item['prioritizationFee'] for item in results]
+
+    # sma_oracle helpers -----------------------------------------------------
+
+    def get_oracle_state(self, oracle_state: Optional[str] = None) -> Optional[Dict]:
+        account = self.get_account_info(oracle_state or get_oracle_state_address())
+        return decode_oracle_state(account['data']) if account else None
+
+    def get_datapoint_history(self, history: Optional[str] = None) -> Optional[Dict]:
+        """Whole ring-buffer history with a single account fetch"""
+        account = self.get_account_info(history or get_history_address())
+        return decode_datapoint_history(account['data']) if account else None
+
+    def get_datapoint(self, address: str) -> Optional[Dict]:
+        account = self.get_account_info(address)
+        return decode_datapoint(account['data']) if account else None
+
+    def get_program_info(self, program_id: str = PROGRAM_ID) -> Optional[Dict]:
+        """Equivalent of `solana program show --output json` for upgradeable programs"""
+        program = self.get_account_info(program_id)
+        if program is None:
+            return None
+        info = {'programId': program_id, 'owner': program['owner'], 'lamports': program['lamports'],
+                'authority': None, 'dataLen': len(program['data']), 'lastDeploySlot': None}
+        # UpgradeableLoaderState::Program { programdata_address }
+        if len(program['data']) >= 36 and struct.unpack_from("<I", program['data'])[0] == 2:
+            programdata_address = base58.b58encode(program['data'][4:36]).decode()
+            programdata = self.get_account_info(programdata_address)
+            if programdata is not None:
+                # UpgradeableLoaderState::ProgramData { slot, upgrade_authority_address: Option<Pubkey> }
+                data = programdata['data']
+                info['programdataAddress'] = programdata_address
+                info['lastDeploySlot'] = struct.unpack_from("<Q", data, 4)[0]
+                if data[12] == 1:
+                    info['authority'] = base58.b58encode(data[13:45]).decode()
+                info['dataLen'] = len(data) - 45
+                info['lamports'] += programdata['lamports']
+        return info
+
+    def get_datapoint_addresses(self, program_id: str = PROGRAM_ID) -> List[str]:
+        """Addresses of all Datapoint accounts, without transferring their data"""
+        return [pubkey for pubkey, _ in
+                self.get_program_accounts(program_id, datapoint_filters(), data_slice=(0, 0))]
+
+    def get_all_datapoints(self, program_id: str = PROGRAM_ID) -> List[Tuple[str, Dict]]:
+        """All legacy per-account Datapoints owned by the program, decoded one by one"""
+        return [(pubkey, decode_datapoint(account['data']))
+                for pubkey, account in self.get_program_accounts(program_id, datapoint_filters())]
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script for API response encoding
+Exercises content negotiation through the Flask test client
+"""
+
+import json
+
+import msgpack
+import pyarrow as pa
+
+import sbtc_api
+from price_sources import HistoryCache, PriceAggregator, PriceSource
+
+
+class SimulatedSource(PriceSource):
+    name = 'simulated'
+
+    def __init__(self):
+        super().__init__()
+        self.fetched = []
+
+    def fetch(self, days):
+        self.fetched.append(days)
+        return sbtc_api.get_simulated_btc_data(days)[['timestamp', 'price']]
+
+
+def seed_datapoints(count=50):
+    sbtc_api.state.datapoints.clear()
+    for i in range(count):
+        sbtc_api.state.datapoints.append({
+            'timestamp': 1_700_000_000 + i * 3600,
+            'sbtc_value': 46000.0 + i,
+            'btc_price': 47000.0 + i,
+            'data_points_used': 1000,
+            'stored_at': '2024-01-01T00:00:00',
+        })
+
+
+def batch_url(**params):
+    query = '&'.join(f"{k}={v}" for k, v in params.items())
+    return f"/datapoints/batch?start_timestamp=1700000000&end_timestamp=1800000000{'&' + query if query else ''}"
+
+
+def test_json_is_default():
+    seed_datapoints()
+    client = sbtc_api.app.test_client()
+    response = client.get(batch_url())
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    assert 'Accept' in response.headers['Vary']
+    data = json.loads(response.data)
+    assert data['data']['count'] == 50
+    assert data['data']['datapoints'][0]['timestamp'] == 1_700_000_000
+    print("✅ JSON is returned by default")
+
+
+def test_msgpack_and_arrow():
+    seed_datapoints()
+    client = sbtc_api.app.test_client()
+    expected = json.loads(client.get(batch_url()).data)
+
+    response = client.get(batch_url(), headers={'Accept': 'application/msgpack'})
+    assert response.mimetype == 'application/msgpack'
+    assert msgpack.unpackb(response.data) == expected
+
+    response = client.get(batch_url(format='arrow'))
+    assert response.mimetype == 'application/vnd.apache.arrow.stream'
+    table = pa.ipc.open_stream(response.data).read_all()
+    assert table.column('timestamp').to_pylist() == [dp['timestamp'] for dp in expected['data']['datapoints']]
+    envelope = json.loads(table.schema.metadata[b'envelope'])
+    assert envelope['data']['count'] == 50 and 'datapoints' not in envelope['data']
+    print("✅ MessagePack and Arrow round trip")
+
+
+def test_unsupported_format():
+    client = sbtc_api.app.test_client()
+    # Arrow only applies to array-shaped responses
+    assert client.get('/health?format=arrow').status_code == 406
+    assert client.get('/health', headers={'Accept': 'text/csv'}).status_code == 406
+    assert client.get('/health', headers={'Accept': 'application/msgpack'}).mimetype == 'application/msgpack'
+    # Error responses negotiate too: 406 wins over the endpoint's own status
+    assert client.get('/datapoints/batch?start_timestamp=x').status_code == 400
+    assert client.get('/datapoints/batch?start_timestamp=x', headers={'Accept': 'text/csv'}).status_code == 406
+    assert client.get('/sbtc/series?profile=nope', headers={'Accept': 'text/csv'}).status_code == 406
+    print("✅ Unsupported formats are rejected with 406")
+
+
+def test_series_days_validated():
+    client = sbtc_api.app.test_client()
+    for days in (0, 99, 1001, 10**9):
+        response = client.get(f"/sbtc/series?days={days}")
+        assert response.status_code == 400 and response.get_json()['success'] is False
+
+    source = SimulatedSource()
+    sbtc_api.history_cache = HistoryCache(PriceAggregator([source]))
+    sbtc_api.state.history.clear()
+    try:
+        full = client.get('/sbtc/series').get_json()['data']
+        tail = client.get('/sbtc/series?days=300').get_json()['data']
+    finally:
+        sbtc_api.history_cache = None
+    assert full['count'] == 1000 and tail['count'] == 300
+    assert tail['series']['date'] == full['series']['date'][-300:]
+    assert source.fetched == [sbtc_api.SBTC_HISTORY_DAYS]  # Sliced, not fetched again
+    print("✅ /sbtc/series serves days as the tail of the shared history")
+
+
+if __name__ == "__main__":
+    print("API Encoding Test Suite")
+    print("=" * 40)
+    test_json_is_default()
+    test_msgpack_and_arrow()
+    test_unsupported_format()
+    test_series_days_validated()
+    print("=" * 40)
+    print("Test completed!")
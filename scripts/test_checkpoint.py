@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Test script for warm-restart snapshots
+A restarted app must serve the snapshot's target and curve without fetching
+or computing, and rebuild snapshots it cannot use
+"""
+
+import os
+import struct
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import sbtc_api
+import sbtc_compute
+from checkpoint import SNAPSHOT_VERSION, Checkpointer, SnapshotError, read_snapshot, write_snapshot
+from price_sources import HistoryCache, PriceAggregator, PriceSource, PriceSourceError
+
+
+class SimulatedSource(PriceSource):
+    name = 'simulated'
+
+    def fetch(self, days):
+        return sbtc_api.get_simulated_btc_data(days)[['timestamp', 'price']]
+
+
+class UnreachableSource(PriceSource):
+    name = 'unreachable'
+
+    def fetch(self, days):
+        raise PriceSourceError("upstream down")
+
+
+class SlowUnreachableSource(UnreachableSource):
+    def fetch(self, days):
+        time.sleep(0.3)
+        return super().fetch(days)
+
+
+class counting:
+    """Count calls to compute_sbtc_series (from sbtc_api, or via compute_sbtc)"""
+
+    def __enter__(self):
+        self.calls = 0
+        self.original = sbtc_compute.compute_sbtc_series
+
+        def compute_sbtc_series(*args, **kwargs):
+            self.calls += 1
+            return self.original(*args, **kwargs)
+
+        sbtc_api.compute_sbtc_series = sbtc_compute.compute_sbtc_series = compute_sbtc_series
+        return self
+
+    def __exit__(self, *exc):
+        sbtc_api.compute_sbtc_series = sbtc_compute.compute_sbtc_series = self.original
+
+
+def start(source, path, warm=True):
+    sbtc_api.history_cache = HistoryCache(PriceAggregator([source]), on_refresh=sbtc_api.publish_history)
+    return sbtc_api.create_app({'snapshot_path': path, 'snapshot_interval': 3600, 'warm': warm}).test_client()
+
+
+def teardown():
+    sbtc_api.checkpointer.stop()
+    sbtc_api.checkpointer = None
+    sbtc_api.history_cache = None
+
+
+def test_snapshot_file_roundtrip():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.snap')
+        prices = np.linspace(1.0, 2.0, 1001)
+        write_snapshot(path, {'fingerprint': 'abc'}, {'price': prices, 'timestamp': np.arange(1001, dtype='<i8')})
+        metadata, arrays = read_snapshot(path)
+        assert metadata['fingerprint'] == 'abc' and os.listdir(tmp) == ['state.snap']
+        np.testing.assert_array_equal(arrays['price'], prices)
+        assert not arrays['price'].flags.writeable  # read-only view of the mmap
+        assert arrays['timestamp'].ctypes.data % 64 == 0
+
+        with open(path, 'rb') as f:
+            valid = f.read()
+        newer = valid[:8] + struct.pack('<I', SNAPSHOT_VERSION + 1) + valid[12:]
+        for content in (newer, b'SBTC', b'', valid[:200]):
+            with open(path, 'wb') as f:
+                f.write(content)
+            try:
+                read_snapshot(path)
+                assert False, "unusable snapshots should be rejected"
+            except SnapshotError:
+                pass
+    print("✅ Snapshots round-trip as aligned zero-copy arrays and reject other versions")
+
+
+def test_checkpointer_writes_on_change():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.snap')
+        revision = [1]
+        checkpointer = Checkpointer(path, lambda: (revision[0], {'revision': revision[0]}, {'x': np.zeros(3)}))
+        assert checkpointer.save() and not checkpointer.save()
+        revision[0] = 2
+        assert checkpointer.save() and read_snapshot(path).metadata['revision'] == 2
+        assert not Checkpointer(path, lambda: None).save()
+    print("✅ The checkpointer rewrites the snapshot only when the state changed")
+
+
+def test_warm_restart_serves_snapshot():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.snap')
+        try:
+            client = start(SimulatedSource(), path)
+            assert os.path.exists(path), "create_app should snapshot the warmed state"
+            current = client.get('/sbtc/current').get_json()['data']
+            series = client.get('/sbtc/series?days=1000').get_json()['data']['series']['sbtc_target']
+            sbtc_api.checkpointer.stop()
+
+            # Restart with the upstreams down: everything comes from the snapshot
+            with counting() as compute:
+                client = start(UnreachableSource(), path)
+                restarted = client.get('/sbtc/current')
+                restarted_series = client.get('/sbtc/series?days=1000')
+            assert compute.calls == 0
+            assert restarted.status_code == 200 and restarted_series.status_code == 200
+            assert restarted.get_json()['data'] == current
+            assert restarted_series.get_json()['data']['series']['sbtc_target'] == series
+        finally:
+            teardown()
+    print("✅ A restarted app serves the snapshot without fetching or computing")
+
+
+def test_snapshot_thread_does_not_compute():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.snap')
+        try:
+            client = start(SimulatedSource(), path)
+            # A worker refreshed the history; nobody has computed its curves yet
+            history = sbtc_api.state.history.read(lambda days, fetched_at, status, *columns:
+                                                  (days, fetched_at + 1, status, [c.copy() for c in columns]))
+            days, fetched_at, status, columns = history
+            sbtc_api.state.history.write(days, *columns, fetched_at, status)
+            with counting() as compute:
+                assert sbtc_api.checkpointer.save()
+            assert compute.calls == 0
+            metadata, arrays = read_snapshot(path)
+            assert metadata['fetched_at'] == fetched_at and 'final_plr' not in arrays
+
+            series = client.get('/sbtc/series').get_json()['data']['series']['sbtc_target']
+            with counting() as compute:
+                assert sbtc_api.checkpointer.save()
+            assert compute.calls == 0
+            saved = read_snapshot(path).arrays['final_plr'][::-1]
+            assert [None if np.isnan(v) else float(v) for v in saved] == series
+        finally:
+            teardown()
+    print("✅ The snapshot thread saves the curves workers computed instead of computing")
+
+
+def test_incompatible_snapshot_rebuilt():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.snap')
+        profile, max_age = sbtc_api.SBTC_PROFILE, sbtc_api.HISTORY_MAX_AGE
+        try:
+            start(SimulatedSource(), path, warm=False)
+            sbtc_api.warm_target()
+            assert sbtc_api.checkpointer.save()
+            old = read_snapshot(path).metadata['fingerprint']
+            sbtc_api.checkpointer.stop()
+
+            sbtc_api.SBTC_PROFILE = 'default'
+            assert sbtc_api.restore_snapshot(path) == 'incompatible'
+            assert sbtc_api.state.history.read(lambda *args: True), "the price history is still reusable"
+            # The restored history is stale, so the rebuild also starts a (slow, failing) refresh
+            sbtc_api.HISTORY_MAX_AGE = 0
+            client = start(SlowUnreachableSource(), path, warm=False)
+            assert not any(thread.name == 'price-refresh' for thread in threading.enumerate()), \
+                "no fetch may be running when gunicorn forks"
+            metadata = read_snapshot(path).metadata
+            assert metadata['fingerprint'] != old and metadata['profile'] == 'default'
+            assert client.get('/sbtc/current').get_json()['data']['profile'] == 'default'
+        finally:
+            sbtc_api.SBTC_PROFILE, sbtc_api.HISTORY_MAX_AGE = profile, max_age
+            teardown()
+    print("✅ Snapshots from other parameters are rebuilt before the workers fork")
+
+
+if __name__ == "__main__":
+    print("Checkpoint Test Suite")
+    print("=" * 40)
+    test_snapshot_file_roundtrip()
+    test_checkpointer_writes_on_change()
+    test_warm_restart_serves_snapshot()
+    test_snapshot_thread_does_not_compute()
+    test_incompatible_snapshot_rebuilt()
+    print("=" * 40)
+    print("Test completed!")
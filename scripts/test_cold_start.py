@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test script for lazy imports and the preloading app factory
+"""
+
+import os
+import subprocess
+import sys
+
+import sbtc_api
+from http_cache import last_bar_date
+from lazy_imports import LazyModule
+from price_sources import HistoryCache, PriceAggregator, PriceSource
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class SimulatedSource(PriceSource):
+    name = 'simulated'
+
+    def fetch(self, days):
+        return sbtc_api.get_simulated_btc_data(days)[['timestamp', 'price']]
+
+
+def test_health_does_not_load_scientific_stack():
+    code = ("import sys, sbtc_api; sbtc_api.app.test_client().get('/health'); "
+            "print(sorted(p for p in ('numpy', 'pandas', 'requests', 'pyarrow') if p in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], cwd=SCRIPTS_DIR, capture_output=True, text=True,
+                            check=True)
+    assert result.stdout.strip() == '[]', result.stdout
+    print("✅ /health runs without numpy, pandas, requests or pyarrow")
+
+
+def test_create_app_warms_caches():
+    assert isinstance(sbtc_api.np, LazyModule)
+    sbtc_api.history_cache = HistoryCache(PriceAggregator([SimulatedSource()]))
+    app = sbtc_api.create_app()
+    assert app is sbtc_api.app
+    assert sbtc_api.state.result.get(last_bar_date()) is not None, "warm-up should compute the current target"
+    assert app.test_client().get('/sbtc/current').status_code == 200
+    sbtc_api.history_cache = None
+    print("✅ create_app precomputes the current target")
+
+
+if __name__ == "__main__":
+    print("Cold Start Test Suite")
+    print("=" * 40)
+    test_health_does_not_load_scientific_stack()
+    test_create_app_warms_caches()
+    print("=" * 40)
+    print("Test completed!")
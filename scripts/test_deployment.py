@@ -6,6 +6,8 @@ Test script for the deployed SBTC Oracle program on devnet
 import subprocess
 import json
 
+from solana_rpc import Keypair, SolanaRpcClient, get_oracle_state_address
+
 # Configuration
 PROGRAM_ID = "FtDpp1TsamUskkz2AS7NTuRGqyB3j4dpP7mj9ATHbDoa"
 RPC_URL = "https://api.devnet.solana.com"
@@ -14,10 +16,7 @@ AUTHORITY_KEYPAIR = "/Users/ppoirier/.config/solana/id.json"
 def get_authority_pubkey():
     """Get the authority public key from the keypair file"""
     try:
-        result = subprocess.run([
-            "solana-keygen", "pubkey", AUTHORITY_KEYPAIR
-        ], capture_output=True, text=True, check=True)
-        return result.stdout.strip()
+        return Keypair.from_file(AUTHORITY_KEYPAIR).pubkey
     except Exception as e:
         print(f"Error getting authority pubkey: {e}")
         return None
@@ -25,11 +24,7 @@ def get_authority_pubkey():
 def get_oracle_state_pda():
     """Generate the Program Derived Address for the oracle state"""
     try:
-        # Use solana CLI to find the PDA
-        result = subprocess.run([
-            "solana", "address", "--seed", "oracle", "--program-id", PROGRAM_ID
-        ], capture_output=True, text=True, check=True)
-        return result.stdout.strip()
+        return get_oracle_state_address(PROGRAM_ID)
     except Exception as e:
         print(f"Error generating PDA: {e}")
         return None
@@ -53,13 +48,11 @@ def test_program_deployment():
         return
     print(f"✅ Oracle State PDA: {oracle_state_pda}")
     
+    rpc = SolanaRpcClient(RPC_URL)
+    
     # Check if oracle state account exists
     try:
-        result = subprocess.run([
-            "solana", "account", oracle_state_pda, "--url", RPC_URL
-        ], capture_output=True, text=True)
-        
-        if result.returncode == 0:
+        if rpc.get_account_info(oracle_state_pda) is not None:
             print("✅ Oracle state account already exists")
         else:
             print("ℹ️  Oracle state account doesn't exist yet (needs initialization)")
@@ -68,9 +61,8 @@ def test_program_deployment():
     
     # Test program info
     try:
-        result = subprocess.run([
-            "solana", "program", "show", PROGRAM_ID, "--url", RPC_URL
-        ], capture_output=True, text=True, check=True)
+        if rpc.get_program_info(PROGRAM_ID) is None:
+            raise Exception(f"Program {PROGRAM_ID} not found")
         
         print("✅ Program info retrieved successfully")
         print(f"Program ID: {PROGRAM_ID}")
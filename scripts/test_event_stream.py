@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test script for the Server-Sent Events push channel
+Checks fan-out, resume from Last-Event-ID / timestamp, fan-out across forked
+workers and the /stream route
+"""
+
+import threading
+import time
+from multiprocessing import get_context
+
+import sbtc_api
+from event_stream import EventBroadcaster
+
+
+def read_events(stream, count):
+    """Collect (id, event) pairs from an SSE generator"""
+    events = []
+    for message in stream:
+        fields = dict(line.split(': ', 1) for line in message.strip().split('\n') if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((int(fields['id'].rsplit('-', 1)[1]), fields['event']))
+            if len(events) == count:
+                break
+    stream.close()  # disconnect, as the server does when a client goes away
+    return events
+
+
+def test_fan_out_to_idle_subscribers():
+    broadcaster = EventBroadcaster(heartbeat_interval=0.05)
+    subscribers = 500
+    received = []
+    streams = [broadcaster.stream(max_events=1) for _ in range(subscribers)]
+    for stream in streams:
+        next(stream)  # retry hint; subscriber is now registered at the current cursor
+    threads = [threading.Thread(target=lambda s=s: received.append(read_events(s, 1))) for s in streams]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    assert broadcaster.subscribers == subscribers
+
+    broadcaster.publish('datapoint', {'sbtc_value': 1.0})
+    for thread in threads:
+        thread.join(timeout=5)
+    assert received == [[(1, 'datapoint')]] * subscribers
+    assert broadcaster.subscribers == 0
+    print(f"✅ One publish reached {subscribers} subscribers")
+
+
+def test_resume():
+    broadcaster = EventBroadcaster(capacity=4)
+    for i in range(3):
+        broadcaster.publish('datapoint', {'i': i}, timestamp=1000 + i)
+
+    assert read_events(broadcaster.stream(last_event_id=broadcaster.event_id(1)), 2) == [(2, 'datapoint'),
+                                                                                         (3, 'datapoint')]
+    assert read_events(broadcaster.stream(since=1000), 2) == [(2, 'datapoint'), (3, 'datapoint')]
+
+    # Resume point evicted from the ring: a reset precedes the retained events
+    for i in range(3, 6):
+        broadcaster.publish('datapoint', {'i': i}, timestamp=1000 + i)
+    assert read_events(broadcaster.stream(last_event_id=broadcaster.event_id(0)), 2) == [(2, 'reset'),
+                                                                                         (3, 'datapoint')]
+    assert read_events(broadcaster.stream(since=999), 1) == [(2, 'reset')]
+
+    # Ids from another ring (a restart) or ahead of this one are unknown: reset, then a full replay
+    for unknown in ('1-3', broadcaster.event_id(99), '3'):
+        assert read_events(broadcaster.stream(last_event_id=unknown), 3) == [(2, 'reset'), (3, 'datapoint'),
+                                                                            (4, 'datapoint')]
+    print("✅ Resume from Last-Event-ID and timestamp")
+
+
+def publish_in_child(broadcaster, start):
+    start.wait(10)
+    broadcaster.publish('target', {'worker': 'child'})
+
+
+def subscribe_in_child(broadcaster, last_event_id, queue):
+    queue.put(read_events(broadcaster.stream(last_event_id=last_event_id), 2))
+
+
+def test_events_shared_across_processes():
+    broadcaster = EventBroadcaster(heartbeat_interval=0.05)
+    context = get_context('fork')
+    start = context.Event()
+    child = context.Process(target=publish_in_child, args=(broadcaster, start))
+    child.start()
+    stream = broadcaster.stream(max_events=1)
+    next(stream)  # subscribed before the other worker publishes
+    start.set()
+    assert read_events(stream, 1) == [(1, 'target')]
+    child.join(10)
+
+    # A client reconnecting to another worker resumes where it left off
+    resume_from = broadcaster.event_id(1)
+    broadcaster.publish('datapoint', {'worker': 'parent'})
+    broadcaster.publish('datapoint', {'worker': 'parent'})
+    queue = context.Queue()
+    child = context.Process(target=subscribe_in_child, args=(broadcaster, resume_from, queue))
+    child.start()
+    assert queue.get(timeout=10) == [(2, 'datapoint'), (3, 'datapoint')]
+    child.join(10)
+    print("✅ Events published by one worker reach subscribers of another")
+
+
+def test_store_publishes_to_stream():
+    client = sbtc_api.app.test_client()
+    last_id = sbtc_api.events.last_id
+    client.post('/datapoints/store', json={'sbtc_value': 46000.0, 'btc_price': 47000.0})
+
+    response = client.get('/stream', headers={'Last-Event-ID': sbtc_api.events.event_id(last_id)}, buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    chunks = response.response
+    assert next(chunks).startswith(b'retry:')
+    message = next(chunks).decode()
+    assert 'event: datapoint' in message and '"sbtc_value":46000.0' in message
+    response.close()
+    print("✅ store_datapoint is pushed to /stream")
+
+
+if __name__ == "__main__":
+    print("Event Stream Test Suite")
+    print("=" * 40)
+    test_fan_out_to_idle_subscribers()
+    test_resume()
+    test_events_shared_across_processes()
+    test_store_publishes_to_stream()
+    print("=" * 40)
+    print("Test completed!")
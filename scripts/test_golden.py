@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for the golden-output regression suite
+Every registered backend is checked against golden_data/sbtc_golden.npz
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from golden import BACKENDS, GOLDEN_CASES, GOLDEN_PROFILES, check, compare, load_golden, record
+
+
+def test_comparator():
+    expected = np.array([np.nan, 100.0, 200.0, 300.0])
+    assert compare(expected * (1 + 1e-7), expected)['ok']
+    drifted = compare(expected * np.array([1, 1, 1 + 1e-4, 1]), expected)
+    assert not drifted['ok'] and drifted['first_mismatch'] == 2 and drifted['mismatches'] == 1
+    shifted = compare(np.array([100.0, 100.0, 200.0, 300.0]), expected)
+    assert not shifted['ok'] and shifted['nan_mismatches'] == [0]
+    assert not compare(expected[1:], expected)['ok']
+    print("✅ Comparator checks NaN positions exactly and values within tolerance")
+
+
+def test_golden_file_covers_cases_and_profiles():
+    metadata, arrays = load_golden()
+    assert set(metadata['cases']) == set(GOLDEN_CASES) and set(metadata['profiles']) == set(GOLDEN_PROFILES)
+    for case in metadata['cases']:
+        for profile in metadata['profiles']:
+            final_plr = arrays[f"{case}/{profile}/final_plr"]
+            assert len(final_plr) == len(arrays[f"{case}/prices"]) and np.isfinite(final_plr).sum() > 100
+    print("✅ Golden file covers every case and profile")
+
+
+def test_fast_backends_match_golden():
+    backends = [name for name, fn in BACKENDS.items() if not fn.slow]
+    results = check(backends)
+    failed = [r for r in results if not r['ok']]
+    assert not failed, failed
+    worst = max(r['max_rel_error'] for r in results)
+    print(f"✅ {', '.join(backends)} match the golden outputs (max rel error {worst:.1e})")
+
+
+def test_slow_backends_match_golden():
+    # The baseline pandas reference takes seconds per case; the full matrix runs from `python golden.py`.
+    # The crash case's flat run checks the golden file has pandas' exact zero volatility there
+    backends = [name for name, fn in BACKENDS.items() if fn.slow]
+    results = check(backends, cases=['gaps', 'crash'], profiles=['short'])
+    assert results and all(r['ok'] for r in results), results
+    print(f"✅ {', '.join(backends)} match the golden outputs on gaps and crash (short profile)")
+
+
+def test_record_round_trip():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'golden.npz')
+        record(path)
+        assert all(r['ok'] and r['max_rel_error'] == 0 for r in check(['vectorized'], path=path))
+    print("✅ Recorded golden files round-trip")
+
+
+if __name__ == "__main__":
+    print("Golden Output Test Suite")
+    print("=" * 40)
+    test_comparator()
+    test_golden_file_covers_cases_and_profiles()
+    test_fast_backends_match_golden()
+    test_slow_backends_match_golden()
+    test_record_round_trip()
+    print("=" * 40)
+    print("Test completed!")
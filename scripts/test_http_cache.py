@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test script for HTTP caching on the SBTC Oracle API
+Checks ETag/Last-Modified validators and that 304s skip computation
+"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+
+import sbtc_api
+from http_cache import last_bar_date, next_daily_close, seconds_until_next_close
+from price_sources import HistoryCache, PriceAggregator, PriceSource
+
+
+class SimulatedSource(PriceSource):
+    """Deterministic price history that counts how often it is fetched"""
+
+    name = 'simulated'
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def fetch(self, days):
+        self.calls.append(days)
+        np.random.seed(42)
+        return sbtc_api.get_simulated_btc_data(days)[['timestamp', 'price']]
+
+
+def stub_price_source():
+    source = SimulatedSource()
+    sbtc_api.history_cache = HistoryCache(PriceAggregator([source]))
+    sbtc_api.state.history.clear()
+    sbtc_api.state.result.clear()
+    return source.calls
+
+
+def test_daily_close_alignment():
+    now = datetime(2025, 10, 4, 18, 30, tzinfo=timezone.utc)
+    assert next_daily_close(now) == datetime(2025, 10, 5, tzinfo=timezone.utc)
+    assert seconds_until_next_close(now) == 5 * 3600 + 30 * 60
+    assert str(last_bar_date(now)) == '2025-10-03'
+    print("✅ Freshness aligned with the next daily close")
+
+
+def test_sbtc_conditional_get():
+    calls = stub_price_source()
+    client = sbtc_api.app.test_client()
+
+    response = client.get('/sbtc/current')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert 'max-age=' in response.headers['Cache-Control']
+    assert response.headers['Last-Modified']
+    assert len(calls) == 1
+
+    # Revalidation and repeat polls are answered without fetching or recomputing
+    response = client.get('/sbtc/current', headers={'If-None-Match': etag})
+    assert response.status_code == 304 and response.data == b''
+    assert response.headers['ETag'] == etag
+    assert client.get('/sbtc/current').status_code == 200
+    assert len(calls) == 1
+
+    # Each representation has its own strong ETag
+    response = client.get('/sbtc/current?format=msgpack', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    sbtc_api.history_cache = None
+    print("✅ /sbtc/current returns 304 before computing")
+
+
+def test_datapoint_etag_follows_high_water_mark():
+    sbtc_api.state.datapoints.clear()
+    client = sbtc_api.app.test_client()
+    client.post('/datapoints/store', json={'sbtc_value': 46000.0, 'btc_price': 47000.0})
+
+    response = client.get('/datapoints/last')
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert client.get('/datapoints/last', headers={'If-None-Match': etag}).status_code == 304
+
+    batch = '/datapoints/batch?start_timestamp=1&end_timestamp=9999999999'
+    batch_etag = client.get(batch).headers['ETag']
+    assert client.get(batch, headers={'If-None-Match': batch_etag}).status_code == 304
+
+    client.post('/datapoints/store', json={'sbtc_value': 46001.0, 'btc_price': 47001.0})
+    assert client.get('/datapoints/last', headers={'If-None-Match': etag}).status_code == 200
+    assert client.get(batch, headers={'If-None-Match': batch_etag}).status_code == 200
+    print("✅ Datapoint ETags change when a datapoint is stored")
+
+
+if __name__ == "__main__":
+    print("HTTP Cache Test Suite")
+    print("=" * 40)
+    test_daily_close_alignment()
+    test_sbtc_conditional_get()
+    test_datapoint_etag_follows_high_water_mark()
+    print("=" * 40)
+    print("Test completed!")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script for the composable indicator pipeline
+Lazy batch queries and streaming pushes are checked against full-series evaluation
+"""
+
+import numpy as np
+
+from indicators import SMA, Pipeline, RollingStd, Source, StreamingPipeline, sbtc_stages, trend_stages
+from profiles import BUILTIN_PROFILES, resolve_profile
+
+
+def make_prices(n=1000, seed=5):
+    rng = np.random.default_rng(seed)
+    return 30000.0 * np.exp(np.cumsum(rng.normal(0.001, 0.03, n)))
+
+
+def test_queries_compute_only_needed_positions():
+    prices = make_prices()
+    stages = trend_stages(20, 100)
+    pipeline = Pipeline(price=prices)
+    full = Pipeline(price=prices).series(stages['trend_ratio'])
+    assert abs(pipeline.at(stages['trend_ratio'], 500) - full[500]) < 1e-9 * full[500]
+    # The long moving average needed positions 500..500, its source 401..500
+    start, stop, _ = pipeline._cache[Source('price').key]
+    assert (start, stop) == (401, 501)
+    assert stages['volatility'].key not in pipeline._cache
+    print("✅ A query computes only the positions it depends on")
+
+
+def test_shared_intermediates_computed_once():
+    close = Source('price')
+    short = SMA(close, 20)
+    indicators = {
+        'trend_ratio': short / SMA(close, 100),
+        'spread': SMA(close, 20) / RollingStd(close, 20),  # Equal stages are shared, not recomputed
+    }
+    pipeline = Pipeline(price=make_prices())
+    pipeline.evaluate(indicators)
+    assert pipeline.computed == 5  # short SMA, long SMA, std and two ratios
+    pipeline.evaluate({'short': short})
+    assert pipeline.computed == 5
+    print("✅ Shared intermediates are computed once per pipeline")
+
+
+def test_partial_range_matches_full_series():
+    prices = make_prices(1100)
+    params = resolve_profile(BUILTIN_PROFILES['adjusted'], len(prices))
+    stages = sbtc_stages(**params)
+    full = Pipeline(price=prices).evaluate(stages)
+    part = Pipeline(price=prices).evaluate(stages, 700, 800)
+    np.testing.assert_allclose(part['plr'], full['plr'][700:800], rtol=1e-9)
+    np.testing.assert_allclose(part['final_plr'], full['final_plr'][700:800], rtol=1e-12)
+    print("✅ Partial ranges match the full evaluation")
+
+
+def test_streaming_matches_batch():
+    prices = make_prices(600)
+    stages = {**trend_stages(20, 100), **sbtc_stages(**resolve_profile(BUILTIN_PROFILES['adjusted'], 600))}
+    batch = Pipeline(price=prices).evaluate(stages)
+    stream = StreamingPipeline(stages)
+    rows = [stream.push(price=price) for price in prices]
+    for name in stages:
+        np.testing.assert_allclose([row[name] for row in rows], batch[name], rtol=1e-7, equal_nan=True)
+    print("✅ Streaming pushes match batch evaluation")
+
+
+if __name__ == "__main__":
+    print("Indicator Pipeline Test Suite")
+    print("=" * 40)
+    test_queries_compute_only_needed_positions()
+    test_shared_intermediates_computed_once()
+    test_partial_range_matches_full_series()
+    test_streaming_matches_batch()
+    print("=" * 40)
+    print("Test completed!")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test script for the intraday provisional target
+Ticks come from the replay stub; results are checked against a full refit
+"""
+
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+import sbtc_api
+from intraday import IntradayFeed, IntradayTarget, ReplayStream, parse_hermes_message
+from powerlaw import regression_sums, ridge_fit
+
+TODAY = datetime(2025, 3, 1, tzinfo=timezone.utc).date()
+
+
+def hermes_message(price, publish_time, expo=-8):
+    return {'parsed': [{'id': 'e62df6c8', 'price': {'price': str(int(round(price * 10 ** -expo))), 'conf': '100',
+                                                    'expo': expo, 'publish_time': publish_time}}]}
+
+
+def closed_history(days=1000, seed=9, end=TODAY):
+    """Daily bars before `end`, recent first"""
+    rng = np.random.default_rng(seed)
+    prices = 30000.0 * np.exp(np.cumsum(rng.normal(0.001, 0.03, days)))[::-1]
+    dates = [end - timedelta(days=i + 1) for i in range(days)]
+    return pd.DataFrame({'price': prices}, index=pd.Index(dates, name='date'))
+
+
+def full_refit(closed, price, params):
+    """Latest-window fit recomputed from scratch with today's bar prepended"""
+    df = pd.DataFrame({'price': np.concatenate(([price], closed['price'].values))})
+    window = sbtc_api.latest_regression_window(df, **params)
+    sums = regression_sums(window.log_y, window.vol_w, window.xw, window.valid)
+    return float(ridge_fit(sums[:, None], window.lam, window.length)[0])
+
+
+def test_parse_hermes_message():
+    ticks = parse_hermes_message(hermes_message(97123.45, 1_740_787_200))
+    assert len(ticks) == 1 and abs(ticks[0].price - 97123.45) < 1e-6 and ticks[0].publish_time == 1_740_787_200
+    print("✅ Hermes price updates parse into ticks")
+
+
+def test_tick_matches_full_refit():
+    closed = closed_history()
+    params = sbtc_api.get_parameters(len(closed) + 1)
+    target = IntradayTarget()
+    target.rebase(closed, params, TODAY)
+    last_close = closed['price'].iloc[0]
+    for price in (last_close * 0.9, last_close, last_close * 1.07):
+        result = target.update(price, 1_740_787_200)
+        assert abs(result['fit'] / full_refit(closed, price, params) - 1) < 1e-6
+
+        returns = np.diff(np.log(np.concatenate(([price], closed['price'].values[:params['stdev_length']]))))
+        threshold = params['k'] * np.std(returns)
+        assert abs(result['threshold'] - threshold) < 1e-12
+        step = np.clip(np.log(result['fit'] / target.closed_fit), -threshold, threshold)
+        assert abs(result['provisional_target'] - target.closed_fit * np.exp(step)) < 1e-6
+    print("✅ Per-tick update matches a full refit of the latest window")
+
+
+def test_tick_latency():
+    closed = closed_history()
+    target = IntradayTarget()
+    target.rebase(closed, sbtc_api.get_parameters(len(closed) + 1), TODAY)
+    prices = closed['price'].iloc[0] * np.exp(np.random.default_rng(1).normal(0, 0.001, 500))
+    latencies = [target.update(price, 1_740_787_200)['tick_to_target_us'] for price in prices]
+    median = statistics.median(latencies)
+    assert median < 1000, f"median tick-to-target {median} us"
+    print(f"✅ Median tick-to-target latency {median:.0f} us")
+
+
+def test_replay_feed_rolls_over_days():
+    start = int(datetime(2025, 3, 1, 23, 59, 58, tzinfo=timezone.utc).timestamp())
+    messages = [hermes_message(60000.0 + i, start + i) for i in range(4)]
+    bases = []
+
+    def load_base(day):
+        bases.append(day)
+        closed = closed_history(end=day)
+        return closed, sbtc_api.get_parameters(len(closed) + 1)
+
+    feed = IntradayFeed(ReplayStream(messages), load_base)
+    feed.run()
+    assert feed.ticks == 4 and feed.errors == 0
+    assert bases == [TODAY, TODAY + timedelta(days=1)]
+    assert feed.latest['bar_date'] == (TODAY + timedelta(days=1)).isoformat()
+    assert feed.latest['stale'] and feed.latest['btc_price'] == 60003.0
+    print("✅ Replay feed rebases at the UTC day boundary")
+
+
+def test_provisional_endpoint():
+    client = sbtc_api.app.test_client()
+    assert client.get('/sbtc/provisional').status_code == 503
+
+    now = int(time.time())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'hermes.jsonl')
+        with open(path, 'w') as f:
+            for i in range(3):
+                f.write(json.dumps(hermes_message(60000.0 + i, now - 2 + i)) + '\n')
+        sbtc_api.INTRADAY_STREAM = f"replay:{path}"
+        original_base = sbtc_api.intraday_base
+        sbtc_api.intraday_base = lambda day: (closed_history(end=day), sbtc_api.get_parameters(1001))
+        try:
+            sbtc_api.get_intraday_feed()
+            deadline = time.time() + 10
+            while sbtc_api.intraday_feed.ticks < 3:
+                assert time.time() < deadline
+                time.sleep(0.05)
+            data = client.get('/sbtc/provisional').get_json()['data']
+        finally:
+            sbtc_api.intraday_feed.stop(timeout=5)
+            sbtc_api.INTRADAY_STREAM = 'off'
+            sbtc_api.intraday_feed = sbtc_api.intraday_feed_pid = None
+            sbtc_api.intraday_base = original_base
+    assert data['btc_price'] == 60002.0 and not data['stale'] and data['provisional_target'] > 0
+    print("✅ /sbtc/provisional serves the latest provisional target")
+
+
+if __name__ == "__main__":
+    print("Intraday Target Test Suite")
+    print("=" * 40)
+    test_parse_hermes_message()
+    test_tick_matches_full_refit()
+    test_tick_latency()
+    test_replay_feed_rolls_over_days()
+    test_provisional_endpoint()
+    print("=" * 40)
+    print("Test completed!")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script for the load generator
+Runs a short load against an in-process server backed by a stub price source
+"""
+
+import asyncio
+import threading
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+import sbtc_api
+from load_test import generate_load, parse_mix, percentile, render_html, run
+from price_sources import HistoryCache, PriceAggregator, PriceSource
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class SimulatedSource(PriceSource):
+    name = 'simulated'
+
+    def fetch(self, days):
+        return sbtc_api.get_simulated_btc_data(days)[['timestamp', 'price']]
+
+
+def test_percentile_and_mix():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50 and percentile(values, 99) == 99 and percentile([], 50) is None
+    assert parse_mix('current=3,last') == {'current': 3.0, 'last': 1.0}
+    try:
+        parse_mix('nope=1')
+        assert False, "unknown endpoints should be rejected"
+    except ValueError:
+        pass
+    print("✅ Percentiles are nearest-rank and mixes are validated")
+
+
+def test_report_against_local_server():
+    sbtc_api.history_cache = HistoryCache(PriceAggregator([SimulatedSource()]))
+    sbtc_api.state.result.clear()
+    rate_limits, sbtc_api.RATE_LIMITS = sbtc_api.RATE_LIMITS, {}
+    server = make_server('127.0.0.1', 0, sbtc_api.app, threaded=True, request_handler=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}"
+        mix = parse_mix('current=1,store=1,last=1,batch=1')
+        report = run(url, mix, duration=1.0, concurrency=4, warmup=0.2)
+        samples, _ = asyncio.run(generate_load(url, {'current': 1}, 0.2, 1))
+    finally:
+        server.shutdown()
+        sbtc_api.RATE_LIMITS = rate_limits
+        sbtc_api.state.result.clear()
+        sbtc_api.history_cache = None
+
+    overall = report['results']['overall']
+    assert overall['requests'] > 0 and overall['error_rate'] == 0, overall['errors']
+    assert overall['p50_ms'] <= overall['p95_ms'] <= overall['p99_ms'] <= overall['max_ms']
+    assert set(report['results']['endpoints']) == {'current', 'store', 'last', 'batch'}
+    assert all(status == 200 for _, _, status, _ in samples)
+    assert '<table>' in render_html(report)
+    print(f"✅ Load report: {overall['throughput_rps']} req/s, p99 {overall['p99_ms']} ms")
+
+
+if __name__ == "__main__":
+    print("Load Generator Test Suite")
+    print("=" * 40)
+    test_percentile_and_mix()
+    test_report_against_local_server()
+    print("=" * 40)
+    print("Test completed!")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script for the oracle update submission pipeline
+Publishes batched update_trend + store_datapoint transactions to the mock RPC server
+"""
+
+import asyncio
+import struct
+
+from mock_solana_rpc import MockSolanaRpcServer
+from oracle_publisher import OracleUpdatePipeline
+from solana_datapoint_client import SolanaDatapointClient
+from solana_rpc import (
+    COMPUTE_BUDGET_PROGRAM_ID, PROGRAM_ID, Keypair, SolanaRpcClient, SolanaRpcError,
+)
+
+
+def make_pipeline(mock, authority, **kwargs):
+    kwargs.setdefault('poll_interval', 0.05)
+    return OracleUpdatePipeline(SolanaRpcClient(mock.url), authority, **kwargs)
+
+
+def test_concurrent_batched_updates():
+    """Many updates in flight at once, each as a single packed transaction"""
+    with MockSolanaRpcServer() as mock:
+        authority = Keypair.generate()
+        client = SolanaDatapointClient(rpc_url=mock.url, keypair=authority)
+        client.initialize_history()
+        mock.prioritization_fees = [0, 100, 200, 300, 400]
+        blockhash_calls = mock.call_counts['getLatestBlockhash']
+
+        async def run():
+            async with make_pipeline(mock, authority) as pipeline:
+                return await asyncio.gather(*[
+                    pipeline.publish(47000.0 + i, 46500.0, 1000) for i in range(20)
+                ])
+
+        results = asyncio.run(run())
+        assert all(result['attempts'] == 1 for result in results)
+        assert mock.call_counts['getLatestBlockhash'] == blockhash_calls + 1
+
+        tx = mock.transactions[-1]
+        programs = [ix['program_id'] for ix in tx['instructions']]
+        assert programs == [COMPUTE_BUDGET_PROGRAM_ID, COMPUTE_BUDGET_PROGRAM_ID, PROGRAM_ID, PROGRAM_ID]
+        assert tx['instructions'][1]['data'] == bytes([3]) + struct.pack("<Q", 300)  # p75 of recent fees
+
+        history = client.get_datapoint_batch(0, 2_000_000_000)['data']
+        assert len(history) == 20
+        assert client.get_oracle_state()['status'] == 'success'
+        latency = sorted(result['latency_ms'] for result in results)[len(results) // 2]
+        print(f"✅ 20 concurrent updates, median latency {latency:.0f} ms, "
+              f"{mock.call_counts['getSignatureStatuses']} status polls")
+
+
+def test_expired_blockhash_is_retried():
+    """A dropped transaction is re-signed with a fresh blockhash once it expires"""
+    with MockSolanaRpcServer() as mock:
+        authority = Keypair.generate()
+        SolanaDatapointClient(rpc_url=mock.url, keypair=authority).initialize_history()
+        mock.drop_transactions = 1
+
+        async def run():
+            async with make_pipeline(mock, authority, rebroadcast_interval=10.0) as pipeline:
+                task = asyncio.create_task(pipeline.publish(47000.0, 46500.0, 1000))
+                await asyncio.sleep(0.2)
+                mock.advance(200)  # Past lastValidBlockHeight of the first blockhash
+                return await task
+
+        result = asyncio.run(run())
+        assert result['attempts'] == 2
+        print("✅ Expired blockhash re-signed and confirmed")
+
+
+def test_program_error_is_not_retried():
+    """Preflight failures surface immediately instead of burning retries"""
+    with MockSolanaRpcServer() as mock:
+        authority = Keypair.generate()
+
+        async def run():
+            async with make_pipeline(mock, authority) as pipeline:
+                await pipeline.publish(47000.0, 46500.0, 1000)
+
+        try:
+            asyncio.run(run())
+            assert False, "store_datapoint without a history account must fail"
+        except SolanaRpcError:
+            pass
+        assert mock.call_counts['sendTransaction'] == 1
+        print("✅ Program errors are not retried")
+
+
+def test_max_retries_must_allow_an_attempt():
+    for max_retries in (0, -1):
+        try:
+            OracleUpdatePipeline(SolanaRpcClient('http://localhost:1'), Keypair.generate(), max_retries=max_retries)
+            assert False, "a pipeline without attempts should be rejected"
+        except ValueError:
+            pass
+    print("✅ max_retries below one attempt is rejected")
+
+
+if __name__ == "__main__":
+    print("Oracle Publisher Test Suite")
+    print("=" * 40)
+    test_concurrent_batched_updates()
+    test_expired_blockhash_is_retried()
+    test_program_error_is_not_retried()
+    test_max_retries_must_allow_an_attempt()
+    print("=" * 40)
+    print("Test completed!")
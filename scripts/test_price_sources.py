@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Test script for multi-source price aggregation
+Uses in-process sources so no network access is needed
+"""
+
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import sbtc_api
+from price_sources import (
+    CircuitBreaker, CsvSource, HistoryCache, PriceAggregator, PriceSource, PriceSourceError, align_daily,
+    build_sources, consensus, daily_frame,
+)
+
+DAY_MS = 86_400_000
+
+
+class StaticSource(PriceSource):
+    """Fixed prices (oldest first), optionally slow or failing"""
+
+    def __init__(self, name, prices, delay=0.0, fail=False, timeout=1.0):
+        super().__init__(timeout)
+        self.name = name
+        self.prices = prices
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def fetch(self, days):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise PriceSourceError("upstream down")
+        start = int(datetime(2024, 1, 1).timestamp() * 1000)
+        return daily_frame([start + i * DAY_MS for i in range(len(self.prices))], self.prices)
+
+
+def test_consensus_rejects_outliers():
+    wide = pd.DataFrame({
+        'a': [100.0, 200.0, 300.0],
+        'b': [101.0, 200.0, np.nan],
+        'c': [99.0, 200.0, 303.0],
+        'd': [150.0, 200.0, np.nan],  # 50% off on day one
+    })
+    result = consensus(wide)
+    assert result['price'].tolist() == [100.0, 200.0, 301.5]
+    assert result['sources_used'].tolist() == [3, 4, 2]
+    print("✅ MAD outlier rejection")
+
+
+def test_two_sources_cannot_outvote():
+    # Recent first: a healthy feed 'a' and a feed 'b' that goes bad on the two latest days
+    wide = pd.DataFrame({
+        'a': [106.0, 104.0, 102.0, 100.0, 98.0],
+        'b': [53.0, 104.5, 130.0, 100.5, 98.0],
+    })
+    result = consensus(wide)
+    assert result['price'].tolist() == [106.0, 104.25, 102.0, 100.25, 98.0]
+    assert result['sources_used'].tolist() == [1, 2, 1, 2, 2]
+
+    # Disputed with no earlier consensus: the day is dropped
+    result = consensus(pd.DataFrame({'a': [100.0, 100.0], 'b': [100.0, 150.0]}))
+    assert result['price'].tolist()[0] == 100.0 and np.isnan(result['price'].iloc[1])
+    print("✅ Two disagreeing sources fall back to the one closer to the last consensus")
+
+
+def test_parallel_fetch_with_timeouts():
+    prices = [40000.0 + i for i in range(10)]
+    aggregator = PriceAggregator([
+        StaticSource('fast', prices, delay=0.1),
+        StaticSource('also-fast', [p * 1.001 for p in prices], delay=0.1),
+        StaticSource('hung', prices, delay=5.0, timeout=0.3),
+        StaticSource('down', prices, fail=True),
+    ])
+    started = time.perf_counter()
+    df = aggregator.fetch(days=10)
+    elapsed = time.perf_counter() - started
+    assert elapsed < 1.5, f"fetch took {elapsed:.2f}s"
+    assert len(df) == 10 and df.index[0] > df.index[-1]  # Recent first
+    assert (df['sources_used'] == 2).all()
+    assert aggregator.source_status['hung']['status'] == 'timeout'
+    assert aggregator.source_status['down']['status'] == 'error'
+    assert aggregator.source_status['fast']['status'] == 'ok'
+
+    try:
+        PriceAggregator([StaticSource('down', prices, fail=True)]).fetch(days=10)
+        assert False, "no available source must raise"
+    except PriceSourceError:
+        pass
+    print(f"✅ Concurrent fetch bounded by per-source timeouts ({elapsed:.2f}s)")
+
+
+def test_hung_source_does_not_stall_next_fetch():
+    prices = [100.0 + i for i in range(10)]
+    hung = StaticSource('hung', prices, delay=3.0)
+    aggregator = PriceAggregator([hung, StaticSource('fast', prices, delay=0.05)], timeout=0.5)
+    assert hung.timeout == 0.5, "source timeouts are capped by the aggregate timeout"
+    for _ in range(2):
+        started = time.perf_counter()
+        df = aggregator.fetch(days=10)
+        elapsed = time.perf_counter() - started
+        assert elapsed < 1.0, f"fetch took {elapsed:.2f}s"
+        assert aggregator.source_status['fast']['status'] == 'ok'
+        assert aggregator.source_status['hung']['status'] == 'timeout'
+    assert (df['sources_used'] == 1).all()
+    print(f"✅ A hung source does not hold the workers of the next fetch ({elapsed:.2f}s)")
+
+
+def test_csv_source_and_alignment():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'btc.csv')
+        dates = [datetime(2024, 1, 1) + timedelta(days=i) for i in range(5)]
+        pd.DataFrame({'date': [d.strftime('%Y-%m-%d') for d in dates],
+                      'price': [100.0, 101.0, 102.0, 103.0, 104.0]}).to_csv(path, index=False)
+        (source,) = build_sources(f"csv:{path}")
+        assert isinstance(source, CsvSource)
+        csv_frame = source.fetch(days=3)
+        assert csv_frame['price'].tolist() == [104.0, 103.0, 102.0]
+
+    other = StaticSource('other', [100.5, 101.5]).fetch(days=2)
+    wide = align_daily({'csv': csv_frame, 'other': other})
+    assert len(wide) == 5 and wide['other'].isna().sum() == 3
+    print("✅ CSV source and daily alignment")
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    time.sleep(0.25)
+    assert breaker.state == 'half_open'
+    assert breaker.allow() and not breaker.allow()  # a single probe
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+    down = StaticSource('down', [1.0], fail=True)
+    aggregator = PriceAggregator([StaticSource('up', [1.0]), down], failure_threshold=2, reset_timeout=60)
+    for _ in range(4):
+        aggregator.fetch(days=1)
+    assert down.calls == 2
+    assert aggregator.source_status['down'] == {'status': 'circuit_open', 'circuit': 'open'}
+    print("✅ Circuit breaker opens, probes and closes")
+
+
+def test_stale_while_revalidate():
+    source = StaticSource('only', [100.0, 101.0])
+    cache = HistoryCache(PriceAggregator([source]), max_age=60)
+    first = cache.get(2)
+    assert source.calls == 1
+
+    # Upstream goes down: stale history is served at once, the refresh runs in the background
+    source.fail, source.delay = True, 0.3
+    started = time.perf_counter()
+    stale = cache.get(2, fresh_after=time.time())
+    assert time.perf_counter() - started < 0.1
+    assert stale is first
+    time.sleep(0.5)
+    assert source.calls == 2
+    assert cache.get(2) is first
+    assert cache.source_status['only']['status'] == 'error'
+
+    # A cold cache with every source down fails instead of inventing data
+    try:
+        HistoryCache(PriceAggregator([StaticSource('down', [1.0], fail=True)])).get(2)
+        assert False, "a cold cache without sources must raise"
+    except PriceSourceError:
+        pass
+    print("✅ Stale history served while revalidating")
+
+
+def test_history_cache_is_bounded():
+    source = StaticSource('only', [100.0, 101.0])
+    cache = HistoryCache(PriceAggregator([source]), max_entries=2)
+    cache.get(2)
+    cache.get(3)
+    cache.get(2)  # 3 is now the least recently used
+    cache.get(4)
+    assert source.calls == 3
+    cache.get(2)
+    assert source.calls == 3
+    cache.get(3)
+    assert source.calls == 4
+    print("✅ History cache keeps only the most recently used lengths")
+
+
+def test_api_reports_freshness():
+    client = sbtc_api.app.test_client()
+    prices = [30000.0 * (1.001 ** i) for i in range(400)]
+    sbtc_api.history_cache = HistoryCache(PriceAggregator([StaticSource('fake', prices)]))
+    sbtc_api.state.history.clear()
+    sbtc_api.state.result.clear()
+    data = client.get('/sbtc/current').get_json()['data']
+    assert data['data_age'] >= 0
+    assert data['source_status']['fake']['status'] == 'ok'
+
+    sbtc_api.history_cache = HistoryCache(PriceAggregator([StaticSource('down', prices, fail=True)]))
+    sbtc_api.state.history.clear()
+    sbtc_api.state.result.clear()
+    response = client.get('/sbtc/current')
+    assert response.status_code == 503
+    assert response.get_json()['source_status']['down']['status'] == 'error'
+    sbtc_api.history_cache = None
+    print("✅ API surfaces data_age and source_status, 503 without data")
+
+
+if __name__ == "__main__":
+    print("Price Sources Test Suite")
+    print("=" * 40)
+    test_consensus_rejects_outliers()
+    test_two_sources_cannot_outvote()
+    test_parallel_fetch_with_timeouts()
+    test_hung_source_does_not_stall_next_fetch()
+    test_csv_source_and_alignment()
+    test_circuit_breaker()
+    test_stale_while_revalidate()
+    test_history_cache_is_bounded()
+    test_api_reports_freshness()
+    print("=" * 40)
+    print("Test completed!")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for regression-parameter profiles and cached weight tables
+"""
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+import sbtc_api
+from powerlaw import weight_table
+from price_sources import HistoryCache, PriceAggregator, PriceSource
+from profiles import ProfileError, load_profiles, resolve_profile
+
+
+class SimulatedSource(PriceSource):
+    name = 'simulated'
+
+    def fetch(self, days):
+        return sbtc_api.get_simulated_btc_data(days)[['timestamp', 'price']]
+
+
+def test_adjusted_profile_matches_previous_parameters():
+    for n in (150, 500, 1000, 3000):
+        assert sbtc_api.get_adjusted_parameters(n) == {
+            'length': min(300, n - 50), 'lambda_': 10, 'time_weight_power': 1.2, 'vol_weight_power': 1.2,
+            'vol_length': 10, 'input_smooth_length': min(50, n // 10), 'output_smooth_length': min(200, n // 5),
+            'k': 0.05, 'stdev_length': min(200, n // 5),
+        }
+    assert resolve_profile(load_profiles()['default'], 5000)['length'] == 1000
+    print("✅ 'adjusted' reproduces the previous parameters, 'default' the documented ones")
+
+
+def test_profiles_from_config():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'profiles.json')
+        with open(path, 'w') as f:
+            json.dump({'fast': {'extends': 'adjusted', 'length': 200}, 'default': {'k': 0.2}}, f)
+        profiles = load_profiles(path)
+        assert profiles['fast']['length'] == 200 and profiles['fast']['lambda_'] == 10
+        assert profiles['default']['k'] == 0.2 and profiles['default']['length'] == 1000
+
+        with open(path, 'w') as f:
+            json.dump({'typo': {'lenght': 200}}, f)
+        try:
+            load_profiles(path)
+            assert False, "unknown parameters should be rejected"
+        except ProfileError:
+            pass
+    print("✅ Profiles load from JSON config with extends")
+
+
+def test_weight_table_is_cached():
+    table = weight_table(300, 1.2)
+    assert weight_table(300, 1.2) is table and not table.flags.writeable
+    x = np.arange(300, 0, -1.0)
+    np.testing.assert_allclose(table[:, 0], x ** 1.2)
+    np.testing.assert_allclose(table[:, 2], x ** 1.2 * np.log(x) ** 2)
+    print("✅ Weight tables are computed once per (length, time power)")
+
+
+def test_profile_selected_per_request():
+    sbtc_api.history_cache = HistoryCache(PriceAggregator([SimulatedSource()]))
+    sbtc_api.state.history.clear()
+    sbtc_api.state.result.clear()
+    client = sbtc_api.app.test_client()
+
+    adjusted = client.get('/sbtc/current')
+    documented = client.get('/sbtc/current?profile=default')
+    assert adjusted.get_json()['data']['profile'] == 'adjusted'
+    assert documented.get_json()['data']['profile'] == 'default'
+    assert adjusted.headers['ETag'] != documented.headers['ETag']
+    assert client.get('/sbtc/current?profile=nope').status_code == 400
+    assert client.get('/sbtc/series?profile=default').get_json()['data']['profile'] == 'default'
+    assert set(client.get('/profiles').get_json()['data']['profiles']) >= {'default', 'adjusted'}
+
+    sbtc_api.state.result.clear()
+    sbtc_api.history_cache = None
+    print("✅ ?profile= selects the parameter profile")
+
+
+def test_profiles_share_the_result_cache():
+    sbtc_api.history_cache = HistoryCache(PriceAggregator([SimulatedSource()]))
+    sbtc_api.state.history.clear()
+    sbtc_api.state.result.clear()
+    sbtc_api.state.rate_limits.clear()
+    client = sbtc_api.app.test_client()
+    calls = []
+    original = sbtc_api.compute_sbtc
+
+    def compute_sbtc(*args, **kwargs):
+        calls.append(kwargs.get('length'))
+        return original(*args, **kwargs)
+
+    sbtc_api.compute_sbtc = compute_sbtc
+    try:
+        # Alternating profiles must not evict each other's cached target
+        for _ in range(3):
+            for query in ('', '?profile=default'):
+                assert client.get(f"/sbtc/current{query}").status_code == 200
+    finally:
+        sbtc_api.compute_sbtc = original
+        sbtc_api.state.result.clear()
+        sbtc_api.history_cache = None
+    assert len(calls) == 2, f"computed {len(calls)} times"
+    print("✅ Alternating profiles are each computed once")
+
+
+if __name__ == "__main__":
+    print("Parameter Profiles Test Suite")
+    print("=" * 40)
+    test_adjusted_profile_matches_previous_parameters()
+    test_profiles_from_config()
+    test_weight_table_is_cached()
+    test_profile_selected_per_request()
+    test_profiles_share_the_result_cache()
+    print("=" * 40)
+    print("Test completed!")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test script for on-demand request profiling
+Only admin keys (or the sampler) trigger profiles; the profile directory stays bounded
+"""
+
+import os
+import pstats
+import tempfile
+import time
+
+import sbtc_api
+from price_sources import HistoryCache, PriceAggregator, PriceSource
+from profiling import ProfileStore, RequestProfiler, load_profiling_config
+
+
+class SimulatedSource(PriceSource):
+    name = 'simulated'
+
+    def fetch(self, days):
+        return sbtc_api.get_simulated_btc_data(days)[['timestamp', 'price']]
+
+
+class profiling_enabled:
+    """Admin key 'admin' and a temporary profile directory for sbtc_api"""
+
+    def __init__(self, sample_rate=0.0):
+        self.sample_rate = sample_rate
+
+    def __enter__(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.original = sbtc_api.PROFILING, sbtc_api.profile_store
+        sbtc_api.PROFILING = load_profiling_config({'SBTC_ADMIN_KEYS': 'admin', 'SBTC_PROFILING_DIR': self.tmp.name,
+                                                    'SBTC_PROFILING_SAMPLE_RATE': str(self.sample_rate)})
+        sbtc_api.profile_store = ProfileStore(self.tmp.name)
+        sbtc_api.history_cache = HistoryCache(PriceAggregator([SimulatedSource()]))
+        sbtc_api.state.result.clear()
+        sbtc_api.state.rate_limits.clear()
+        return sbtc_api.app.test_client()
+
+    def __exit__(self, *exc):
+        sbtc_api.PROFILING, sbtc_api.profile_store = self.original
+        sbtc_api.state.result.clear()
+        sbtc_api.history_cache = None
+        self.tmp.cleanup()
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+def test_profilers_capture_the_request_thread():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ProfileStore(tmp)
+        deterministic = RequestProfiler('cprofile').start()
+        busy(0.05)
+        name = store.save(deterministic.stop(), '/sbtc/current')
+        stats = pstats.Stats(store.path(name))
+        assert any(function == 'busy' for _, _, function in stats.stats)
+
+        sampled = RequestProfiler('sample').start()
+        busy(0.1)
+        name = store.save(sampled.stop(), '/sbtc/current')
+        with open(store.path(name)) as f:
+            lines = f.read().splitlines()
+        assert lines and any('busy (test_profiling.py' in line for line in lines)
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+        assert [p['kind'] for p in store.list()] == ['sample', 'cprofile']
+    print("✅ cProfile and stack-sampling profiles capture the profiled thread")
+
+
+def test_store_rotates():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ProfileStore(tmp, max_files=3)
+        names = []
+        for _ in range(5):
+            names.append(store.save(RequestProfiler('cprofile').start().stop(), '/sbtc/series'))
+            time.sleep(0.01)
+        assert [p['name'] for p in store.list()] == names[:1:-1]
+        assert store.path(names[0]) is None and store.path('../../etc/passwd') is None
+        tiny = ProfileStore(tmp, max_bytes=1)
+        tiny.rotate()
+        assert tiny.list() == []
+    print("✅ The profile directory keeps only the newest profiles")
+
+
+def test_admin_keys_trigger_profiles():
+    with profiling_enabled() as client:
+        assert client.get('/sbtc/current', headers={'X-Profile': 'cprofile'}).status_code == 403
+        assert client.get('/sbtc/current?profiling=cprofile', headers={'X-API-Key': 'nope'}).status_code == 403
+        assert client.get('/sbtc/current', headers={'X-API-Key': 'admin', 'X-Profile': 'flame'}).status_code == 400
+        plain = client.get('/sbtc/current')
+        assert plain.status_code == 200 and 'X-Profile-Id' not in plain.headers
+
+        admin = {'X-API-Key': 'admin'}
+        sbtc_api.state.result.clear()
+        profiled = client.get('/sbtc/current?profiling=cprofile', headers=admin)
+        assert profiled.status_code == 200
+        name = profiled.headers['X-Profile-Id']
+        stats = pstats.Stats(os.path.join(sbtc_api.PROFILING.directory, name))
+        assert any(function == 'compute_sbtc_series' for _, _, function in stats.stats)
+
+        assert client.get('/debug/profiles').status_code == 403
+        listing = client.get('/debug/profiles', headers=admin).get_json()['data']['profiles']
+        assert [p['name'] for p in listing] == [name] and listing[0]['route'] == 'sbtc-current'
+        download = client.get(f"/debug/profiles/{name}", headers=admin)
+        assert download.status_code == 200 and 'attachment' in download.headers['Content-Disposition']
+        assert client.get('/debug/profiles/missing.prof', headers=admin).status_code == 404
+    print("✅ Admin keys request profiles and download them")
+
+
+def test_sampled_requests_profiled():
+    with profiling_enabled(sample_rate=1.0) as client:
+        response = client.get('/sbtc/series?days=300')
+        assert response.headers['X-Profile-Id'].endswith('.folded')
+        assert 'X-Profile-Id' not in client.get('/profiles').headers  # Only fetch-and-compute routes
+    print("✅ Sampled requests are profiled statistically")
+
+
+if __name__ == "__main__":
+    print("Request Profiling Test Suite")
+    print("=" * 40)
+    test_profilers_capture_the_request_thread()
+    test_store_rotates()
+    test_admin_keys_trigger_profiles()
+    test_sampled_requests_profiled()
+    print("=" * 40)
+    print("Test completed!")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test script for per-client rate limiting
+Buckets live in shared memory, so a forked worker sees the same counts
+"""
+
+import json
+import os
+import tempfile
+from multiprocessing import get_context
+
+import sbtc_api
+from price_sources import HistoryCache, PriceAggregator, PriceSource
+from ratelimit import load_limits, load_quotas, load_trusted_proxies, parse_limit
+from shared_state import TokenBuckets
+
+
+class SimulatedSource(PriceSource):
+    name = 'simulated'
+
+    def fetch(self, days):
+        return sbtc_api.get_simulated_btc_data(days)[['timestamp', 'price']]
+
+
+def take_in_child(buckets, key, queue):
+    queue.put(buckets.take(key, 3, 0.001).allowed)
+
+
+def test_token_bucket_refills():
+    buckets = TokenBuckets(slots=64)
+    decisions = [buckets.take('a', 3, 1.0, now=100.0) for _ in range(4)]
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert decisions[2].remaining == 0 and abs(decisions[3].retry_after - 1.0) < 1e-9
+    assert buckets.take('b', 3, 1.0, now=100.0).allowed  # Separate bucket
+    assert not buckets.take('a', 3, 1.0, now=100.5).allowed
+    assert buckets.take('a', 3, 1.0, now=101.5).allowed
+    assert buckets.take('a', 3, 1.0, now=1000.0).remaining == 2  # Refill is capped at capacity
+    print("✅ Token buckets refill at their rate up to capacity")
+
+
+def test_buckets_shared_across_processes():
+    buckets = TokenBuckets(slots=64)
+    assert buckets.take('client', 3, 0.001).allowed and buckets.take('client', 3, 0.001).allowed
+    context = get_context('fork')
+    queue = context.Queue()
+    children = [context.Process(target=take_in_child, args=(buckets, 'client', queue)) for _ in range(2)]
+    for child in children:
+        child.start()
+    for child in children:
+        child.join(10)
+    assert sorted(queue.get(timeout=5) for _ in children) == [False, True]
+    print("✅ Forked workers draw from the same buckets")
+
+
+def test_eviction_when_full():
+    buckets = TokenBuckets(slots=4)
+    for i in range(20):
+        assert buckets.take(f"client-{i}", 1, 0.001, now=float(i)).allowed
+    assert not buckets.take('client-19', 1, 0.001, now=20.0).allowed  # Recent bucket kept
+    print("✅ A full table evicts the least recently updated bucket")
+
+
+def test_limits_config():
+    assert parse_limit('30/60') == (30, 60.0) and abs(parse_limit('30/60').rate - 0.5) < 1e-12
+    assert load_limits({'SBTC_RATE_LIMIT': 'off'}) == {}
+    assert load_limits({'SBTC_RATE_LIMIT_COMPUTE': '5/10'})['compute'].requests == 5
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'quotas.json')
+        with open(path, 'w') as f:
+            json.dump({'publisher': {'compute': '100/60'}}, f)
+        assert load_quotas(path)['publisher']['compute'] == (100, 60.0)
+    assert load_trusted_proxies({}) == 0 and load_trusted_proxies({'SBTC_TRUSTED_PROXIES': '2'}) == 2
+    try:
+        parse_limit('fast')
+        assert False, "invalid limits should be rejected"
+    except ValueError:
+        pass
+    print("✅ Limits and per-key quotas load from the environment and JSON")
+
+
+def test_endpoints_limited_per_client():
+    sbtc_api.history_cache = HistoryCache(PriceAggregator([SimulatedSource()]))
+    sbtc_api.state.result.clear()
+    sbtc_api.state.rate_limits.clear()
+    limits, quotas = sbtc_api.RATE_LIMITS, sbtc_api.API_QUOTAS
+    sbtc_api.RATE_LIMITS = {'compute': parse_limit('2/3600'), 'read': parse_limit('50/3600')}
+    sbtc_api.API_QUOTAS = {'publisher': {'compute': parse_limit('10/3600')}}
+    client = sbtc_api.app.test_client()
+    try:
+        first = client.get('/sbtc/current')
+        assert first.status_code == 200 and first.headers['RateLimit-Limit'] == '2'
+        assert first.headers['RateLimit-Remaining'] == '1' and first.headers['RateLimit-Policy'] == '2;w=3600'
+        # Cached results only cost a read token
+        cached = client.get('/sbtc/current')
+        assert cached.status_code == 200 and cached.headers['RateLimit-Limit'] == '50'
+
+        assert client.get('/sbtc/series?days=300').status_code == 200
+        refused = client.get('/sbtc/series?days=300')
+        assert refused.status_code == 429 and int(refused.headers['Retry-After']) > 0
+        assert refused.get_json()['success'] is False
+        # Cheap endpoints have their own budget; a quota key has its own buckets
+        assert client.get('/profiles').status_code == 200
+        assert client.get('/sbtc/series?days=300', headers={'X-API-Key': 'publisher'}).status_code == 200
+        assert client.get('/sbtc/series?days=300', headers={'X-API-Key': 'made-up'}).status_code == 429
+        assert 'RateLimit-Limit' not in client.get('/health').headers
+    finally:
+        sbtc_api.RATE_LIMITS, sbtc_api.API_QUOTAS = limits, quotas
+        sbtc_api.state.rate_limits.clear()
+        sbtc_api.state.result.clear()
+        sbtc_api.history_cache = None
+    print("✅ Compute-heavy requests are limited per client with RateLimit headers")
+
+
+def test_clients_behind_trusted_proxy():
+    sbtc_api.state.rate_limits.clear()
+    limits = sbtc_api.RATE_LIMITS
+    sbtc_api.RATE_LIMITS = {'read': parse_limit('1/3600')}
+    client = sbtc_api.app.test_client()
+
+    def status(forwarded_for):
+        return client.get('/profiles', headers={'X-Forwarded-For': forwarded_for}).status_code
+
+    try:
+        # Untrusted: X-Forwarded-For is ignored, every client shares the proxy's bucket
+        assert status('203.0.113.1') == 200 and status('203.0.113.2') == 429
+        sbtc_api.trust_proxies(1)
+        sbtc_api.state.rate_limits.clear()
+        assert status('203.0.113.1') == 200 and status('203.0.113.2') == 200
+        assert status('203.0.113.1') == 429
+        # A client cannot pick its bucket by prepending addresses; only the proxy's entry counts
+        assert status('198.51.100.7, 203.0.113.2') == 429
+    finally:
+        sbtc_api.trust_proxies(0)
+        sbtc_api.RATE_LIMITS = limits
+        sbtc_api.state.rate_limits.clear()
+    print("✅ Clients behind a trusted proxy get their own buckets")
+
+
+if __name__ == "__main__":
+    print("Rate Limit Test Suite")
+    print("=" * 40)
+    test_token_bucket_refills()
+    test_buckets_shared_across_processes()
+    test_eviction_when_full()
+    test_limits_config()
+    test_endpoints_limited_per_client()
+    test_clients_behind_trusted_proxy()
+    print("=" * 40)
+    print("Test completed!")
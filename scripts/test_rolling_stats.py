@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for the rolling-statistics module
+Batch and streaming results are checked against pandas rolling()
+"""
+
+import numpy as np
+import pandas as pd
+
+import compute_sma
+from rolling_stats import RollingWindow, rolling_mean, rolling_std
+
+
+def make_series(n=2000, seed=7):
+    rng = np.random.default_rng(seed)
+    prices = 40000.0 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    log_return = np.diff(np.log(prices), prepend=np.nan)
+    with_gaps = prices.copy()
+    with_gaps[rng.choice(n, 50, replace=False)] = np.nan
+    return prices, log_return, with_gaps
+
+
+def test_batch_matches_pandas():
+    for x in make_series():
+        for window in (1, 10, 150, 1000):
+            expected_mean = pd.Series(x).rolling(window, min_periods=1).mean().values
+            np.testing.assert_allclose(rolling_mean(x, window), expected_mean, rtol=1e-9, equal_nan=True)
+            for ddof in (0, 1):
+                expected_std = pd.Series(x).rolling(window, min_periods=1).std(ddof=ddof).values
+                np.testing.assert_allclose(rolling_std(x, window, ddof=ddof), expected_std,
+                                           rtol=1e-7, atol=1e-12, equal_nan=True)
+    print("✅ Batch rolling mean/std match pandas")
+
+
+def test_streaming_matches_batch():
+    for x in make_series(n=5000):
+        for window in (20, 200):
+            stream = RollingWindow(window)
+            means, stds = [], []
+            for value in x:
+                stream.push(value)
+                means.append(stream.mean)
+                stds.append(stream.std)
+            np.testing.assert_allclose(means, rolling_mean(x, window), rtol=1e-9, equal_nan=True)
+            np.testing.assert_allclose(stds, rolling_std(x, window), rtol=1e-6, atol=1e-12, equal_nan=True)
+    print("✅ Streaming push() matches batch results")
+
+
+def test_large_offset_is_stable():
+    # Tiny variation on a huge level: naive sum-of-squares loses every digit
+    x = 1e9 + np.sin(np.arange(500))
+    expected = pd.Series(x).rolling(50, min_periods=1).std(ddof=0).values
+    np.testing.assert_allclose(rolling_std(x, 50), expected, rtol=1e-6, atol=1e-9)
+    stream = RollingWindow(50)
+    stream.extend(x)
+    assert abs(stream.std - expected[-1]) < 1e-6
+    print("✅ Numerically stable around large offsets")
+
+
+def test_constant_windows_are_exact():
+    # A flat stretch after volatile values has zero spread, not cancellation residue
+    rng = np.random.default_rng(3)
+    x = np.concatenate([rng.normal(0, 0.05, 40), np.full(30, 0.0123), [np.nan] * 25, [0.07]])
+    std = rolling_std(x, 20)
+    assert np.all(std[59:70] < 1e-15) and std[-1] == 0.0
+    assert np.isnan(rolling_std(x, 20, ddof=1)[-1])
+    print("✅ Constant windows have no cancellation residue")
+
+
+def test_flat_runs_match_pandas():
+    # Log returns with a crash and a flat stretch, as in the golden crash case:
+    # pandas reports exact zeros on the flat windows and so must rolling_std
+    rng = np.random.default_rng(13)
+    returns = 0.02 * rng.standard_t(3, 1000)
+    returns[400:460] -= 0.02
+    returns[800:900] = 0.0
+    log_return = np.diff(np.log(30000.0 * np.exp(np.cumsum(returns))), prepend=np.nan)
+    for window in (10, 30):
+        expected = pd.Series(log_return).rolling(window, min_periods=1).std(ddof=0).values
+        std = rolling_std(log_return, window)
+        np.testing.assert_allclose(std, expected, rtol=1e-9, atol=0, equal_nan=True)
+        assert np.array_equal(std == 0, expected == 0) and (expected == 0).sum() > 50
+    print("✅ Flat runs give the exact zeros pandas gives")
+
+
+def test_trend_indicator_unchanged():
+    prices, _, _ = make_series(n=365)
+    df = pd.DataFrame({'price': prices[::-1]})
+    close = df['price'].values
+    short_ma = pd.Series(close).rolling(20, min_periods=1).mean()
+    long_ma = pd.Series(close).rolling(100, min_periods=1).mean()
+    volatility = pd.Series(close).pct_change().dropna().rolling(20, min_periods=1).std()
+    ratio = (short_ma / long_ma).iloc[0]
+    expected = close[0] * ratio * (1 + volatility.iloc[0] if not pd.isna(volatility.iloc[0]) else 1)
+    assert abs(compute_sma.compute_trend_indicator(df) - expected) < 1e-6
+    print("✅ compute_trend_indicator unchanged")
+
+
+if __name__ == "__main__":
+    print("Rolling Statistics Test Suite")
+    print("=" * 40)
+    test_batch_matches_pandas()
+    test_streaming_matches_batch()
+    test_large_offset_is_stable()
+    test_constant_windows_are_exact()
+    test_flat_runs_match_pandas()
+    test_trend_indicator_unchanged()
+    print("=" * 40)
+    print("Test completed!")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline bulk SBTC CLI
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import sbtc_api
+import sbtc_batch
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DAY_MS = 86_400_000
+
+
+def make_history(days=400, seed=1, per_day=1):
+    """Oldest-first price rows with per_day observations per day"""
+    rng = np.random.default_rng(seed)
+    n = days * per_day
+    timestamps = 1_600_041_600_000 + np.arange(n) * (DAY_MS // per_day)
+    prices = 20000.0 * np.exp(np.cumsum(rng.normal(0.0005, 0.02 / np.sqrt(per_day), n)))
+    return pd.DataFrame({'timestamp': timestamps, 'price': prices})
+
+
+def expected_latest(history):
+    daily = sbtc_batch.to_daily(history.assign(asset='x')).set_index('date')[['price']].sort_index(ascending=False)
+    series = sbtc_api.compute_sbtc_series(daily, **sbtc_api.get_adjusted_parameters(len(daily)))
+    return series[0] if not np.isnan(series[0]) else sbtc_api.simplified_sbtc(daily['price'].values)
+
+
+def test_csv_chunks_match_whole_file():
+    history = make_history(per_day=24)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'btc.csv')
+        history.to_csv(path, index=False)
+        chunked = sbtc_batch.read_prices(path, chunk_rows=1000)['btc']
+        whole = sbtc_batch.read_prices(path)['btc']
+    assert len(chunked) == 400 and chunked.equals(whole)
+    assert chunked['price'].iloc[0] == history['price'].iloc[-1]
+    print("✅ Chunked CSV reads reduce to the same daily bars")
+
+
+def test_bulk_run_over_csv_and_parquet():
+    with tempfile.TemporaryDirectory() as tmp:
+        btc = make_history(seed=1)
+        btc.to_csv(os.path.join(tmp, 'btc.csv'), index=False)
+        multi = pd.concat([make_history(seed=2).assign(asset='eth'), make_history(seed=3).assign(asset='sol')])
+        multi.to_parquet(os.path.join(tmp, 'alts.parquet'))
+        with open(os.path.join(tmp, 'broken.csv'), 'w') as f:
+            f.write("price\nnot-a-number\n")
+
+        output = os.path.join(tmp, 'targets.parquet')
+        stats = sbtc_batch.run(sbtc_batch.find_inputs([tmp]), output, workers=2)
+        assert stats['files'] == 3 and stats['failed'] == 1 and stats['rows'] == 3
+        results = pd.read_parquet(output).set_index('asset')
+        assert list(results.index) == ['eth', 'sol', 'btc']
+        assert abs(results.loc['btc', 'sbtc_target'] - expected_latest(btc)) < 1e-6
+        assert abs(results.loc['sol', 'sbtc_target'] - expected_latest(multi[multi['asset'] == 'sol'])) < 1e-6
+
+        series_output = os.path.join(tmp, 'series.csv')
+        stats = sbtc_batch.run([os.path.join(tmp, 'btc.csv')], series_output, mode='series', workers=1)
+        series = pd.read_csv(series_output)
+        assert stats['rows'] == 400 and series['date'].is_monotonic_increasing
+    print(f"✅ Bulk run over CSV and Parquet: {stats['files_per_second']} files/s")
+
+
+def test_cli():
+    with tempfile.TemporaryDirectory() as tmp:
+        make_history().to_csv(os.path.join(tmp, 'btc.csv'), index=False)
+        output = os.path.join(tmp, 'out.csv')
+        result = subprocess.run([sys.executable, 'sbtc_batch.py', tmp, '--output', output, '--workers', '1'],
+                                cwd=SCRIPTS_DIR, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        assert 'files/s' in result.stdout
+        assert len(pd.read_csv(output)) == 1
+    print("✅ CLI writes results and reports files/s")
+
+
+if __name__ == "__main__":
+    print("SBTC Batch Test Suite")
+    print("=" * 40)
+    test_csv_chunks_match_whole_file()
+    test_bulk_run_over_csv_and_parquet()
+    test_cli()
+    print("=" * 40)
+    print("Test completed!")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script for SBTC input validation and the vectorized regression kernels
+Results are checked against the per-window loop they replace
+"""
+
+import numpy as np
+import pandas as pd
+
+import sbtc_api
+from golden import loop_series as reference_series
+from powerlaw import dampen, validate_prices
+from price_sources import HistoryCache, PriceAggregator, PriceSource
+
+
+class SimulatedSource(PriceSource):
+    name = 'simulated'
+
+    def fetch(self, days):
+        return sbtc_api.get_simulated_btc_data(days)[['timestamp', 'price']]
+
+
+def make_prices(n=1000, seed=3):
+    rng = np.random.default_rng(seed)
+    return 30000.0 * np.exp(np.cumsum(rng.normal(0.001, 0.03, n)))[::-1]
+
+
+def test_clean_input_matches_loop():
+    close = make_prices()
+    params = sbtc_api.get_adjusted_parameters(len(close))
+    skipped = {}
+    series = sbtc_api.compute_sbtc_series(pd.DataFrame({'price': close}), skipped=skipped, **params)
+    np.testing.assert_allclose(series, reference_series(close, **params), rtol=1e-7, equal_nan=True)
+    assert skipped == dict.fromkeys(sbtc_api.SKIP_COUNT_KEYS, 0)
+    print("✅ Clean input: fast kernel matches the per-window loop")
+
+
+def test_gaps_are_masked_and_counted():
+    close = make_prices()
+    close[[5, 400, 401, 950]] = np.nan
+    close[[20, 600]] = [0.0, -1.0]
+    params = sbtc_api.get_adjusted_parameters(len(close))
+    # A short input smoothing window lets gaps reach the regression
+    params['input_smooth_length'] = 1
+    skipped = {}
+    series = sbtc_api.compute_sbtc_series(pd.DataFrame({'price': close}), skipped=skipped, **params)
+    cleaned, valid = validate_prices(close)
+    assert valid.sum() == len(close) - 6
+    np.testing.assert_allclose(series, reference_series(cleaned, **params), rtol=1e-7, equal_nan=True)
+    assert skipped['invalid_prices'] == 6
+    assert skipped['masked_windows'] > 0 and skipped['regression_points'] >= skipped['masked_windows']
+    print(f"✅ Gaps are masked and counted: {skipped}")
+
+
+def test_dampening_holds_across_nan():
+    smoothed = np.array([np.nan, 100.0, 120.0, np.nan, 90.0, 101.0])
+    threshold = np.array([0.1, 0.1, 0.1, 0.1, np.nan, 0.1])
+    skipped = {'dampening_holds': 0}
+    final = dampen(smoothed, threshold, skipped)
+    step = 100.0 * np.exp(0.1)
+    np.testing.assert_allclose(final, [np.nan, 100.0, step, step, step, 101.0], equal_nan=True)
+    assert skipped['dampening_holds'] == 2
+    print("✅ Dampening holds its value across NaN inputs")
+
+
+def test_api_reports_skipped_points():
+    sbtc_api.history_cache = HistoryCache(PriceAggregator([SimulatedSource()]))
+    sbtc_api.state.history.clear()
+    sbtc_api.state.result.clear()
+    response = sbtc_api.app.test_client().get('/sbtc/current')
+    assert response.status_code == 200
+    assert set(response.get_json()['data']['skipped_points']) == set(sbtc_api.SKIP_COUNT_KEYS)
+    sbtc_api.state.result.clear()
+    sbtc_api.history_cache = None
+    print("✅ /sbtc/current reports skipped point counts")
+
+
+if __name__ == "__main__":
+    print("SBTC Validation Test Suite")
+    print("=" * 40)
+    test_clean_input_matches_loop()
+    test_gaps_are_masked_and_counted()
+    test_dampening_holds_across_nan()
+    test_api_reports_skipped_points()
+    print("=" * 40)
+    print("Test completed!")
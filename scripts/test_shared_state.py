@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test script for shared-memory API state
+Forks reader processes the way gunicorn does and checks that they see the
+writer's updates without torn reads
+"""
+
+import multiprocessing
+import time
+
+import numpy as np
+
+from shared_state import SharedState
+
+
+def read_history_generations(state, duration, results):
+    """Every read must see a single generation: all prices equal"""
+    torn, reads, seen = 0, 0, set()
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        generation = state.history.read(lambda days, fetched_at, status, ts, prices, used:
+                                        (prices.min(), prices.max(), status['generation']))
+        if generation is None:
+            continue
+        low, high, label = generation
+        torn += int(low != high or low != label)
+        reads += 1
+        seen.add(label)
+    results.put((torn, reads, len(seen)))
+
+
+def test_forked_readers_see_consistent_history():
+    state = SharedState({'history_capacity': 2048})
+    results = multiprocessing.get_context('fork').Queue()
+    readers = [multiprocessing.get_context('fork').Process(target=read_history_generations,
+                                                          args=(state, 1.0, results))
+               for _ in range(3)]
+    for reader in readers:
+        reader.start()
+
+    timestamps = np.arange(2048, dtype=np.int64)
+    deadline = time.time() + 1.0
+    generation = 0
+    while time.time() < deadline:
+        generation += 1
+        state.history.write(1000, timestamps, np.full(2048, float(generation)), np.ones(2048),
+                            time.time(), {'generation': generation})
+
+    for reader in readers:
+        reader.join(timeout=10)
+        torn, reads, generations = results.get(timeout=5)
+        assert torn == 0, f"{torn} torn reads"
+        assert reads > 0 and generations > 1
+    print(f"✅ {generation} writes, forked readers saw no torn history")
+
+
+def test_datapoints_and_result_are_shared():
+    state = SharedState({'datapoint_capacity': 4})
+    context = multiprocessing.get_context('fork')
+
+    def worker():
+        state.datapoints.append({'timestamp': 2000, 'sbtc_value': 2.0, 'btc_price': 3.0,
+                                 'data_points_used': 10, 'stored_at': '2025-01-01T00:00:00.123456'})
+        state.result.put('2025-01-01', {'sbtc_target_price': 46000.0})
+
+    process = context.Process(target=worker)
+    process.start()
+    process.join(timeout=10)
+
+    assert state.datapoints.last()['stored_at'] == '2025-01-01T00:00:00.123456'
+    assert state.result.get('2025-01-01') == {'sbtc_target_price': 46000.0}
+    assert state.result.get('2025-01-02') is None
+
+    # Ring buffer keeps the newest capacity datapoints; high_water counts all of them
+    for i in range(6):
+        state.datapoints.append({'timestamp': 1000 + i, 'sbtc_value': float(i), 'btc_price': 1.0,
+                                 'data_points_used': 1, 'stored_at': '2025-01-01T00:00:00'})
+    assert len(state.datapoints) == 4 and state.datapoints.high_water == 7
+    assert [dp['timestamp'] for dp in state.datapoints.between(0, 10_000)] == [1002, 1003, 1004, 1005]
+    print("✅ Datapoints and results written by a worker are visible to all")
+
+
+def test_results_are_kept_per_key():
+    result = SharedState({'result_slots': 4, 'result_capacity': 256}).result
+    for day in range(1, 5):
+        result.put(f"2025-01-0{day}", {'day': day})
+        time.sleep(0.001)
+    result.put('2025-01-02', {'day': 2, 'updated': True})  # same key: stored in place
+    assert [entry['key'] for entry in result.entries()] == ['2025-01-01', '2025-01-03', '2025-01-04', '2025-01-02']
+    result.put('2025-01-05', {'day': 5})  # full: replaces the one stored longest ago
+    assert result.get('2025-01-01') is None
+    assert result.get('2025-01-02') == {'day': 2, 'updated': True} and result.get('2025-01-05') == {'day': 5}
+    try:
+        result.put('big', {'blob': 'x' * 300})
+        assert False, "payloads larger than a slot should be rejected"
+    except ValueError:
+        pass
+    result.clear()
+    assert result.entries() == [] and result.get('2025-01-05') is None
+    print("✅ Results are cached per key, oldest replaced first")
+
+
+def test_long_source_errors_are_shortened():
+    state = SharedState({'history_capacity': 16})
+    status = {f"source-{i}": {'status': 'error', 'error': 'x' * 2000, 'circuit': 'open'} for i in range(8)}
+    state.history.write(1000, np.arange(16), np.ones(16), np.ones(16), time.time(), status)
+    read = state.history.read(lambda days, fetched_at, status, ts, prices, used: status)
+    assert set(read) == set(status)
+    assert all(info['status'] == 'error' and info['circuit'] == 'open' for info in read.values())
+    assert all(len(info.get('error', '')) < 2000 for info in read.values())
+
+    try:
+        state.history.write(1000, np.arange(16), np.ones(16), np.ones(16), time.time(),
+                            {f"source-{i}": {'status': 'ok'} for i in range(1000)})
+        assert False, "a status that cannot fit should be rejected"
+    except ValueError:
+        pass
+    print("✅ Long source errors are shortened so the status stays valid JSON")
+
+
+if __name__ == "__main__":
+    print("Shared State Test Suite")
+    print("=" * 40)
+    test_forked_readers_see_consistent_history()
+    test_datapoints_and_result_are_shared()
+    test_results_are_kept_per_key()
+    test_long_source_errors_are_shortened()
+    print("=" * 40)
+    print("Test completed!")
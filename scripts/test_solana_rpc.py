@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test script for the native Solana RPC client
+Runs SolanaDatapointClient against the local mock RPC server
+"""
+
+import os
+import tempfile
+import time
+
+import base58
+import pytest
+
+from datapoint_history import DatapointHistoryReader
+from mock_solana_rpc import MockSolanaRpcServer
+from solana_datapoint_client import SolanaDatapointClient
+from solana_rpc import (
+    DATAPOINT_ACCOUNT_SIZE, DATAPOINT_DISCRIMINATOR, DATAPOINT_LAYOUT, HISTORY_CAPACITY, Keypair, SolanaRpcClient,
+    SolanaRpcError, build_transaction, decode_datapoint, encode_store_datapoint, find_program_address,
+    get_history_address, get_oracle_state_address, is_on_curve, parse_transaction, store_datapoint_instruction,
+)
+
+
+def test_encoding():
+    """Borsh encoding, PDA derivation and transaction round trip"""
+    data = encode_store_datapoint(4700000, 4650000, 1000)
+    assert len(data) == 8 + 8 + 8 + 4
+
+    oracle_state, bump = find_program_address([b"oracle"])
+    assert oracle_state == get_oracle_state_address()
+    assert not is_on_curve(base58.b58decode(oracle_state))
+    assert 0 <= bump <= 255
+
+    payer = Keypair.generate()
+    ix = store_datapoint_instruction(1, 2, 3, payer.pubkey)
+    blockhash = base58.b58encode(bytes(32)).decode()
+    tx = parse_transaction(build_transaction([ix], payer, [], blockhash))
+    assert tx['num_required_signatures'] == 1
+    assert tx['account_keys'][0] == payer.pubkey
+    assert tx['instructions'][0]['data'] == ix.data
+    assert tx['instructions'][0]['accounts'] == [get_history_address(), payer.pubkey]
+    print("✅ Encoding round trip")
+
+
+def test_store_and_read_datapoints():
+    """Store datapoints and trend over RPC, then read them back decoded"""
+    with MockSolanaRpcServer() as mock:
+        client = SolanaDatapointClient(rpc_url=mock.url, keypair=Keypair.generate())
+        client.initialize_history()
+
+        mock.clock = 1759553600
+        client.store_datapoint(47000.0, 46500.0, 1000)
+        mock.clock = 1759553700
+        client.store_datapoint(47100.0, 46600.0, 1000)
+
+        last = client.get_last_datapoint()
+        assert last['status'] == 'success'
+        assert last['data']['timestamp'] == 1759553700
+        assert last['data']['sbtc_value'] == 4710000
+
+        batch = client.get_datapoint_batch(1759553600, 1759553650)
+        assert [dp['sbtc_value'] for dp in batch['data']] == [4700000]
+        assert mock.call_counts['getProgramAccounts'] == 0
+
+        client.update_trend(47000.0)
+        state = client.get_oracle_state()
+        assert state['data'] == {'trend_value': 4700000, 'last_update': 1759553700}
+        print("✅ Store/read datapoints via mock RPC")
+
+
+def test_rpc_latency():
+    """In-process RPC calls should cost well under a CLI process startup"""
+    with MockSolanaRpcServer() as mock:
+        rpc = SolanaRpcClient(mock.url)
+        address = Keypair.generate().pubkey
+        mock.set_account(address, bytes(DATAPOINT_ACCOUNT_SIZE))
+
+        start = time.perf_counter()
+        for _ in range(100):
+            rpc.get_account_info(address)
+        per_call_ms = (time.perf_counter() - start) * 1000 / 100
+        print(f"✅ getAccountInfo: {per_call_ms:.2f} ms/call over a pooled session")
+        assert per_call_ms < 20
+
+        try:
+            decode_datapoint(rpc.get_account_info(address)['data'])
+            assert False, "zeroed account must not decode as a Datapoint"
+        except ValueError:
+            pass
+
+
+def test_history_reader_batches():
+    """10k legacy datapoint accounts should cost ~100 getMultipleAccounts calls, then hit the cache"""
+    with MockSolanaRpcServer() as mock, tempfile.TemporaryDirectory() as tmp:
+        for i in range(10_000):
+            payload = DATAPOINT_LAYOUT.pack(1_700_000_000 + i * 60, 4_700_000 + i, 4_650_000, 1000)
+            mock.accounts[Keypair.generate().pubkey] = {
+                'data': DATAPOINT_DISCRIMINATOR + payload, 'owner': mock.program_id, 'lamports': 1,
+            }
+
+        cache_path = os.path.join(tmp, "history.npz")
+        start = time.perf_counter()
+        table = DatapointHistoryReader(SolanaRpcClient(mock.url), cache_path=cache_path).refresh()
+        elapsed = time.perf_counter() - start
+        assert len(table) == 10_000
+        assert table['timestamp'].is_monotonic_increasing
+        assert mock.call_counts['getMultipleAccounts'] == 100
+        assert mock.call_counts['getProgramAccounts'] == 1
+        print(f"✅ 10k datapoints in {elapsed:.2f}s using {sum(mock.call_counts.values())} RPC calls")
+
+        # A fresh reader loads the cache and only enumerates addresses
+        reader = DatapointHistoryReader(SolanaRpcClient(mock.url), cache_path=cache_path)
+        window = reader.read_range(1_700_000_000, 1_700_000_000 + 59 * 60, include_legacy=True)
+        assert len(window) == 60
+        assert mock.call_counts['getMultipleAccounts'] == 100
+        print(f"✅ Cached re-read fetched no accounts (cached at slot {reader.cached_slot})")
+
+
+def test_history_ring_buffer_wraps():
+    """The ring buffer keeps the newest HISTORY_CAPACITY datapoints in time order"""
+    with MockSolanaRpcServer() as mock:
+        client = SolanaDatapointClient(rpc_url=mock.url, keypair=Keypair.generate())
+        client.initialize_history()
+        for i in range(HISTORY_CAPACITY + 10):
+            mock.clock = 1_700_000_000 + i
+            client.store_datapoint(1.0 + i, 1.0, 1000)
+
+        calls_before = mock.call_counts['getAccountInfo']
+        history = client.get_datapoint_batch(0, 2_000_000_000)['data']
+        assert mock.call_counts['getAccountInfo'] == calls_before + 1
+        assert len(history) == HISTORY_CAPACITY
+        assert history[0]['timestamp'] == 1_700_000_010
+        assert history[-1]['timestamp'] == 1_700_000_000 + HISTORY_CAPACITY + 9
+        assert client.get_last_datapoint()['data']['sbtc_value'] == (HISTORY_CAPACITY + 10) * 100
+
+        intruder = SolanaDatapointClient(rpc_url=mock.url, keypair=Keypair.generate())
+        # Only the history authority may store datapoints
+        with pytest.raises(SolanaRpcError):
+            intruder.store_datapoint(1.0, 1.0, 1)
+        print("✅ Ring buffer wraps and rejects foreign authorities")
+
+
+if __name__ == "__main__":
+    print("Solana RPC Client Test Suite")
+    print("=" * 40)
+    test_encoding()
+    test_store_and_read_datapoints()
+    test_rpc_latency()
+    test_history_reader_batches()
+    test_history_ring_buffer_wraps()
+    print("=" * 40)
+    print("Test completed!")
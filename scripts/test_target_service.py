@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared target computation
+/sbtc/current and auto-computed datapoints must report the same target and
+compute it once per bar
+"""
+
+import sbtc_api
+from price_sources import HistoryCache, PriceAggregator, PriceSource
+
+
+class SimulatedSource(PriceSource):
+    name = 'simulated'
+
+    def fetch(self, days):
+        return sbtc_api.get_simulated_btc_data(days)[['timestamp', 'price']]
+
+
+class counting:
+    """Count calls to sbtc_api.compute_sbtc"""
+
+    def __enter__(self):
+        self.calls = 0
+        self.original = sbtc_api.compute_sbtc
+
+        def compute_sbtc(*args, **kwargs):
+            self.calls += 1
+            return self.original(*args, **kwargs)
+
+        sbtc_api.compute_sbtc = compute_sbtc
+        return self
+
+    def __exit__(self, *exc):
+        sbtc_api.compute_sbtc = self.original
+
+
+def setup():
+    sbtc_api.history_cache = HistoryCache(PriceAggregator([SimulatedSource()]))
+    sbtc_api.state.result.clear()
+    sbtc_api.state.datapoints.clear()
+    sbtc_api.state.rate_limits.clear()
+    return sbtc_api.app.test_client()
+
+
+def teardown():
+    sbtc_api.state.result.clear()
+    sbtc_api.state.datapoints.clear()
+    sbtc_api.history_cache = None
+
+
+def test_store_reuses_current_target():
+    client = setup()
+    try:
+        with counting() as compute:
+            current = client.get('/sbtc/current').get_json()['data']
+            stored = client.post('/datapoints/store', json={}).get_json()['data']
+        assert compute.calls == 1
+        datapoint = stored['datapoint']
+        assert datapoint['sbtc_value'] == current['sbtc_target_price']
+        assert datapoint['btc_price'] == current['current_btc_price']
+        assert datapoint['algorithm'] == current['algorithm'] and datapoint['profile'] == current['profile']
+        assert stored['parameters'] == current['parameters']
+        assert stored['computation_timestamp'] == current['computation_timestamp']
+        assert client.get('/datapoints/last').get_json()['data']['datapoint']['algorithm'] == current['algorithm']
+    finally:
+        teardown()
+    print("✅ Auto-computed datapoints reuse the /sbtc/current result")
+
+
+def test_store_computes_once_for_both_routes():
+    client = setup()
+    try:
+        with counting() as compute:
+            stored = client.post('/datapoints/store?profile=default', json={}).get_json()['data']
+            current = client.get('/sbtc/current?profile=default').get_json()['data']
+        assert compute.calls == 1
+        assert stored['datapoint']['sbtc_value'] == current['sbtc_target_price']
+        assert stored['datapoint']['profile'] == 'default' and current['parameters']['length'] == 950
+    finally:
+        teardown()
+    print("✅ A target computed for a datapoint is served by /sbtc/current")
+
+
+def test_custom_values_are_marked():
+    client = setup()
+    try:
+        stored = client.post('/datapoints/store', json={'sbtc_value': 50000.0, 'btc_price': 60000.0})
+        datapoint = stored.get_json()['data']['datapoint']
+        assert datapoint['algorithm'] == 'custom' and datapoint['profile'] is None
+        assert client.post('/datapoints/store?profile=nope', json={}).status_code == 400
+    finally:
+        teardown()
+    print("✅ Client-supplied values are recorded as custom")
+
+
+if __name__ == "__main__":
+    print("Target Service Test Suite")
+    print("=" * 40)
+    test_store_reuses_current_target()
+    test_store_computes_once_for_both_routes()
+    test_custom_values_are_marked()
+    print("=" * 40)
+    print("Test completed!")
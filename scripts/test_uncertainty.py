@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for bootstrap/jackknife uncertainty of the SBTC power-law fit
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+import sbtc_api
+from powerlaw import regression_source
+from price_sources import HistoryCache, PriceAggregator, PriceSource
+from uncertainty import UncertaintyEstimator, fit_samples
+
+
+class SimulatedSource(PriceSource):
+    name = 'simulated'
+
+    def fetch(self, days):
+        return sbtc_api.get_simulated_btc_data(days)[['timestamp', 'price']]
+
+
+def make_prices(n=1000, seed=5):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'price': 30000.0 * np.exp(np.cumsum(rng.normal(0.001, 0.03, n)))[::-1]})
+
+
+def make_window(n=1000):
+    return sbtc_api.latest_regression_window(make_prices(n), **sbtc_api.get_adjusted_parameters(n))
+
+
+def test_multi_sample_kernel_matches_single_fits():
+    df = make_prices()
+    params = sbtc_api.get_adjusted_parameters(len(df))
+    window = sbtc_api.latest_regression_window(df, **params)
+    _, vol, src = regression_source(df['price'].values, params['vol_length'], params['input_smooth_length'])
+    length = params['length']
+    for i, fit in enumerate(fit_samples(window, 'jackknife', 0, 5, seed=0)):
+        left_out = src[:length].copy()
+        left_out[i] = np.nan
+        expected = sbtc_api.weighted_ridge_powerlaw(left_out, vol[:length], length, 0, params['time_weight_power'],
+                                                    params['vol_weight_power'], params['lambda_'])
+        assert abs(fit / expected - 1) < 1e-6
+    print("✅ Multi-sample kernel matches per-sample refits")
+
+
+def test_pool_matches_inline_and_is_cached():
+    window = make_window()
+    inline = UncertaintyEstimator(resamples=300, workers=0).estimate('bar', window)
+    estimator = UncertaintyEstimator(resamples=300, workers=2, budget=30)
+    pooled = estimator.estimate('bar', window)
+    assert pooled['complete'] and pooled['samples'] == 300
+    assert pooled['percentiles'] == inline['percentiles']
+    p = pooled['percentiles']
+    assert p['p2.5'] <= p['p50'] <= p['p97.5']
+    started = time.perf_counter()
+    assert estimator.estimate('bar', window)['percentiles'] == p
+    assert time.perf_counter() - started < 0.1, "a second estimate for the same bar should be cached"
+    print(f"✅ Process pool matches inline resampling: {p}")
+
+
+def test_budget_returns_partial_then_completes():
+    window = make_window()
+    estimator = UncertaintyEstimator(resamples=400, workers=1, budget=30, chunk=50)
+    first = estimator.estimate('bar', window, budget=0)
+    assert first['samples'] < 400 and not first['complete']
+    deadline = time.time() + 30
+    while not estimator.estimate('bar', window, budget=1)['complete']:
+        assert time.time() < deadline
+    print(f"✅ Budget cut-off returned {first['samples']} samples; later requests complete the set")
+
+
+def test_api_uncertainty_mode():
+    sbtc_api.history_cache = HistoryCache(PriceAggregator([SimulatedSource()]))
+    sbtc_api.state.history.clear()
+    sbtc_api.state.result.clear()
+    client = sbtc_api.app.test_client()
+    plain = client.get('/sbtc/current').get_json()['data']
+    assert 'uncertainty' not in plain
+    data = client.get('/sbtc/current?uncertainty=jackknife').get_json()['data']
+    estimate = data['uncertainty']
+    assert estimate['method'] == 'jackknife' and estimate['complete']
+
+    # The band is the regression fit's: recompute it from the same history
+    df = sbtc_api.get_btc_history(days=sbtc_api.SBTC_HISTORY_DAYS)
+    window = sbtc_api.latest_regression_window(df, **data['parameters'])
+    expected = UncertaintyEstimator(workers=0).estimate('bar', window, 'jackknife')
+    assert abs(estimate['fit'] / expected['fit'] - 1) < 1e-9
+    for name, value in expected['percentiles'].items():
+        assert abs(estimate['fit_percentiles'][name] / value - 1) < 1e-9
+    # The simplified target does not come from the fit, so no band is put around it
+    assert data['algorithm'] == 'simplified' and 'target_percentiles' not in estimate
+
+    original = sbtc_api.compute_sbtc
+    sbtc_api.compute_sbtc = lambda df, skipped=None, **params: 50000.0
+    try:
+        sbtc_api.state.result.clear()
+        full = client.get('/sbtc/current?uncertainty=jackknife').get_json()['data']
+    finally:
+        sbtc_api.compute_sbtc = original
+    assert full['algorithm'] == 'full'
+    for name, value in expected['percentiles'].items():
+        scaled = 50000.0 * value / expected['fit']
+        assert abs(full['uncertainty']['target_percentiles'][name] / scaled - 1) < 1e-9
+
+    assert client.get('/sbtc/current?uncertainty=maybe').status_code == 400
+    sbtc_api.state.result.clear()
+    sbtc_api.history_cache = None
+    print("✅ /sbtc/current?uncertainty= returns the fit's confidence band")
+
+
+if __name__ == "__main__":
+    print("Uncertainty Test Suite")
+    print("=" * 40)
+    test_multi_sample_kernel_matches_single_fits()
+    test_pool_matches_inline_and_is_cached()
+    test_budget_returns_partial_then_completes()
+    test_api_uncertainty_mode()
+    print("=" * 40)
+    print("Test completed!")
@@ -0,0 +1,157 @@
+"""
+Confidence intervals for the SBTC power-law fit
+Refits the latest regression window on bootstrap resamples (or jackknife
+leave-one-out samples) with the vectorized multi-sample kernel from powerlaw,
+split into chunks that run on a process pool. Finished chunks are cached per
+daily bar, so a request that runs out of its latency budget returns the
+samples available so far and later requests pick up the rest
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait
+from statistics import NormalDist
+from typing import Dict, Optional
+
+from lazy_imports import lazy_import
+from powerlaw import regression_sums, ridge_fit
+
+np = lazy_import('numpy')
+
+UNCERTAINTY_METHODS = ('bootstrap', 'jackknife')
+PERCENTILES = (2.5, 50.0, 97.5)
+
+# One regression window: per-point inputs from powerlaw.regression_inputs, its weight_table and the fit parameters
+Window = namedtuple('Window', 'valid log_y vol_w xw lam length')
+
+
+def sample_weights(valid, method: str, start: int, stop: int, seed: int):
+    """Per-point weight multipliers for samples [start, stop): bootstrap counts or leave-one-out masks
+
+    Bootstrap draws are seeded by (seed, start) so a chunk is the same whichever
+    process computes it.
+    """
+    points = np.flatnonzero(valid)
+    weights = np.zeros((stop - start, len(valid)))
+    if len(points) == 0:
+        return weights
+    if method == 'jackknife':
+        weights[:, points] = 1.0
+        weights[np.arange(stop - start), points[start:stop]] = 0.0
+    else:
+        rng = np.random.default_rng([seed, start])
+        weights[:, points] = rng.multinomial(len(points), np.full(len(points), 1.0 / len(points)),
+                                             size=stop - start)
+    return weights
+
+
+def fit_samples(window: Window, method: str, start: int, stop: int, seed: int):
+    """Power-law fits of samples [start, stop) (runs in the pool workers)"""
+    weights = sample_weights(window.valid, method, start, stop, seed)
+    sums = regression_sums(window.log_y, window.vol_w, window.xw, weights)
+    return ridge_fit(sums, window.lam, window.length)
+
+
+def summarize(fits, method: str, fit: float) -> Dict[str, float]:
+    """Percentiles of the fit: empirical for bootstrap, normal with the jackknife standard error"""
+    fits = fits[~np.isnan(fits)]
+    if len(fits) < 2:
+        return {f"p{p:g}": None for p in PERCENTILES}
+    if method == 'jackknife':
+        n = len(fits)
+        se = float(np.sqrt((n - 1) / n * np.sum((fits - fits.mean()) ** 2)))
+        return {f"p{p:g}": fit + NormalDist().inv_cdf(p / 100) * se for p in PERCENTILES}
+    return {f"p{p:g}": float(v) for p, v in zip(PERCENTILES, np.percentile(fits, PERCENTILES))}
+
+
+class UncertaintyEstimator:
+    """Bootstrap/jackknife percentiles of the latest power-law fit within a latency budget
+
+    Results are cached per key (the daily bar plus the regression parameters);
+    chunks still running when the budget runs out are stored when they finish.
+    workers=0 computes every chunk inline.
+    """
+
+    def __init__(self, resamples: int = 500, workers: Optional[int] = None, budget: float = 2.0,
+                 chunk: int = 100, max_entries: int = 8):
+        self.resamples = resamples
+        self.workers = min(4, os.cpu_count() or 1) if workers is None else workers
+        self.budget = budget
+        self.chunk = chunk
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        """Process pool of the current process (a forked worker builds its own)"""
+        if self._pool_pid != os.getpid():
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def _entry(self, key, samples):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['pid'] != os.getpid():
+                while len(self._entries) >= self.max_entries:
+                    self._entries.pop(next(iter(self._entries)))
+                entry = self._entries[key] = {'pid': os.getpid(), 'samples': samples, 'done': {}, 'pending': {}}
+            return entry
+
+    def _store(self, entry, start, future):
+        with self._lock:
+            entry['pending'].pop(start, None)
+            if not future.cancelled() and future.exception() is None:
+                entry['done'][start] = future.result()
+
+    def estimate(self, key, window: Window, method: str = 'bootstrap', budget: Optional[float] = None) -> dict:
+        """Percentiles of the fit at x = length, from as many samples as the budget allows"""
+        if method not in UNCERTAINTY_METHODS:
+            raise ValueError(f"Unknown uncertainty method: {method}")
+        started = time.perf_counter()
+        budget = self.budget if budget is None else budget
+        samples = int(np.count_nonzero(window.valid)) if method == 'jackknife' else self.resamples
+        entry = self._entry((key, method), samples)
+        seed = zlib.crc32(repr(key).encode())
+
+        with self._lock:
+            todo = [start for start in range(0, samples, self.chunk)
+                    if start not in entry['done'] and start not in entry['pending']]
+        for start in todo:
+            stop = min(start + self.chunk, samples)
+            if self.workers == 0:
+                with self._lock:
+                    entry['done'][start] = fit_samples(window, method, start, stop, seed)
+                if time.perf_counter() - started > budget:
+                    break
+                continue
+            future = self.pool.submit(fit_samples, window, method, start, stop, seed)
+            with self._lock:
+                entry['pending'][start] = future
+            future.add_done_callback(lambda f, start=start: self._store(entry, start, f))
+        with self._lock:
+            pending = list(entry['pending'].values())
+        wait(pending, timeout=max(budget - (time.perf_counter() - started), 0))
+
+        with self._lock:
+            done = [entry['done'][start] for start in sorted(entry['done'])]
+        fits = np.concatenate(done) if done else np.empty(0)
+        fit = float(ridge_fit(regression_sums(window.log_y, window.vol_w, window.xw, window.valid[None, :]),
+                              window.lam, window.length)[0])
+        return {
+            'method': method,
+            'fit': fit,
+            'samples': len(fits),
+            'requested_samples': samples,
+            'complete': len(fits) == samples,
+            'percentiles': summarize(fits, method, fit),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        }